@@ -0,0 +1,129 @@
+""" Test action module """
+import os
+import time
+import threading
+import pytest
+
+import cv2
+import numpy as np
+
+from yorha.device.minicap.action import ActionVerifier, Condition, Visible, Changed, Stable
+from yorha.exception import AndroidError
+from yorha.picture import Frame
+
+
+class Proc:
+    """ minicap process stand-in. no frame is sent after the input frames """
+
+    def __init__(self, image):
+        self.frames = []
+        self.cond = threading.Condition()
+        self.push(image)
+
+    def push(self, image, timestamp=None):
+        with self.cond:
+            data = cv2.imencode('.png', image)[1].tobytes()
+            self.frames.append(Frame(len(self.frames) + 1, data, timestamp))
+            self.cond.notify_all()
+
+    def get_latest(self):
+        return self.frames[-1]
+
+    def wait_frame(self, seq=0, _timeout=5):
+        with self.cond:
+            self.cond.wait_for(lambda: self.frames[-1].seq > seq, timeout=_timeout)
+            frame = self.frames[-1]
+        return frame if frame.seq > seq else None
+
+
+class Action:
+    """ input stand-in. push frames on each input """
+
+    def __init__(self, proc, images, delay=0):
+        self.proc = proc
+        self.images = images
+        self.delay = delay
+        self.count = 0
+
+    def __call__(self):
+        self.count += 1
+        time.sleep(self.delay)
+        for image in self.images:
+            self.proc.push(image)
+            time.sleep(0.03)
+
+
+@pytest.fixture
+def images(tmpdir):
+    """ blank image, screen image and template of the screen """
+    rng = np.random.RandomState(0)
+    screen = cv2.GaussianBlur((rng.rand(240, 320, 3) * 255).astype(np.uint8), (5, 5), 0)
+    target = os.path.join(str(tmpdir), 'target.png')
+    cv2.imwrite(target, screen[100:160, 120:200])
+    return np.zeros((240, 320, 3), np.uint8), screen, target
+
+
+def test_condition_interface():
+    """ Test condition without check """
+    with pytest.raises(TypeError):
+        Condition()  # pylint: disable=E0110
+
+
+def test_visible(images):
+    """ Test visible after the input, without re-sending it """
+    blank, screen, target = images
+    proc = Proc(blank)
+    action = Action(proc, [screen])
+    assert ActionVerifier(None, proc).perform(action, Visible(target), timeout=2) == (120, 100, 80, 60)
+    assert action.count == 1
+
+
+def test_changed(images):
+    """ Test changed after the input, without re-sending it """
+    blank, screen, _ = images
+    proc = Proc(blank)
+    action = Action(proc, [screen])
+    assert ActionVerifier(None, proc).perform(action, Changed(), timeout=2)
+    assert action.count == 1
+
+
+def test_stable(images):
+    """ Test stable after the screen stops sending frames """
+    blank, screen, _ = images
+    proc = Proc(blank)
+    action = Action(proc, [screen, blank, screen])
+    begin = time.time()
+    assert ActionVerifier(None, proc).perform(action, Stable(duration=0.3), timeout=2)
+    assert 0.3 <= time.time() - begin < 1.5
+    assert action.count == 1
+
+
+def test_stable_slow_input(images):
+    """ Test stable is counted from the return of an input slower than the duration """
+    blank, screen, _ = images
+    proc = Proc(blank)
+    action = Action(proc, [blank], delay=0.5)
+    threading.Timer(0.7, proc.push, (screen, )).start()
+    begin = time.time()
+    assert ActionVerifier(None, proc).perform(action, Stable(duration=0.3), timeout=3)
+    assert time.time() - begin >= 1.0
+    assert action.count == 1
+
+
+def test_stable_no_frame(images):
+    """ Test stable needs a frame after the input """
+    blank, _, _ = images
+    proc = Proc(blank)
+    action = Action(proc, [])
+    with pytest.raises(AndroidError):
+        ActionVerifier(None, proc).perform(action, Stable(duration=0.1), timeout=0.5, retries=0)
+
+
+def test_not_verified(images):
+    """ Test retry and error when the screen does not change """
+    blank, _, _ = images
+    proc = Proc(blank)
+    action = Action(proc, [])
+    with pytest.raises(AndroidError):
+        ActionVerifier(None, proc).perform(action, Changed(), timeout=0.3, retries=1)
+    assert action.count == 2
@@ -0,0 +1,57 @@
+""" Test adaptive module """
+from yorha.device.adb import Android
+from yorha.device.minicap.adaptive import AdaptiveController
+from yorha.device.minicap.service import MinicapService
+from yorha.device.simulator.device import SimulatedDevice
+
+LEVELS = ((1.0, 80), (0.5, 60), (0.5, 60), (0.5, 40))
+
+
+class Proc:
+    """ minicap process stand-in """
+
+    def __init__(self):
+        self.reconfigured = []
+
+    def reconfigure(self, scale, quality, fps):
+        self.reconfigured.append((scale, quality, fps))
+
+
+def _load(drops=0, backlog=0, bandwidth=0.0):
+    return {'drops': drops, 'backlog': backlog, 'bandwidth': bandwidth}
+
+
+def test_decide():
+    """ Test downgrade on pressure, and upgrade after headroom """
+    controller = AdaptiveController(Proc(), LEVELS, backlog=2, bandwidth=1000.0, headroom=2)
+    assert controller.decide(_load(drops=1)) == 1
+    assert controller.decide(_load(backlog=2)) == 1
+    assert controller.decide(_load(bandwidth=2000.0)) == 1
+    assert controller.decide(_load(backlog=1, bandwidth=500.0)) == 0
+    controller.level = 3
+    assert controller.decide(_load(drops=1)) == 3
+    assert controller.decide(_load()) == 3
+    assert controller.decide(_load()) == 2
+    assert controller.decide(_load()) == 3
+
+
+def test_apply():
+    """ Test reconfigure only when the parameters change """
+    proc = Proc()
+    controller = AdaptiveController(proc, LEVELS, fps=15)
+    controller.apply(0)
+    controller.apply(1)
+    controller.apply(2)
+    controller.apply(3)
+    assert proc.reconfigured == [(0.5, 60, 15), (0.5, 40, 15)]
+    assert [h['level'] for h in controller.history] == [1, 2, 3]
+    assert controller.level == 3
+
+
+def test_service_command():
+    """ Test minicap arguments of quality, size and frame rate """
+    adb = Android('emulator-5554', executor=SimulatedDevice())
+    service = MinicapService('minicap')
+    assert service.command(adb).endswith(' -P 1280x720@1280x720/0')
+    assert service.command(adb, 60, (640, 360), 15).endswith(' -P 1280x720@640x360/0 -Q 60 -r 15')
+    assert service.command(adb).startswith('adb -s emulator-5554 shell ')
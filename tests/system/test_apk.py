@@ -0,0 +1,79 @@
+""" Test apk installer """
+import os
+import struct
+import zipfile
+import pytest
+
+from yorha.device.adb import Android
+from yorha.device.apk import ApkInfo, ApkInstaller
+from yorha.device.simulator.device import SimulatedDevice
+
+
+def _axml(package, version_code, version_name, split=None):
+    """ binary AndroidManifest.xml """
+    strings = ['versionCode', 'versionName', 'package', 'split', 'manifest', package, version_name, split or '']
+    pool = b''
+    offsets = []
+    for s in strings:
+        offsets.append(len(pool))
+        pool += struct.pack('<H', len(s)) + s.encode('utf-16-le') + b'\x00\x00'
+    pool += b'\x00' * (-len(pool) % 4)
+    start = 28 + 4 * len(strings)
+    string_chunk = struct.pack('<HHIIIIII', 1, 28, start + len(pool), len(strings), 0, 0, start, 0)
+    string_chunk += struct.pack('<%dI' % len(strings), *offsets) + pool
+    resource_chunk = struct.pack('<HHI', 0x0180, 8, 16) + struct.pack('<II', 0x0101021b, 0x0101021c)
+    attrs = [(0, 0xFFFFFFFF, 0x10, version_code), (1, 6, 0x03, 6), (2, 5, 0x03, 5)]
+    if split:
+        attrs.append((3, 7, 0x03, 7))
+    body = struct.pack('<IIHHHHHH', 0xFFFFFFFF, 4, 20, 20, len(attrs), 0, 0, 0)
+    for name, raw, kind, value in attrs:
+        body += struct.pack('<IIIHBBI', 0xFFFFFFFF, name, raw, 8, 0, kind, value)
+    element_chunk = struct.pack('<HHIII', 0x0102, 16, 16 + len(body), 1, 0xFFFFFFFF) + body
+    chunks = string_chunk + resource_chunk + element_chunk
+    return struct.pack('<HHI', 3, 8, 8 + len(chunks)) + chunks
+
+
+def _apk(path, package, version_code, split=None):
+    with zipfile.ZipFile(path, 'w') as apk:
+        apk.writestr('AndroidManifest.xml', _axml(package, version_code, '1.%d' % version_code, split))
+        apk.writestr('classes.dex', os.urandom(1024))
+    return path
+
+
+def _device(serial='emulator-5554', version_code=None):
+    """ simulated device with the installed versionCode """
+    dumpsys = {}
+    if version_code is not None:
+        dumpsys['package com.example.yorha'] = 'Packages:\n    versionCode=%d minSdk=21 targetSdk=30\n' % version_code
+    device = SimulatedDevice(serial, dumpsys=dumpsys)
+    return device, Android(serial, executor=device)
+
+
+def test_apk_info(tmpdir):
+    """ Test manifest parser """
+    info = ApkInfo.load(_apk(os.path.join(str(tmpdir), 'base.apk'), 'com.example.yorha', 42))
+    assert (info.package, info.version_code, info.version_name, info.split) == ('com.example.yorha', 42, '1.42', None)
+    info = ApkInfo.load(_apk(os.path.join(str(tmpdir), 'split.apk'), 'com.example.yorha', 42, 'config.arm64_v8a'))
+    assert info.split == 'config.arm64_v8a'
+
+
+@pytest.mark.parametrize('installed, skipped', [(42, True), (41, False), (None, False)])
+def test_install_skip(tmpdir, installed, skipped):
+    """ Test skip if current """
+    apk = _apk(os.path.join(str(tmpdir), 'base.apk'), 'com.example.yorha', 42)
+    device, adb = _device(version_code=installed)
+    result = ApkInstaller().install(adb, [apk])
+    assert result.skipped == skipped
+    assert result.installed == installed
+    assert ('install -r %s' % apk in device.events) != skipped
+
+
+def test_install_multiple(tmpdir):
+    """ Test split apks on many devices """
+    base = _apk(os.path.join(str(tmpdir), 'base.apk'), 'com.example.yorha', 42)
+    split = _apk(os.path.join(str(tmpdir), 'split.apk'), 'com.example.yorha', 42, 'config.xxhdpi')
+    devices = [_device('emulator-5554', 42), _device('emulator-5556', 41), _device('emulator-5558')]
+    results = ApkInstaller().install_all([adb for _, adb in devices], [split, base])
+    assert [r.skipped for r in results] == [True, False, False]
+    assert [r.serial for r in results] == ['emulator-5554', 'emulator-5556', 'emulator-5558']
+    assert devices[1][0].events[-1] == 'install-multiple -r %s %s' % (split, base)
@@ -0,0 +1,87 @@
+""" Test minicap frame bus """
+import multiprocessing
+import pytest
+import numpy as np
+
+from yorha.device.minicap.bus import FrameBusPublisher, FrameBusSubscriber
+from yorha.exception import AndroidError
+
+
+def _read(serial, queue):
+    """ read in another process """
+    subscriber = FrameBusSubscriber(serial)
+    meta, image = subscriber.wait(0, timeout=5)
+    queue.put((meta.seq, int(image[0, 0, 0])))
+    subscriber.close()
+
+
+@pytest.fixture
+def publisher():
+    """ frame bus publisher """
+    target = FrameBusPublisher('TEST:5555')
+    yield target
+    target.close()
+
+
+def test_not_published():
+    """ Test subscriber without publisher """
+    with pytest.raises(AndroidError):
+        FrameBusSubscriber('NOT_PUBLISHED')
+
+
+def test_publish(publisher):
+    """ Test publish and read latest frame """
+    for seq in range(1, 7):
+        publisher.publish(seq, np.full((20, 30, 3), seq, np.uint8), orientation=90)
+    subscriber = FrameBusSubscriber('TEST:5555')
+    meta, image = subscriber.latest()
+    assert meta.seq == 6
+    assert meta.shape == (20, 30, 3)
+    assert meta.orientation == 90
+    assert image.shape == (20, 30, 3)
+    assert (image == 6).all()
+    assert subscriber.wait(6, timeout=0.1) is None
+    subscriber.close()
+
+
+def test_publish_multiprocess(publisher):
+    """ Test read from another process """
+    publisher.publish(1, np.full((20, 30, 3), 7, np.uint8))
+    queue = multiprocessing.Queue()
+    proc = multiprocessing.Process(target=_read, args=('TEST:5555', queue))
+    proc.start()
+    assert queue.get(timeout=10) == (1, 7)
+    proc.join()
+
+
+def test_already_published(publisher):
+    """ Test another publisher does not remove the live frame bus """
+    publisher.publish(1, np.full((20, 30, 3), 7, np.uint8))
+    with pytest.raises(AndroidError):
+        FrameBusPublisher('TEST:5555')
+    subscriber = FrameBusSubscriber('TEST:5555')
+    assert subscriber.latest()[0].seq == 1
+    subscriber.close()
+
+
+def test_replace(publisher):
+    """ Test replace the frame bus remained by a crashed process """
+    publisher.publish(1, np.full((20, 30, 3), 7, np.uint8))
+    target = FrameBusPublisher('TEST:5555', replace=True)
+    target.publish(2, np.full((20, 30, 3), 8, np.uint8))
+    subscriber = FrameBusSubscriber('TEST:5555')
+    assert subscriber.latest()[0].seq == 2
+    subscriber.close()
+    target.close()
+    # the replaced segment is already removed.
+    publisher.shm.close()
+    publisher.shm = None
+
+
+def test_publish_after_close(publisher):
+    """ Test frames after close are dropped """
+    publisher.publish(1, np.full((20, 30, 3), 7, np.uint8))
+    publisher.close()
+    publisher.publish(2, np.full((20, 30, 3), 7, np.uint8))
+    with pytest.raises(AndroidError):
+        FrameBusSubscriber('TEST:5555')
@@ -0,0 +1,74 @@
+""" Test minicap deploy module """
+import os
+import pytest
+
+from yorha.device.adb import Android
+from yorha.device.minicap.deploy import MinicapDeployer
+from yorha.device.simulator.device import SimulatedDevice
+from yorha.exception import AndroidError
+
+REMOTE = '/data/local/tmp/minicap-devel'
+
+
+def _write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(content)
+
+
+@pytest.fixture
+def prebuilt(tmpdir):
+    """ minicap prebuilt of arm64-v8a, sdk 29 """
+    path = str(tmpdir.join('minicap'))
+    _write(os.path.join(path, 'libs', 'arm64-v8a', 'minicap'), b'minicap binary')
+    _write(os.path.join(path, 'jni', 'minicap-shared', 'aosp', 'libs', 'android-29', 'arm64-v8a', 'minicap.so'),
+           b'minicap library')
+    return path
+
+
+def _device(serial='emulator-5554', abi='arm64-v8a'):
+    device = SimulatedDevice(serial, props={'ro.product.cpu.abi': abi, 'ro.build.version.sdk': '29'})
+    return device, Android(serial, executor=device)
+
+
+def test_locate(prebuilt):
+    """ Test locate by abi and sdk """
+    deployer = MinicapDeployer(prebuilt)
+    files = deployer.locate('arm64-v8a', '29')
+    assert [dst for _, dst in files] == [REMOTE + '/minicap', REMOTE + '/minicap.so']
+    assert files[1][0].endswith(os.path.join('android-29', 'arm64-v8a', 'minicap.so'))
+    with pytest.raises(AndroidError):
+        deployer.locate('x86', '29')
+    with pytest.raises(AndroidError):
+        deployer.locate('arm64-v8a', '19')
+
+
+def test_deploy_checksum(prebuilt):
+    """ Test push only when the md5 checksum differs """
+    device, adb = _device()
+    deployer = MinicapDeployer(prebuilt)
+    result = deployer.deploy(adb)
+    assert result.pushed == [REMOTE + '/minicap', REMOTE + '/minicap.so'] and result.updated
+    assert device.files[REMOTE + '/minicap'] == b'minicap binary'
+    assert 'chmod 755 %s/minicap' % REMOTE in device.events
+
+    device.commands.clear()
+    result = deployer.deploy(adb)
+    assert result.skipped == [REMOTE + '/minicap', REMOTE + '/minicap.so'] and not result.updated
+    assert not [c for c in device.commands if ' push ' in c]
+
+    device.files[REMOTE + '/minicap.so'] = b'old library'
+    result = deployer.deploy(adb)
+    assert result.pushed == [REMOTE + '/minicap.so'] and result.skipped == [REMOTE + '/minicap']
+    assert device.files[REMOTE + '/minicap.so'] == b'minicap library'
+
+
+def test_deploy_all(prebuilt):
+    """ Test a failed device does not stop the others """
+    devices = [_device('emulator-5554'), _device('emulator-5556', 'x86'), _device('emulator-5558')]
+    devices[2][0].set_failure(' push ', -1)
+    results = MinicapDeployer(prebuilt).deploy_all([adb for _, adb in devices])
+    assert [r.serial for r in results] == ['emulator-5554', 'emulator-5556', 'emulator-5558']
+    assert results[0].updated and results[0].error is None
+    assert 'not found' in results[1].error
+    assert results[2].error is not None and not results[2].updated
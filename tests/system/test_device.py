@@ -0,0 +1,123 @@
+""" Test android adaptor on simulated device """
+import os
+import time
+import pytest
+
+from yorha.device.adb import Android
+from yorha.device.simulator.device import SimulatedDevice
+from yorha.exception import AndroidError, RunError
+
+POWER = 'mWakefulness=Awake\nmBatteryLevel=87\nmOther=1\n'
+
+
+@pytest.fixture
+def device(tmpdir):
+    """ simulated device """
+    screen = os.path.join(str(tmpdir), 'screen.png')
+    with open(screen, 'wb') as f:
+        f.write(b'\x89PNG fake')
+    return SimulatedDevice('emulator-5554', screen=screen, dumpsys={'power': POWER})
+
+
+@pytest.fixture
+def adb(device):
+    """ android adaptor """
+    return Android('emulator-5554', executor=device)
+
+
+def test_props(adb):
+    """ Test getprop / setprop """
+    assert adb.boot_completed() == '1\n'
+    adb.setprop('debug.yorha', 'on')
+    assert adb.getprop('debug.yorha') == 'on\n'
+
+
+def test_files(adb, tmpdir):
+    """ Test push / pull and screencap """
+    src = os.path.join(str(tmpdir), 'data.bin')
+    with open(src, 'wb') as f:
+        f.write(b'yorha')
+    adb.push(src, '/data/local/tmp/data.bin')
+    assert adb.exec_out('cat /data/local/tmp/data.bin') == b'yorha'
+    host = os.path.join(str(tmpdir), 'host')
+    os.makedirs(host)
+    path = adb.snapshot('capture.png', host)
+    with open(path, 'rb') as f:
+        assert f.read() == b'\x89PNG fake'
+
+
+def test_dumpsys(adb):
+    """ Test dumpsys fixture with device side filter """
+    assert adb.sysinfo.battery_level() == 87
+    assert adb.sysinfo.screen_on()
+
+
+def test_failure_and_latency(adb, device):
+    """ Test injected failure and latency """
+    device.set_failure('getprop', count=1)
+    with pytest.raises(RunError):
+        adb.getprop('sys.boot_completed')
+    assert adb.getprop('sys.boot_completed') == '1\n'
+    device.set_latency('setprop', 0.05)
+    begin = time.time()
+    adb.setprop('debug.yorha', 'off')
+    assert time.time() - begin >= 0.05
+
+
+def test_throughput(adb, device):
+    """ Test python side throughput without hardware """
+    begin = time.time()
+    for _ in range(1000):
+        adb.getprop('ro.product.model')
+    assert device.count == 1000
+    assert time.time() - begin < 5
+
+
+def test_root_forwards(adb, device):
+    """ Test root waits for the device, and restores recorded forwards """
+    adb.forward('tcp:1313 localabstract:minicap')
+    adb.forward('tcp:1111 localabstract:minitouch')
+    adb.forward('--remove tcp:1111')
+    device.commands.clear()
+    adb.root()
+    assert list(device.commands) == [
+        'adb -s emulator-5554 root',
+        'adb -s emulator-5554 wait-for-device',
+        'adb -s emulator-5554 forward tcp:1313 localabstract:minicap',
+    ]
+    assert [name for name, _ in adb.transitions()] == ['root']
+
+
+def test_tcpip_usb(adb, device, monkeypatch):
+    """ Test tcpip and usb switch the target, and restore forwards """
+    monkeypatch.setattr(adb.get(), 'IP', '192.168.0.10')
+    monkeypatch.setattr(adb.get(), 'PORT', '5555')
+    adb.forward('tcp:1313 localabstract:minicap')
+    device.commands.clear()
+    adb.tcpip()
+    assert list(device.commands) == [
+        'adb -s emulator-5554 tcpip 5555',
+        'adb connect 192.168.0.10:5555',
+        'adb -s 192.168.0.10:5555 wait-for-device',
+        'adb -s 192.168.0.10:5555 forward tcp:1313 localabstract:minicap',
+    ]
+    device.commands.clear()
+    adb.usb()
+    assert list(device.commands) == [
+        'adb -s 192.168.0.10:5555 usb',
+        'adb disconnect 192.168.0.10:5555',
+        'adb -s emulator-5554 wait-for-device',
+        'adb -s emulator-5554 forward tcp:1313 localabstract:minicap',
+    ]
+    assert [name for name, _ in adb.transitions()] == ['tcpip', 'usb']
+
+
+def test_transition_failure(adb, device):
+    """ Test the device not coming back raises AndroidError """
+    device.set_failure('wait-for-device', count=1)
+    adb.root()
+    assert [name for name, _ in adb.transitions()] == ['root']
+    device.set_failure('wait-for-device', count=-1)
+    with pytest.raises(AndroidError):
+        adb.root(timeout=1)
+    assert len(adb.transitions()) == 1
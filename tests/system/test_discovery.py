@@ -0,0 +1,69 @@
+""" Test device discovery """
+import pytest
+
+from yorha.device.discovery import DeviceTracker
+from yorha.device.simulator.adb_server import FakeAdbServer
+from yorha.exception import AndroidError
+
+
+@pytest.fixture
+def server():
+    """ adb server stand-in """
+    target = FakeAdbServer()
+    target.attach('SERIAL01')
+    target.start()
+    yield target
+    target.finish()
+
+
+@pytest.fixture
+def tracker(server):
+    """ device tracker """
+    target = DeviceTracker(port=server.get_port(), retry=0.2)
+    events = []
+    target.add_listener(lambda event, info: events.append((event, info.serial, info.state)))
+    target.events = events
+    target.start()
+    yield target
+    target.finish()
+
+
+def test_initial(server, tracker):
+    """ Test initial device list """
+    assert tracker.wait_for('SERIAL01', timeout=5)
+    assert tracker.devices()['SERIAL01'].transport == '1'
+    assert server.requests[0] == 'host:track-devices-l'
+
+
+def test_events(server, tracker):
+    """ Test attach, change and detach events """
+    assert tracker.wait_for('SERIAL01', timeout=5)
+    server.attach('SERIAL02', 'offline')
+    assert tracker.wait_for('SERIAL02', 'offline', timeout=5)
+    server.attach('SERIAL02')
+    assert tracker.wait_for('SERIAL02', timeout=5)
+    server.detach('SERIAL01')
+    assert tracker.wait_for('SERIAL02', timeout=5)
+    tracker.wait_for('SERIAL01', 'gone', timeout=0.5)
+    assert tracker.events == [('attach', 'SERIAL01', 'device'), ('attach', 'SERIAL02', 'offline'),
+                              ('change', 'SERIAL02', 'device'), ('detach', 'SERIAL01', 'device')]
+    assert list(tracker.devices('device')) == ['SERIAL02']
+
+
+def test_adaptor(server, tracker):
+    """ Test android adaptor """
+    assert tracker.wait_for('SERIAL01', timeout=5)
+    adaptor = tracker.adaptor('SERIAL01')
+    assert adaptor is tracker.adaptor('SERIAL01')
+    assert adaptor.get().SERIAL == 'SERIAL01'
+    with pytest.raises(AndroidError):
+        tracker.adaptor('SERIAL99')
+
+
+def test_reconnect(server, tracker):
+    """ Test devices are detached while the adb server is down """
+    assert tracker.wait_for('SERIAL01', timeout=5)
+    server.finish()
+    tracker.wait_for('SERIAL01', 'gone', timeout=1)
+    assert not tracker.devices()
+    assert tracker.events[-1] == ('detach', 'SERIAL01', 'device')
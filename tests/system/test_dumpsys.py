@@ -0,0 +1,69 @@
+""" Test dumpsys model """
+import pytest
+
+from yorha.device.adb import Android
+from yorha.device.dumpsys import Dumpsys, DumpsysNode
+from yorha.device.simulator.device import SimulatedDevice
+
+WINDOW = '''WINDOW MANAGER WINDOWS (dumpsys window windows)
+  Window #0 Window{a1b2c3 u0 StatusBar}:
+    mDisplayId=0 rootTaskId=1
+    mBaseLayer=181000 mSubLayer=0
+  Window #1 Window{d4e5f6 u0 com.example.yorha/com.example.yorha.MainActivity}:
+    mDisplayId=0 rootTaskId=12
+  mCurrentFocus=Window{d4e5f6 u0 com.example.yorha/com.example.yorha.MainActivity}
+  mFocusedApp=ActivityRecord{1234 u0 com.example.yorha/.MainActivity t12}
+'''
+
+DUMPSYS = {
+    'input': 'INPUT MANAGER (dumpsys input)\n    Viewport INTERNAL:\n      SurfaceOrientation: 1\n',
+    'activity activities':
+    'ACTIVITY MANAGER ACTIVITIES (dumpsys activity activities)\n'
+    '    mResumedActivity: ActivityRecord{8a6c0f u0 com.example.yorha/.MainActivity t12}\n',
+    'window windows': WINDOW,
+    'power': 'POWER MANAGER (dumpsys power)\n  mWakefulness=Awake\n  mBatteryLevel=87\n  mOther=1\n',
+}
+
+
+@pytest.fixture
+def device():
+    """ simulated device """
+    return SimulatedDevice(dumpsys=DUMPSYS)
+
+
+def test_tree():
+    """ Test indentation tree """
+    root = DumpsysNode.parse(WINDOW)
+    assert len(root.children) == 1
+    section = root.child('WINDOW MANAGER')
+    assert [c.text.split(' ')[0] for c in section.children] == ['Window', 'Window', 'mCurrentFocus=Window{d4e5f6',
+                                                                'mFocusedApp=ActivityRecord{1234']
+    window = section.find('Window #1')
+    assert window.value('rootTaskId') == '12'
+    assert window.value('mBaseLayer') is None
+    assert section.value('mBaseLayer') == '181000'
+
+
+def test_accessors(device):
+    """ Test typed accessors """
+    dumpsys = Dumpsys(Android('emulator-5554', executor=device))
+    assert dumpsys.orientation() == 1
+    assert dumpsys.top_activity() == 'com.example.yorha/.MainActivity'
+    assert dumpsys.window_focus() == 'com.example.yorha/com.example.yorha.MainActivity'
+    assert dumpsys.battery_level() == 87
+    assert dumpsys.screen_on()
+
+
+def test_cache(device):
+    """ Test cache and invalidation """
+    dumpsys = Dumpsys(Android('emulator-5554', executor=device), ttl=60)
+    dumpsys.battery_level()
+    dumpsys.wakefulness()
+    dumpsys.orientation()
+    assert device.count == 2
+    dumpsys.invalidate('power')
+    dumpsys.battery_level()
+    dumpsys.orientation()
+    assert device.count == 3
+    dumpsys.orientation(refresh=True)
+    assert device.count == 4
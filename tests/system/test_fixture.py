@@ -0,0 +1,68 @@
+""" Test session capture fixtures """
+import os
+
+from yorha.fixture import CapturePipeline, PipelinePool
+from yorha.picture import Locator
+
+
+class Proc:
+    """ minicap process stand-in """
+
+    def __init__(self, evidence):
+        self.space = {'tmp.evidence': evidence, 'tmp.video': evidence}
+        self.namespace = ()
+        self.locator = Locator()
+        self.running = True
+
+    def locator_key(self):
+        return ('SERIAL01', 'Profile') + self.namespace
+
+    def alive(self):
+        return self.running
+
+    def finish(self):
+        self.running = False
+
+    def get_latest(self):
+        return 'frame'
+
+
+class Pipeline(CapturePipeline):
+    """ pipeline without device """
+    starts = 0
+
+    def start(self):
+        Pipeline.starts += 1
+        self.evidence = os.path.join(self.path, 'evidence')
+        self.proc = Proc(self.evidence)
+
+
+def test_pool(tmpdir):
+    """ Test one pipeline per device, restarted only if it has died """
+    Pipeline.starts = 0
+    pool = PipelinePool(str(tmpdir), 'gw1', factory=Pipeline)
+    first = pool.get('SERIAL01')
+    assert pool.get('SERIAL01') is first and Pipeline.starts == 1
+    assert first.port == 1313 + 2 * 16 and pool.get('SERIAL02').port == 1313 + 2 * 16 + 1
+    first.proc.running = False
+    assert pool.get('SERIAL01') is first and Pipeline.starts == 3 and first.restarts == 1
+    pool.finish()
+    assert not pool.pipelines
+
+
+def test_view(tmpdir):
+    """ Test per-test evidence directory and locator namespace """
+    pool = PipelinePool(str(tmpdir), factory=Pipeline)
+    pipeline = pool.get('SERIAL01')
+    proc = pipeline.proc
+    view = pipeline.view('test_login[case/1]')
+    assert view.evidence_dir == os.path.join(pipeline.evidence, 'test_login[case_1]')
+    assert os.path.isdir(view.evidence_dir)
+    assert proc.space['tmp.evidence'] == view.evidence_dir
+    assert proc.locator_key() == ('SERIAL01', 'Profile', 'test_login[case_1]')
+    assert view.get_latest() == 'frame'
+    proc.locator._last[proc.locator_key() + ('button.png', )] = (0, 0, 10, 10)
+    proc.locator._last[('SERIAL01', 'Profile', 'other', 'button.png')] = (0, 0, 10, 10)
+    view.close()
+    assert proc.space['tmp.evidence'] == pipeline.evidence and proc.namespace == ()
+    assert list(proc.locator._last) == [('SERIAL01', 'Profile', 'other', 'button.png')]
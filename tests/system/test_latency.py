@@ -0,0 +1,84 @@
+""" Test latency module """
+import time
+import pytest
+
+import cv2
+import numpy as np
+
+from yorha.device.minicap.latency import LatencyProbe, LatencyReport, LatencySample
+from yorha.picture import Frame
+
+
+class Source:
+    """ frame source stand-in. no new frame means the screen is static """
+
+    def __init__(self):
+        self.frames = []
+
+    def push(self, value, timestamp):
+        image = np.full((120, 160, 3), value, np.uint8)
+        self.frames.append(Frame(len(self.frames) + 1, cv2.imencode('.jpg', image)[1].tobytes(), timestamp))
+
+    def wait_frame(self, seq=0, _timeout=5):
+        for frame in self.frames:
+            if frame.seq > seq:
+                return frame
+        return None
+
+
+@pytest.fixture
+def source():
+    """ frame source """
+    return Source()
+
+
+def test_measure_once(source):
+    """ Test display latency is the first changed frame after the input """
+    source.push(0, time.time() - 1.0)
+
+    def _tap():
+        now = time.time()
+        source.push(0, now - 0.5)
+        source.push(0, now + 0.02)
+        source.push(200, now + 0.05)
+        source.push(100, now + 0.08)
+
+    sample = LatencyProbe(None, source).measure_once(_tap)
+    assert sample.display == pytest.approx(0.05, abs=0.01)
+    assert sample.frames == 3
+
+
+def test_measure_once_timeout(source):
+    """ Test no change until timeout """
+    source.push(0, time.time() - 1.0)
+    sample = LatencyProbe(None, source).measure_once(lambda: source.push(0, time.time()), timeout=0.2)
+    assert sample.display is None and sample.frames == 1
+
+
+def test_settle(source):
+    """ Test settle on frame timestamps, and on a static screen """
+    probe = LatencyProbe(None, source)
+    assert probe.settle() is None
+    begin = time.time() - 10
+    source.push(0, begin)
+    source.push(100, begin + 0.2)
+    source.push(100, begin + 0.5)
+    source.push(100, begin + 0.8)
+    source.push(200, begin + 0.9)
+    assert probe.settle(duration=0.5).seq == 4
+    # no new frame after the last change.
+    assert probe.settle(duration=5.0).seq == 5
+
+
+def test_report():
+    """ Test report percentiles """
+    samples = [LatencySample(0.01, (i + 1) / 10.0, 2) for i in range(10)] + [LatencySample(0.02, None, 0)]
+    summary = LatencyReport(samples).summary()
+    assert summary['trials'] == 11 and summary['timeouts'] == 1
+    assert summary['display']['count'] == 10
+    assert summary['display']['p50'] == pytest.approx(0.55)
+    assert summary['display']['p90'] == pytest.approx(0.91)
+    assert summary['display']['max'] == pytest.approx(1.0)
+    assert summary['after_command']['min'] == pytest.approx(0.09)
+    assert summary['command']['mean'] == pytest.approx(0.12 / 11)
+    assert LatencyReport().summary()['display']['p50'] == 0.0
@@ -0,0 +1,156 @@
+""" Test logcat collector """
+import os
+import sys
+import time
+import threading
+import pytest
+
+from yorha.device.adb import Android
+from yorha.device.logcat import LogcatCollector, dump_failure
+from yorha.device.simulator.device import SimulatedDevice
+
+pytest_plugins = 'pytester'
+
+TEST_FAILURE = """
+import os
+import sys
+import time
+from yorha.device.adb import Android
+from yorha.device.logcat import LogcatCollector
+from yorha.device.simulator.device import SimulatedDevice
+
+collector = LogcatCollector(Android('emulator-5554', executor=SimulatedDevice()), directory=os.getcwd())
+collector.command = lambda tail: [sys.executable, '-c', 'import time; time.sleep(30)']
+collector.start()
+collector.feed('old')
+collector._ring[-1] = (1, time.time() - 60, 'old')
+
+
+def teardown_module():
+    collector.finish()
+
+
+def test_fail():
+    collector.feed('failure')
+    assert False
+"""
+
+# reports of the pinned pytest 4.4 have no start time.
+CONFTEST = """
+import pytest
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport():
+    outcome = yield
+    outcome.get_result().__dict__.pop('start', None)
+"""
+
+
+@pytest.fixture
+def collector(tmpdir):
+    """ collector without process """
+    adb = Android('emulator-5554', executor=SimulatedDevice())
+    return LogcatCollector(adb, ['ActivityManager:I', '*:S'], size=100, directory=str(tmpdir))
+
+
+def test_command(collector):
+    """ Test filters are passed to the device """
+    command = collector.command(1)
+    assert command[:6] == ['adb', '-s', 'emulator-5554', 'logcat', '-v', 'threadtime']
+    assert command[-4:] == ['-T', '1', 'ActivityManager:I', '*:S']
+
+
+def test_command_tcpip(collector, monkeypatch):
+    """ Test command follows the transport switch """
+    adb = collector.adb
+    monkeypatch.setattr(adb.get(), 'IP', '192.168.0.10')
+    monkeypatch.setattr(adb.get(), 'PORT', '5555')
+    adb.tcpip()
+    assert collector.command()[:3] == ['adb', '-s', '192.168.0.10:5555']
+
+
+def test_restart(collector, monkeypatch):
+    """ Test logcat is restarted from the last timestamp when it exits """
+    monkeypatch.setattr('yorha.device.logcat.RETRY', 0.1)
+    first = '01-01 00:00:00.000  100  100 I ActivityManager: first'
+    second = '01-01 00:00:01.000  100  100 I ActivityManager: second'
+    tails = []
+
+    def _command(tail=None):
+        tails.append(tail)
+        lines = [first] if len(tails) == 1 else [first, second]
+        script = ''.join(['print(%r, flush=True);' % line for line in lines])
+        return [sys.executable, '-c', script + ('import time; time.sleep(30)' if len(tails) > 1 else '')]
+
+    collector.command = _command
+    collector.start()
+    try:
+        assert collector.wait_for('second', timeout=10, since=0) is not None
+        assert collector.alive()
+    finally:
+        collector.finish()
+    assert not collector.alive()
+    assert tails == [1, '01-01 00:00:00.000']
+    assert collector.lines() == [first, second]
+
+
+def test_ring_bounded(collector):
+    """ Test ring keeps the latest lines """
+    for i in range(1000):
+        collector.feed('line %d %s' % (i, 'x' * 10000))
+    lines = collector.lines()
+    assert len(lines) == 100
+    assert lines[0].startswith('line 900 ') and lines[-1].startswith('line 999 ')
+    assert max([len(line) for line in lines]) <= 4096
+
+
+def test_wait_for(collector):
+    """ Test wait for a new line """
+    collector.feed('I ActivityManager: Start proc old')
+    mark = collector.mark()
+    timer = threading.Timer(0.2, collector.feed, args=('I ActivityManager: Start proc 1234:com.example/u0a1', ))
+    timer.start()
+    match = collector.wait_for(r'Start proc (\d+):com\.example', timeout=5)
+    assert match is not None and match.group(1) == '1234'
+    assert collector.wait_for('Start proc', timeout=0.1) is None
+    assert collector.wait_for('Start proc old', timeout=0.1, since=mark - 1) is not None
+
+
+def test_dump_window(collector, tmpdir):
+    """ Test dump only the window """
+    collector.feed('before')
+    time.sleep(0.05)
+    since = time.time()
+    collector.feed('after')
+    path = collector.dump(os.path.join(str(tmpdir), 'logcat.txt'), since)
+    with open(path) as f:
+        assert f.read() == 'after\n'
+    assert collector.dump(os.path.join(str(tmpdir), 'empty.txt'), time.time() + 1) is None
+
+
+def test_dump_failure(tmpdir):
+    """ Test dump filename of tcp serial and parametrized test """
+    adb = Android('192.168.0.10:5555', executor=SimulatedDevice('192.168.0.10:5555'))
+    collector = LogcatCollector(adb, size=10, directory=str(tmpdir))
+    collector.command = lambda tail: [sys.executable, '-c', 'import time; print("failure", flush=True); time.sleep(30)']
+    collector.start()
+    try:
+        assert collector.wait_for('failure', timeout=10) is not None
+        paths = dump_failure('test_login[tcp:5555/a]')
+    finally:
+        collector.finish()
+    assert len(paths) == 1 and os.path.dirname(paths[0]) == str(tmpdir)
+    assert os.path.basename(paths[0]).startswith('logcat_192.168.0.10_5555_test_login[tcp_5555_a]_')
+    with open(paths[0]) as f:
+        assert f.read() == 'failure\n'
+
+
+def test_plugin_dump_window(testdir):
+    """ Test plugin dumps the window of the failed test """
+    testdir.makeconftest(CONFTEST)
+    testdir.makepyfile(test_fail=TEST_FAILURE)
+    result = testdir.runpytest('-p', 'yorha.plugins')
+    result.assert_outcomes(failed=1)
+    paths = testdir.tmpdir.listdir(lambda p: p.basename.startswith('logcat_emulator-5554_test_fail_'))
+    assert len(paths) == 1 and paths[0].read() == 'failure\n'
@@ -0,0 +1,101 @@
+""" Test metrics module """
+import gc
+import os
+import json
+import time
+import socket
+import struct
+import threading
+import pytest
+
+from yorha.metrics import Metrics, MetricsDumper, Histogram, totals
+from yorha.report import counters
+from yorha.device.minicap.stream import MinicapStream, MAX_SIZE
+
+JPEG = b'\xff\xd8' + b'\x00' * 5000 + b'\xff\xd9'
+
+
+def test_histogram():
+    """ Test histogram quantile """
+    histogram = Histogram()
+    for value in [0.0001] * 90 + [0.3] * 10:
+        histogram.observe(value)
+    snapshot = histogram.snapshot()
+    assert snapshot['count'] == 100
+    assert snapshot['p50'] == 0.0005
+    assert snapshot['p99'] == 0.5
+    assert snapshot['max'] == 0.3
+
+
+def test_metrics_snapshot():
+    """ Test metrics snapshot """
+    metrics = Metrics('test')
+    metrics.counter('bytes').add(10)
+    with metrics.timer('work'):
+        pass
+    snapshot = metrics.snapshot()
+    assert snapshot['counters']['bytes'] == 10
+    assert snapshot['rates']['bytes'] > 0
+    assert snapshot['histograms']['work']['count'] == 1
+
+
+def test_totals_retired():
+    """ Test totals keep the values of collected metrics """
+    metrics = Metrics('stream')
+    metrics.counter('frames').add(100)
+    before = totals()
+    del metrics
+    gc.collect()
+    assert totals()['stream.frames'] == before['stream.frames']
+    metrics = Metrics('stream')
+    metrics.counter('frames').add(5)
+    assert counters(before, totals())['frames'] == 5
+
+
+def test_dumper_lines(tmpdir, monkeypatch):
+    """ Test dump writes one json per line without carriage return """
+    monkeypatch.setattr(os, 'linesep', '\r\n')
+    path = os.path.join(str(tmpdir), 'metrics.jsonl')
+    dumper = MetricsDumper([Metrics('dump')], path)
+    dumper.dump()
+    dumper.dump()
+    with open(path, 'rb') as f:
+        data = f.read()
+    assert b'\r' not in data
+    assert [json.loads(line)['metrics'][0]['name'] for line in data.splitlines()] == ['dump', 'dump']
+
+
+@pytest.fixture
+def minicap():
+    """ minicap stand-in server """
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(('127.0.0.1', 0))
+    server.listen(1)
+
+    def serve():
+        conn, _ = server.accept()
+        conn.sendall(struct.pack('<BBIIIIIBB', 1, 24, 1234, 1280, 720, 640, 360, 0, 0))
+        for _ in range(10):
+            conn.sendall(struct.pack('<I', len(JPEG)) + JPEG)
+        time.sleep(1)
+        conn.close()
+
+    threading.Thread(target=serve, daemon=True).start()
+    yield server.getsockname()[1]
+    server.close()
+
+
+def test_stream_metrics(minicap):
+    """ Test stream metrics """
+    stream = MinicapStream('127.0.0.1', str(minicap))
+    stream.start()
+    deadline = time.time() + 5
+    while stream.metrics.counter('frames').value < 10 and time.time() < deadline:
+        time.sleep(0.01)
+    stream.finish()
+    snapshot = stream.metrics.snapshot()
+    assert stream.banner.pid == 1234
+    assert snapshot['counters']['frames'] == 10
+    assert snapshot['counters']['drops'] == 10 - MAX_SIZE
+    assert snapshot['counters']['bytes'] == 24 + 10 * (4 + len(JPEG))
+    assert snapshot['histograms']['parse']['count'] == 10
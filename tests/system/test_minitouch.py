@@ -0,0 +1,115 @@
+""" Test minitouch client """
+import sys
+import threading
+import pytest
+
+from yorha.device.adb import Android
+from yorha.device.minitouch import service
+from yorha.device.minitouch.client import MinitouchClient
+from yorha.device.simulator.device import SimulatedDevice
+from yorha.device.simulator.minitouch import MinitouchServer
+from yorha.exception import AndroidError
+
+
+@pytest.fixture
+def server():
+    """ minitouch stand-in server """
+    target = MinitouchServer(max_contacts=2, max_x=1079, max_y=1919)
+    target.start()
+    yield target
+    target.finish()
+
+
+@pytest.fixture
+def client(server):
+    """ minitouch client """
+    target = MinitouchClient('127.0.0.1', str(server.get_port()))
+    target.start()
+    yield target
+    target.finish()
+
+
+def test_banner(client):
+    """ Test banner """
+    assert client.banner.max_contacts == 2
+    assert client.banner.max_x == 1079
+    assert client.banner.pid == 4242
+
+
+def test_tap(server, client):
+    """ Test tap """
+    client.tap(100, 200, duration=30)
+    assert server.wait_events(5) == ['d 0 100 200 50', 'c', 'w 30', 'u 0', 'c']
+
+
+def test_tap_scaled(server):
+    """ Test tap with screen size """
+    target = MinitouchClient('127.0.0.1', str(server.get_port()), size=(540, 960))
+    target.start()
+    target.tap(539, 959)
+    assert server.wait_events(1)[0] == 'd 0 1079 1919 50'
+    target.finish()
+
+
+def test_pinch(server, client):
+    """ Test pinch """
+    client.pinch(500, 500, 100, 300, duration=200, steps=2)
+    events = server.wait_events(12)
+    assert events[:3] == ['d 0 400 500 50', 'd 1 600 500 50', 'c']
+    assert events[-3:] == ['u 0', 'u 1', 'c']
+    assert 'm 1 800 500 50' in events
+    assert not server.errors
+
+
+def test_too_many_contacts(client):
+    """ Test too many contacts """
+    with pytest.raises(AndroidError):
+        client.gesture([[(0, 0)], [(1, 1)], [(2, 2)]])
+
+
+def test_concurrent_gestures(server, client):
+    """ Test gestures from threads do not interleave """
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    steps, count = 1000, 4
+    size = 2 + 3 * steps + 2
+    barrier = threading.Barrier(count)
+
+    def _swipe(y):
+        barrier.wait()
+        client.swipe(0, y, 500, y, 10, steps)
+
+    threads = [threading.Thread(target=_swipe, args=(i, )) for i in range(count)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    events = server.wait_events(count * size)
+    assert len(events) == count * size
+    for i in range(0, len(events), size):
+        assert events[i].startswith('d 0 0 ') and events[i + size - 2:i + size] == ['u 0', 'c']
+        assert len(set([e.split()[3] for e in events[i:i + size] if e[0] in 'dm'])) == 1
+
+
+class Proc:
+    """ adb shell process stand-in """
+
+    def __init__(self, *args, **kwargs):
+        self.pid = 0
+
+    def kill(self):
+        pass
+
+
+def test_service_forward(tmpdir, monkeypatch):
+    """ Test service forwards the client port, and removes it on stop """
+    monkeypatch.setattr(service.subprocess, 'Popen', Proc)
+    adb = Android('emulator-5554', executor=SimulatedDevice())
+    target = service.MinitouchService('minitouch')
+    target.start(adb, str(tmpdir), 1234)
+    assert adb._adb.forwards == {'tcp:1234': 'localabstract:minitouch'}
+    target.stop()
+    assert adb._adb.forwards == {}
@@ -0,0 +1,50 @@
+""" Test ocr module """
+import pytest
+import numpy as np
+
+from yorha.ocr import Ocr, OcrEngine
+
+
+class CountEngine(OcrEngine):
+    """ Count Engine """
+
+    def __init__(self):
+        self.count = 0
+
+    def recognize(self, image):
+        self.count += 1
+        return 'width %d' % image.shape[1]
+
+
+@pytest.fixture
+def engine():
+    """ ocr engine """
+    target = CountEngine()
+    Ocr.set_engine(target)
+    yield target
+    Ocr.set_engine(None)
+
+
+def test_img_to_string_cache(engine):
+    """ Test img_to_string cache """
+    image = np.zeros((100, 200, 3), np.uint8)
+    assert Ocr.img_to_string(image, (0, 0, 50, 20))[0] == 'width 100'
+    assert Ocr.img_to_string(image, (0, 0, 50, 20))[0] == 'width 100'
+    assert engine.count == 1
+    image[5:10, 5:10] = 255
+    Ocr.img_to_string(image, (0, 0, 50, 20))
+    assert engine.count == 2
+
+
+def test_img_to_string_boxes(engine):
+    """ Test img_to_string multiple boxes """
+    image = np.zeros((100, 200, 3), np.uint8)
+    result, _ = Ocr.img_to_string(image, [(0, 0, 50, 20), (10, 10, 30, 30)])
+    assert result == ['width 100', 'width 60']
+    assert Ocr.img_to_string(image, (0, 0, 50, 20), expect='height')[0] is None
+
+
+def test_engine_interface():
+    """ Test engine without recognize """
+    with pytest.raises(TypeError):
+        OcrEngine()  # pylint: disable=E0110
@@ -0,0 +1,95 @@
+""" Test performance sampler """
+import os
+import sys
+import math
+import time
+import subprocess
+import pytest
+
+from yorha.device.adb import Android
+from yorha.device.perf import PerfSampler, PerfSeries
+from yorha.device.simulator.device import SimulatedDevice
+
+FRAMESTATS = [
+    'Flags,IntendedVsync,Vsync,OldestInputEvent,NewestInputEvent,HandleInputStart,AnimationStart,'
+    'PerformTraversalsStart,DrawStart,SyncQueued,SyncStart,IssueDrawCommandsStart,SwapBuffers,FrameCompleted,',
+    '0,1000000000,0,0,0,0,0,0,0,0,0,0,0,1010000000,',
+    '0,2000000000,0,0,0,0,0,0,0,0,0,0,0,2030000000,',
+    '1,3000000000,0,0,0,0,0,0,0,0,0,0,0,3005000000,',
+]
+
+
+@pytest.fixture
+def adb():
+    """ android adaptor """
+    return Android('emulator-5554', executor=SimulatedDevice())
+
+
+def test_command(adb, monkeypatch):
+    """ Test shell session follows the transport switch """
+    sampler = PerfSampler(adb, 'com.example')
+    assert sampler.command() == ['adb', '-s', 'emulator-5554', 'shell']
+    monkeypatch.setattr(adb.get(), 'IP', '192.168.0.10')
+    monkeypatch.setattr(adb.get(), 'PORT', '5555')
+    adb.tcpip()
+    assert sampler.command() == ['adb', '-s', '192.168.0.10:5555', 'shell']
+
+
+def test_evaluate(adb):
+    """ Test deltas computed on the host """
+    sampler = PerfSampler(adb, 'com.example')
+    stat = '1 (com.example) S' + ' 0' * 10 + ' %d %d' + ' 0' * 8 + ' %d'
+    row = sampler.evaluate(1.0, {
+        'stat': ['cpu  100 0 100 700 100 0 0 0 0 0'],
+        'meminfo': ['MemAvailable:    2048 kB'],
+        'pid': [stat % (10, 10, 100)],
+        'gfx': FRAMESTATS,
+        'thermal': ['35000', '41000'],
+    })
+    assert math.isnan(row['cpu']) and math.isnan(row['app_cpu'])
+    assert row['app_rss'] == 400 and row['mem_available'] == 2048 and row['temperature'] == 41.0
+    assert row['frames'] == 2 and row['janky'] == 1
+    row = sampler.evaluate(2.0, {
+        'stat': ['cpu  200 0 200 1400 200 0 0 0 0 0'],
+        'pid': [stat % (30, 30, 100)],
+        'gfx': FRAMESTATS,
+    })
+    assert row['cpu'] == 20.0 and row['app_cpu'] == 4.0
+    assert row['frames'] == 0 and math.isnan(row['temperature'])
+
+
+def test_series(tmpdir):
+    """ Test binary series roundtrip and append """
+    path = os.path.join(str(tmpdir), 'perf.bin')
+    series = PerfSeries(path)
+    series.append({'time': 1.5, 'cpu': 10.0})
+    series.close()
+    series = PerfSeries(path)
+    series.append({'time': 2.5, 'frames': 3})
+    series.close()
+    columns = PerfSeries.load(path)
+    assert columns['time'] == [1.5, 2.5]
+    assert columns['cpu'][0] == 10.0 and math.isnan(columns['cpu'][1])
+    assert columns['frames'][1] == 3.0
+    assert os.path.getsize(path) < 200
+
+
+@pytest.mark.skipif(sys.platform != 'linux', reason='shell stand-in reads local procfs')
+def test_session(adb, tmpdir):
+    """ Test samples on one shell session """
+    target = subprocess.Popen(['sleep', '30'])
+    path = os.path.join(str(tmpdir), 'perf.bin')
+    sampler = PerfSampler(adb, 'sleep', path, frames=False)
+    sampler.command = lambda: ['sh']
+    try:
+        sampler.sample()
+        proc = sampler.proc
+        time.sleep(0.1)
+        row = sampler.sample()
+        assert sampler.proc is proc
+        assert 0.0 <= row['cpu'] <= 100.0 and row['app_rss'] > 0 and row['mem_available'] > 0
+    finally:
+        sampler.finish()
+        target.kill()
+        target.wait()
+    assert len(PerfSeries.load(path)['time']) == 2
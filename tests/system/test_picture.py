@@ -0,0 +1,101 @@
+""" Test picture module """
+import os
+import logging
+import pytest
+
+import cv2
+import numpy as np
+
+from yorha.picture import Picture, PatternObject, ChangeDetector, Locator, Frame
+
+L = logging.getLogger(__name__)
+
+
+@pytest.fixture
+def reference(tmpdir):
+    """ reference image and templates """
+    rng = np.random.RandomState(0)
+    image = cv2.GaussianBlur((rng.rand(360, 640, 3) * 255).astype(np.uint8), (5, 5), 0)
+    targets = []
+    for i, (x, y) in enumerate([(40, 60), (300, 200), (500, 20)]):
+        path = os.path.join(str(tmpdir), 'target_%d.png' % i)
+        cv2.imwrite(path, image[y:y + 80, x:x + 100])
+        targets.append(path)
+    return image, targets
+
+
+def test_search_pattern(reference):
+    """ Test search pattern """
+    image, targets = reference
+    result, _ = Picture.search_pattern(image, targets[1])
+    assert result == (300, 200, 100, 80)
+
+
+def test_search_pattern_box(reference):
+    """ Test search pattern outside box """
+    image, targets = reference
+    result, _ = Picture.search_pattern(image, targets[1], box=(0, 0, 200, 200))
+    assert result is None
+
+
+def test_search_pattern_scale(reference):
+    """ Test search pattern on a downscaled frame """
+    image, targets = reference
+    small = cv2.resize(image, (320, 180), interpolation=cv2.INTER_AREA)
+    result, _ = Picture.search_pattern(small, targets[1], box=(200, 100, 300, 240), scale=0.5)
+    assert result == (300, 200, 100, 80)
+
+
+def test_search_patterns(reference):
+    """ Test search patterns """
+    image, targets = reference
+    results, _ = Picture.search_patterns(image, [PatternObject(t) for t in targets])
+    L.info([str(r) for r in results])
+    assert [r.box[:2] for r in results] == [(40, 60), (300, 200), (500, 20)]
+
+
+def test_search_patterns_first(reference):
+    """ Test search patterns first hit """
+    image, targets = reference
+    results, _ = Picture.search_patterns(image, [PatternObject(t) for t in targets], first=True)
+    assert len(results) == 1
+
+
+def test_change_detector(reference):
+    """ Test change detector """
+    image, _ = reference
+    detector = ChangeDetector()
+    before = detector.signature(image, (0, 0, 100, 100))
+    assert not detector.changed(before, detector.signature(image.copy(), (0, 0, 100, 100)))
+    changed = image.copy()
+    changed[10:40, 10:40] = 255
+    assert detector.changed(before, detector.signature(changed, (0, 0, 100, 100)))
+    assert not detector.changed(
+        detector.signature(image, (200, 200, 100, 100)), detector.signature(changed, (200, 200, 100, 100)))
+
+
+def test_locator(reference):
+    """ Test locator searches near the last hit """
+    image, targets = reference
+    locator = Locator()
+    assert locator.search_pattern(image, targets[1], key=('serial', ))[0] == (300, 200, 100, 80)
+    assert locator.search_pattern(image, targets[1], key=('serial', ))[0] == (300, 200, 100, 80)
+    assert locator.search_pattern(image, targets[1], box=(0, 0, 200, 200), key=('serial', ))[0] is None
+    stats = locator.statistics()
+    L.info(stats)
+    assert stats['local_hit'] == 1
+    assert stats['full_hit'] == 1
+    assert stats['full_miss'] == 1
+
+
+def test_frame(reference):
+    """ Test frame views are shared """
+    image, targets = reference
+    frame = Frame(1, cv2.imencode('.png', image)[1].tobytes())
+    assert frame.bgr.shape == (360, 640, 3)
+    assert frame.half.shape == (180, 320, 3)
+    assert frame.quarter.shape == (90, 160, 3)
+    assert frame.half is frame.half
+    assert frame.gray is frame.pyramid.gray
+    assert frame.crop((0, 0, 10, 20), gray=True).shape == (20, 10)
+    assert Picture.search_pattern(frame.pyramid, targets[2])[0] == (500, 20, 100, 80)
@@ -0,0 +1,58 @@
+""" Test minicap preview """
+import threading
+import urllib.request
+import pytest
+
+from yorha.picture import Frame
+from yorha.device.minicap.preview import MjpegServer, BOUNDARY
+
+JPEG = b'\xff\xd8' + b'\x00' * 64 + b'\xff\xd9'
+
+
+class FrameSource:
+    """ latest frame source """
+
+    def __init__(self):
+        self.frame = None
+        self.cond = threading.Condition()
+
+    def put(self, seq):
+        """ put frame """
+        with self.cond:
+            self.frame = Frame(seq, JPEG)
+            self.cond.notify_all()
+
+    def wait_frame(self, seq=0, _timeout=5):
+        """ wait frame """
+        with self.cond:
+            self.cond.wait_for(lambda: self.frame is not None and self.frame.seq > seq, timeout=_timeout)
+            return self.frame if self.frame is not None and self.frame.seq > seq else None
+
+
+@pytest.fixture
+def server():
+    """ mjpeg server """
+    source = FrameSource()
+    target = MjpegServer(source, fps=100)
+    target.start()
+    yield source, target
+    target.finish()
+
+
+def test_snapshot(server):
+    """ Test snapshot returns original jpeg """
+    source, target = server
+    source.put(1)
+    with urllib.request.urlopen('http://127.0.0.1:%d/snapshot.jpg' % target.get_port(), timeout=5) as res:
+        assert res.read() == JPEG
+
+
+def test_stream(server):
+    """ Test mjpeg stream """
+    source, target = server
+    source.put(1)
+    with urllib.request.urlopen('http://127.0.0.1:%d/' % target.get_port(), timeout=5) as res:
+        assert BOUNDARY in res.headers['Content-Type']
+        header = '--%s\r\nContent-Type: image/jpeg\r\nContent-Length: %d\r\n\r\n' % (BOUNDARY, len(JPEG))
+        assert res.read(len(header)) == header.encode()
+        assert res.read(len(JPEG)) == JPEG
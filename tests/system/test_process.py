@@ -0,0 +1,133 @@
+""" Test minicap process """
+import os
+import time
+import threading
+from queue import Queue
+import pytest
+
+import cv2
+import numpy as np
+
+from yorha.device.minicap.process import MinicapProc
+from yorha.device.minicap.stream import FrameData
+from yorha.exception import OcrError, PictureError
+from yorha.ocr import Ocr, TesseractEngine
+from yorha.picture import PatternObject
+
+
+class Stream:
+    """ minicap stream stand-in """
+
+    def __init__(self):
+        self.picture = Queue()
+
+    def send(self, value):
+        image = np.full((120, 160, 3), value, np.uint8)
+        self.picture.put(cv2.imencode('.jpg', image)[1].tobytes())
+
+    def send_image(self, image, scale):
+        data = FrameData(cv2.imencode('.png', image)[1].tobytes())
+        data.scale = scale
+        self.picture.put(data)
+
+
+@pytest.fixture
+def proc(tmpdir, monkeypatch):
+    """ minicap process without device """
+    monkeypatch.chdir(str(tmpdir))
+    proc = MinicapProc(Stream(), None)
+    thread = threading.Thread(target=proc.main_loop, daemon=True)
+    thread.start()
+    yield proc
+    proc._loop_flag = False
+    proc.module['stream'].send(0)
+    thread.join(1)
+
+
+def test_search_pattern_not_found(proc):
+    """ Test missing template is raised on the caller thread """
+    with pytest.raises(PictureError):
+        proc.search_pattern('missing.png', _timeout=0)
+    with pytest.raises(PictureError):
+        proc.search_patterns([PatternObject('missing.png')], _timeout=0)
+    assert proc._search is None
+
+
+def test_search_ocr_no_engine(proc, monkeypatch):
+    """ Test missing ocr engine is raised on the caller thread """
+    monkeypatch.setattr(TesseractEngine, 'available', staticmethod(lambda: False))
+    monkeypatch.setattr(Ocr, '_engine', None)
+    with pytest.raises(OcrError):
+        proc.search_ocr((0, 0, 10, 10), _timeout=0)
+    assert proc._search is None
+
+
+def test_wait_for_stable_quiet(proc):
+    """ Test stable on a static screen without new frames """
+    stream = proc.module['stream']
+    stream.send(0)
+    assert proc.wait_frame(0, 1) is not None
+
+    def _animate():
+        for value in range(40, 240, 40):
+            stream.send(value)
+            time.sleep(0.05)
+
+    thread = threading.Thread(target=_animate)
+    thread.start()
+    begin = time.time()
+    assert proc.wait_for_stable(duration=0.3, _timeout=3)
+    thread.join()
+    assert 0.3 <= time.time() - begin < 2
+    assert proc.wait_for_stable(duration=0.1, _timeout=1)
+
+
+def test_wait_for_stable_timeout(proc):
+    """ Test not stable while the screen keeps changing """
+    stream = proc.module['stream']
+    stream.send(0)
+    flag = threading.Event()
+
+    def _animate():
+        value = 0
+        while not flag.is_set():
+            value = (value + 60) % 240
+            stream.send(value)
+            time.sleep(0.05)
+
+    thread = threading.Thread(target=_animate)
+    thread.start()
+    try:
+        assert not proc.wait_for_stable(duration=0.5, _timeout=1)
+    finally:
+        flag.set()
+        thread.join()
+
+
+def test_search_pattern_frame_scale(proc, tmpdir):
+    """ Test frames are matched with the scale of their connection """
+    rng = np.random.RandomState(0)
+    image = cv2.GaussianBlur((rng.rand(360, 640, 3) * 255).astype(np.uint8), (5, 5), 0)
+    target = os.path.join(str(tmpdir), 'target.png')
+    cv2.imwrite(target, image[200:280, 300:400])
+    small = cv2.resize(image, (320, 180), interpolation=cv2.INTER_AREA)
+    threading.Timer(0.2, proc.module['stream'].send_image, (small, 0.5)).start()
+    assert proc.search_pattern(target, box=(200, 100, 300, 240), _timeout=2) == (300, 200, 100, 80)
+    assert proc.scale == 1.0
+
+
+def test_search_pattern_small_icon(proc, tmpdir):
+    """ Test a small icon on a full frame is found, while the signature does not move """
+    rng = np.random.RandomState(0)
+    blank = np.full((360, 640, 3), 128, np.uint8)
+    icon = cv2.GaussianBlur((rng.rand(24, 24, 3) * 255).astype(np.uint8), (3, 3), 0)
+    icon = (icon.astype(int) - icon.mean() + 128).clip(0, 255).astype(np.uint8)
+    image = blank.copy()
+    image[200:224, 300:324] = icon
+    assert not proc.detector.changed(proc.detector.signature(blank), proc.detector.signature(image))
+    target = os.path.join(str(tmpdir), 'icon.png')
+    cv2.imwrite(target, icon)
+    stream = proc.module['stream']
+    threading.Timer(0.2, stream.send_image, (blank, 1.0)).start()
+    threading.Timer(0.5, stream.send_image, (image, 1.0)).start()
+    assert proc.search_pattern(target, _timeout=2) == (300, 200, 24, 24)
@@ -0,0 +1,61 @@
+""" Test profile registry """
+import os
+import sys
+import json
+import pytest
+
+from yorha.device.profile import AndroidProp, ProfileRegistry
+from yorha.exception import AndroidError
+
+
+@pytest.fixture
+def host(tmpdir):
+    """ profile directory """
+    with open(os.path.join(str(tmpdir), '_base01.py'), 'w') as f:
+        f.write('from .android_base import AndroidProp\n\n\n'
+                'class _base01(AndroidProp):\n    WIDTH: str = \'1920\'\n    HEIGHT: str = \'1080\'\n')
+    with open(os.path.join(str(tmpdir), '_json01.json'), 'w') as f:
+        json.dump({'extends': 'base01', 'HEIGHT': 1200, 'ROTATE': '90'}, f)
+    with open(os.path.join(str(tmpdir), '_toml01.toml'), 'w') as f:
+        f.write('extends = "json01"\nLOCATE = "H"\n')
+    with open(os.path.join(str(tmpdir), '_loop01.json'), 'w') as f:
+        json.dump({'extends': 'loop02'}, f)
+    with open(os.path.join(str(tmpdir), '_loop02.json'), 'w') as f:
+        json.dump({'extends': 'loop01'}, f)
+    return str(tmpdir)
+
+
+def test_python_profile(host):
+    """ Test python profile """
+    path = list(sys.path)
+    profile = ProfileRegistry(host).get('base01')
+    assert issubclass(profile, AndroidProp)
+    assert profile.SERIAL == 'base01'
+    assert profile.WIDTH == '1920'
+    assert sys.path == path
+
+
+def test_data_profile(host):
+    """ Test data profile inheritance """
+    registry = ProfileRegistry(host)
+    profile = registry.get('json01')
+    assert (profile.WIDTH, profile.HEIGHT, profile.ROTATE) == ('1920', '1200', '90')
+    pytest.importorskip('tomllib')
+    profile = registry.get('toml01')
+    assert (profile.WIDTH, profile.HEIGHT, profile.LOCATE) == ('1920', '1200', 'H')
+
+
+def test_serial_profile(host):
+    """ Test profile per serial """
+    registry = ProfileRegistry(host)
+    first, second = registry.get('SERIAL01'), registry.get('SERIAL02')
+    assert first is registry.get('SERIAL01')
+    assert (first.SERIAL, second.SERIAL) == ('SERIAL01', 'SERIAL02')
+    assert first.__name__ == second.__name__ == '_0000000000000000'
+    assert registry.find('0000000000000000') is None
+
+
+def test_circular_profile(host):
+    """ Test circular profile """
+    with pytest.raises(AndroidError):
+        ProfileRegistry(host).get('loop01')
@@ -0,0 +1,75 @@
+""" Test performance report """
+import os
+import json
+
+from yorha.device.adb import Android
+from yorha.device.simulator.device import SimulatedDevice
+from yorha.report import PerfReport
+
+pytest_plugins = 'pytester'
+
+TEST_DEVICE = '''
+from yorha.device.adb import Android
+from yorha.device.simulator.device import SimulatedDevice
+
+
+def test_adb():
+    device = SimulatedDevice(latency=%s)
+    adb = Android('emulator-5554', executor=device)
+    for _ in range(3):
+        adb.getprop('ro.product.model')
+'''
+
+
+def test_counters(tmpdir):
+    """ Test per-test counters """
+    src = os.path.join(str(tmpdir), 'data.bin')
+    with open(src, 'wb') as f:
+        f.write(b'x' * 100)
+    adb = Android('emulator-5554', executor=SimulatedDevice())
+    report = PerfReport()
+    report.begin('test_a')
+    adb.push(src, '/data/local/tmp/data.bin')
+    adb.exec_out('cat /data/local/tmp/data.bin')
+    entry = report.end('test_a', 'passed', 0.1)
+    assert entry['adb_commands'] == 2
+    assert entry['push_bytes'] == 100 and entry['pull_bytes'] == 100
+    assert report.end('test_b', 'passed', 0.1) is None
+
+
+def test_compare():
+    """ Test regressions beyond the threshold """
+    report = PerfReport(threshold=0.2)
+    report.tests = {
+        'test_a': {'outcome': 'passed', 'adb_time': 1.3, 'frame_time': 0.5},
+        'test_b': {'outcome': 'passed', 'adb_time': 1.1, 'frame_time': 0.01},
+        'test_c': {'outcome': 'failed', 'adb_time': 9.0, 'frame_time': 0.0},
+    }
+    baseline = {'tests': {
+        'test_a': {'adb_time': 1.0, 'frame_time': 0.5},
+        'test_b': {'adb_time': 1.0, 'frame_time': 0.001},
+        'test_c': {'adb_time': 1.0, 'frame_time': 0.0},
+    }}
+    regressions = report.compare(baseline)
+    assert [(r['nodeid'], r['counter']) for r in regressions] == [('test_a', 'adb_time')]
+
+
+def test_plugin(testdir):
+    """ Test report and baseline options """
+    testdir.makepyfile(test_device=TEST_DEVICE % 0.0)
+    result = testdir.runpytest('-p', 'yorha.plugins', '--yorha-report', 'baseline.json')
+    result.assert_outcomes(passed=1)
+    with open(str(testdir.tmpdir.join('baseline.json'))) as f:
+        baseline = json.load(f)
+    entry = baseline['tests']['test_device.py::test_adb']
+    assert entry['adb_commands'] == 3 and entry['outcome'] == 'passed'
+
+    baseline['tests']['test_device.py::test_adb']['adb_time'] = 0.06
+    with open(str(testdir.tmpdir.join('baseline.json')), 'w') as f:
+        json.dump(baseline, f)
+    testdir.makepyfile(test_device=TEST_DEVICE % 0.05)
+    result = testdir.runpytest('-p', 'yorha.plugins', '--yorha-report', 'current.json', '--yorha-baseline',
+                               'baseline.json')
+    result.stdout.fnmatch_lines(['*yorha performance regressions*', '*test_adb : adb_time 0.060 ->*'])
+    with open(str(testdir.tmpdir.join('current.json'))) as f:
+        assert len(json.load(f)['regressions']) == 1
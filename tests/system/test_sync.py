@@ -0,0 +1,75 @@
+""" Test directory sync """
+import os
+import sys
+import pytest
+
+from yorha.device.adb import Android
+from yorha.device.simulator.device import LocalDevice
+from yorha.device.sync import DirectorySync
+from yorha.exception import AndroidError
+
+pytestmark = pytest.mark.skipif(sys.platform == 'win32', reason='device stand-in uses posix shell tools')
+
+
+@pytest.fixture
+def tree(tmpdir):
+    """ local directory """
+    local = os.path.join(str(tmpdir), 'local')
+    for name, size in [('a.txt', 10), ('sub/b.txt', 20), ('sub/deep/c.bin', 4096), ('large.bin', 300 * 1024)]:
+        path = os.path.join(local, *name.split('/'))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(os.urandom(size))
+    return local, os.path.join(str(tmpdir), 'remote')
+
+
+@pytest.mark.parametrize('checksum', [False, True])
+def test_push(tree, checksum):
+    """ Test push only changed files """
+    local, remote = tree
+    device = LocalDevice()
+    sync = DirectorySync(Android('emulator-5554', executor=device), checksum=checksum)
+    report = sync.push(local, remote)
+    assert sorted(report.transferred) == ['a.txt', 'large.bin', 'sub/b.txt', 'sub/deep/c.bin']
+    assert report.batches == 1
+    assert 'adb -s emulator-5554 push %s %s' % (os.path.join(local, 'large.bin'),
+                                                os.path.join(remote, 'large.bin')) in device.commands
+    report = sync.push(local, remote)
+    assert report.transferred == [] and report.skipped_bytes == 10 + 20 + 4096 + 300 * 1024
+    with open(os.path.join(local, 'a.txt'), 'wb') as f:
+        f.write(b'changed content')
+    os.remove(os.path.join(local, 'sub', 'b.txt'))
+    report = sync.push(local, remote, delete=True)
+    assert report.transferred == ['a.txt']
+    assert report.deleted == ['sub/b.txt']
+    assert not os.path.exists(os.path.join(remote, 'sub', 'b.txt'))
+
+
+def test_pull(tree):
+    """ Test pull only changed files """
+    remote, local = tree
+    for root, _, files in os.walk(remote):
+        for name in files:
+            os.utime(os.path.join(root, name), (1500000000, 1500000000))
+    sync = DirectorySync(Android('emulator-5554', executor=LocalDevice()))
+    report = sync.pull(remote, local)
+    assert len(report.transferred) == 4 and report.batches == 1
+    with open(os.path.join(local, 'sub', 'deep', 'c.bin'), 'rb') as f:
+        assert len(f.read()) == 4096
+    with open(os.path.join(local, 'stale.txt'), 'w') as f:
+        f.write('stale')
+    report = sync.pull(remote, local, delete=True)
+    assert report.transferred == [] and report.deleted == ['stale.txt']
+
+
+def test_missing_source(tree):
+    """ Test a missing source directory does not delete the destination """
+    local, remote = tree
+    sync = DirectorySync(Android('emulator-5554', executor=LocalDevice()))
+    sync.push(local, remote)
+    with pytest.raises(AndroidError):
+        sync.push(local + '_typo', remote, delete=True)
+    with pytest.raises(AndroidError):
+        sync.pull(remote + '_typo', local, delete=True)
+    assert len(sync.remote_listing(remote)) == 4 and len(sync.local_listing(local)) == 4
+    assert sync.remote_listing(remote + '_typo') == {}
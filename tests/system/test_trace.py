@@ -0,0 +1,63 @@
+""" Test trace module """
+import os
+import json
+import threading
+import pytest
+
+from yorha import trace
+from yorha.device.adb import Android
+from yorha.device.simulator.device import SimulatedDevice
+
+
+@pytest.fixture
+def tracing():
+    """ enable tracing """
+    trace.collect()
+    trace.enable()
+    yield
+    trace.disable()
+    trace.collect()
+
+
+def test_disabled():
+    """ Test nothing is recorded when disabled """
+    trace.collect()
+    with trace.span('noop', serial='emulator-5554'):
+        trace.instant('frame')
+    assert trace.collect() == []
+
+
+def test_export(tracing, tmpdir):
+    """ Test chrome trace export with threads """
+    since = trace.now()
+
+    def _work():
+        with trace.span('work', 'test', index=1):
+            trace.instant('frame', 'stream', size=10)
+
+    thread = threading.Thread(target=_work, name='yorha-worker')
+    thread.start()
+    thread.join()
+    with trace.span('main', 'test'):
+        pass
+    path = trace.export(os.path.join(str(tmpdir), 'trace.json'), since)
+    with open(path) as f:
+        events = json.load(f)['traceEvents']
+    names = {e['args']['name'] for e in events if e['ph'] == 'M'}
+    assert 'yorha-worker' in names
+    work = [e for e in events if e['name'] == 'work'][0]
+    frame = [e for e in events if e['name'] == 'frame'][0]
+    assert work['ph'] == 'X' and work['dur'] >= 0 and work['args'] == {'index': 1}
+    assert work['tid'] == frame['tid'] and work['ts'] <= frame['ts'] <= work['ts'] + work['dur']
+    assert trace.export(os.path.join(str(tmpdir), 'empty.json')) is None
+
+
+def test_adb_span(tracing):
+    """ Test adb commands are traced with serial """
+    adb = Android('emulator-5554', executor=SimulatedDevice())
+    adb.getprop('ro.product.model')
+    events = [e for _, _, buffer in trace.collect() for e in buffer]
+    spans = [e for e in events if e[1] == 'adb']
+    assert len(spans) == 1
+    assert spans[0][5]['serial'] == 'emulator-5554'
+    assert spans[0][5]['command'] == 'adb -s emulator-5554 shell getprop ro.product.model'
@@ -1,11 +1,11 @@
 """ YoRHa module : command line utility. """
-from typing import Optional, Union, List, Tuple
+from typing import Any, Optional, Union, List, Tuple
 import sys
 import traceback
 import subprocess
 from subprocess import TimeoutExpired, CalledProcessError
 
-from yorha import STRING_SET
+from yorha import STRING_SET, trace
 from yorha.exception import RunError
 
 TIMEOUT: int = 300
@@ -32,8 +32,8 @@ def run_bg(cmd: str, cwd: Optional[str] = None, shell: bool = False, debug: bool
         raise RunError(cmd, '', message='Raise CalledProcess Error : %s' % out)
 
 
-def run(cmd: str, cwd: Optional[str] = None, timeout: int = TIMEOUT, shell: bool = False,
-        debug: bool = False) -> Optional[Tuple[int, str, str]]:
+def run(cmd: str, cwd: Optional[str] = None, timeout: int = TIMEOUT, shell: bool = False, debug: bool = False,
+        data: Optional[bytes] = None, decode: bool = True) -> Optional[Tuple[int, Any, Any]]:
     """ Execute a child program in a new process.
 
     Arguments:
@@ -42,6 +42,8 @@ def run(cmd: str, cwd: Optional[str] = None, timeout: int = TIMEOUT, shell: bool
         timeout(int): Expired Time. default : 300.
         shell(bool): If true, the command will be executed through the shell.
         debug(bool): debug mode flag.
+        data(Optional[bytes]): Standard input data.
+        decode(bool): If false, standard out and standard error are returned as bytes.
 
     Raises:
         RunError: File not found.
@@ -50,36 +52,79 @@ def run(cmd: str, cwd: Optional[str] = None, timeout: int = TIMEOUT, shell: bool
     Returns:
         result(Tuple[int, str, str]): tuple result.
             - returncode(int): status code.
-            - out(str): Standard out.
-            - err(str): Standard error.
+            - out(str): Standard out. (bytes if decode is false)
+            - err(str): Standard error. (bytes if decode is false)
     """
-    fix_cmd = _shell(cmd) if shell else cmd
-    _debug(cmd, debug)
-    try:
-        proc = subprocess.run(
-            fix_cmd, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True, timeout=timeout, shell=shell)
-        proc.check_returncode()
-        out = proc.stdout
-        err = proc.stderr
-        returncode = proc.returncode
+    with trace.span('run', 'cmd', cmd=cmd):
+        fix_cmd = _shell(cmd) if shell else cmd
+        _debug(cmd, debug)
         try:
-            if isinstance(out, bytes):
-                out = str(out.decode('utf8'))
-            if isinstance(err, bytes):
-                err = str(err.decode('utf8'))
-        except UnicodeDecodeError:
-            output = '{0}: {1}\n{2}'.format(UnicodeDecodeError.__name__, ''.join(cmd), traceback.format_exc())
-            raise RunError(cmd, '', message='Raise UnicodeDecodeError : %s' % output)
-        return (returncode, out, err)
-    except TimeoutExpired:
-        out = '{0}: {1}\n{2}'.format(TimeoutExpired.__name__, ''.join(cmd), traceback.format_exc())
-        raise RunError(cmd, '', message='Raise TimeoutExpired : %s' % out)
-    except CalledProcessError:
-        out = '{0}: {1}\n{2}'.format(CalledProcessError.__name__, ''.join(cmd), traceback.format_exc())
-        raise RunError(cmd, '', message='Raise CalledProcess Error : %s' % out)
+            proc = subprocess.run(
+                fix_cmd, cwd=cwd, input=data, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True,
+                timeout=timeout, shell=shell)
+            proc.check_returncode()
+            out = proc.stdout
+            err = proc.stderr
+            returncode = proc.returncode
+            if not decode:
+                return (returncode, out, err)
+            try:
+                if isinstance(out, bytes):
+                    out = str(out.decode('utf8'))
+                if isinstance(err, bytes):
+                    err = str(err.decode('utf8'))
+            except UnicodeDecodeError:
+                output = '{0}: {1}\n{2}'.format(UnicodeDecodeError.__name__, ''.join(cmd), traceback.format_exc())
+                raise RunError(cmd, '', message='Raise UnicodeDecodeError : %s' % output)
+            return (returncode, out, err)
+        except TimeoutExpired:
+            out = '{0}: {1}\n{2}'.format(TimeoutExpired.__name__, ''.join(cmd), traceback.format_exc())
+            raise RunError(cmd, '', message='Raise TimeoutExpired : %s' % out)
+        except CalledProcessError:
+            out = '{0}: {1}\n{2}'.format(CalledProcessError.__name__, ''.join(cmd), traceback.format_exc())
+            raise RunError(cmd, '', message='Raise CalledProcess Error : %s' % out)
     return None
 
 
+class CommandExecutor:
+    """ Command Executor. Run commands as child programs. Replaceable by a stand-in, such as a simulated device.
+    """
+
+    def __repr__(self) -> str:
+        return 'CommandExecutor()'
+
+    def __str__(self) -> str:
+        return 'CommandExecutor [ ]'
+
+    def run(self, cmd: str, timeout: int = TIMEOUT, debug: bool = False, data: Optional[bytes] = None,
+            decode: bool = True) -> Optional[Tuple[int, Any, Any]]:
+        """ Execute a command. see run().
+
+        Arguments:
+            cmd(str): A string of program arguments.
+            timeout(int): Expired Time. default : 300.
+            debug(bool): debug mode flag.
+            data(Optional[bytes]): Standard input data.
+            decode(bool): If false, standard out and standard error are returned as bytes.
+
+        Raises:
+            RunError: Execution Error.
+
+        Returns:
+            result(Tuple[int, str, str]): returncode, standard out and standard error.
+        """
+        return run(cmd, timeout=timeout, debug=debug, data=data, decode=decode)
+
+    def run_bg(self, cmd: str, debug: bool = False) -> None:
+        """ Execute a command in background. see run_bg().
+
+        Arguments:
+            cmd(str): A string of program arguments.
+            debug(bool): debug mode flag.
+        """
+        run_bg(cmd, debug=debug)
+
+
 def _shell(cmd: str) -> Union[str, List[str]]:
     """ Shell Mode Check.
 
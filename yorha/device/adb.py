@@ -1,22 +1,21 @@
 """ YoRHa Plugins : Android Device Utility. """
-from typing import Optional, cast
+from typing import Any, Dict, List, Optional, Sequence, Tuple, cast
 import os
-import sys
+import re
 import time
 import logging
-import importlib
 
-from yorha.cmd import run, run_bg
-from yorha.exception import AndroidError
+from yorha import trace
+from yorha.cmd import CommandExecutor
+from yorha.exception import AndroidError, RunError
+from yorha.metrics import Metrics
 
-from yorha.device.profile import AndroidProp
-
-PROFILE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), 'profile'))
-if PROFILE_PATH not in sys.path:
-    sys.path.insert(0, PROFILE_PATH)
+from yorha.device.dumpsys import Dumpsys
+from yorha.device.profile import AndroidProp, PROFILE_PATH, get_registry
 
 TIMEOUT = 30
 ADB_ROOT = os.path.abspath(os.path.dirname(__file__))
+METRICS = Metrics('adb')
 logger = logging.getLogger(__name__)
 
 
@@ -26,11 +25,15 @@ class AndroidBase:
     Attributes:
         profile(str): android profile path. default: ~/profile.
         host(str): base path of profile. default: PROFILE_PATH.
+        executor(Optional[CommandExecutor]): command executor. default: child programs.
     """
 
-    def __init__(self, profile: str, host: str = PROFILE_PATH) -> None:
+    def __init__(self, profile: str, host: str = PROFILE_PATH, executor: Optional[CommandExecutor] = None) -> None:
         self.profile: AndroidProp
+        self.executor = executor if executor is not None else CommandExecutor()
         self.WIFI = False
+        self.forwards: Dict[str, str] = {}
+        self.transitions: List[Tuple[str, float]] = []
         self._set_profile(profile, host)
 
     def _set_profile(self, name: str, host: str) -> None:
@@ -44,31 +47,7 @@ class AndroidBase:
             AndroidError: 1. Device Not Found.
                           2. Pforile Data Not Found.
         """
-        class_name = '_' + name
-        if not os.path.exists(host):
-            logger.warning('Not Found. : %s', host)
-            raise AndroidError('Not Found. : %s' % host)
-        try:
-            prof = None
-            for fdn in os.listdir(host):
-                if fdn.endswith('.py') and (name in fdn):
-                    prof = fdn.replace('.py', '')
-            if prof is None:
-                logger.warning('The Profile is not found. : %s', name)
-                class_name = '_0000000000000000'
-                for fdn in os.listdir(PROFILE_PATH):
-                    if fdn.endswith('_0000000000000000.py'):
-                        prof = fdn.replace('.py', '')
-            sys.path.append(host)
-            module = importlib.import_module(str(prof))
-            self.profile = getattr(module, class_name)
-            self.profile.SERIAL = name
-            self.profile.TMP_PICTURE = '%s_TMP.png' % name
-            sys.path.remove(host)
-        except Exception as e:
-            sys.path.remove(host)
-            logger.debug('Raise Exception : %s', str(e))
-            raise AndroidError(str(e))
+        self.profile = get_registry(host).get(name)
 
     def get_profile(self) -> AndroidProp:
         """ Get Android Profile.
@@ -92,7 +71,7 @@ class AndroidBase:
         Returns:
             result(str): Standard out or Standard Error.
         """
-        result = run(cmd, timeout=timeout, debug=debug)
+        result = self.executor.run(cmd, timeout=timeout, debug=debug)
         if result:
             try:
                 if not result[0]:
@@ -112,7 +91,7 @@ class AndroidBase:
             cmd(str): A string of program arguments.
             debug(bool): Debug mode flag.
         """
-        run_bg(cmd, debug=debug)
+        self.executor.run_bg(cmd, debug=debug)
 
     def _target(self) -> str:
         """ Target Settings.
@@ -124,6 +103,14 @@ class AndroidBase:
             return '-s %s' % (self.profile.SERIAL)
         return '-s %s:%s' % (self.profile.IP, self.profile.PORT)
 
+    def target(self) -> List[str]:
+        """ Target arguments for an adb process started outside _adb. (logcat, shell session)
+
+        Returns:
+            target(List[str]): program arguments.
+        """
+        return self._target().split()
+
     def _adb(self, command: str, sync: bool = True, debug: bool = False, timeout: int = TIMEOUT) -> Optional[str]:
         """ Android Debug Bridge Command Run.
 
@@ -137,9 +124,11 @@ class AndroidBase:
             result(Optional[str]): adb result.
         """
         command = 'adb %s' % command
-        if sync:
-            return self.__exec(command, timeout, debug)
-        self.__exec_bg(command, debug)
+        with trace.span('adb', 'adb', serial=self.profile.SERIAL, command=command, sync=sync), \
+                METRICS.timer('command'):
+            if sync:
+                return self.__exec(command, timeout, debug)
+            self.__exec_bg(command, debug)
         return None
 
     def kill(self) -> str:
@@ -177,21 +166,54 @@ class AndroidBase:
             result(Optional[str]): adb push result.
         """
         command = 'push %s %s' % (src, dst)
-        return self.adb(command, timeout=timeout)
+        result = self.adb(command, timeout=timeout)
+        METRICS.counter('push_bytes').add(_transferred(result))
+        return result
 
-    def pull(self, src: str, dst: str, timeout: int = TIMEOUT) -> Optional[str]:
-        """ Call `adb -s {target} pull src dst`
+    def pull(self, src: str, dst: str, timeout: int = TIMEOUT, preserve: bool = False) -> Optional[str]:
+        """ Call `adb -s {target} pull [-a] src dst`
 
         Arguments:
             src(str): pull source path.
             dst(str): pull destination path.
             timeout(int): Expired Time. default: 30.
+            preserve(bool): preserve file timestamp and mode. default: False.
 
         Returns:
             result(Optional[str]): adb pull result.
         """
-        command = 'pull %s %s' % (src, dst)
-        return self.adb(command, timeout=timeout)
+        command = 'pull %s%s %s' % ('-a ' if preserve else '', src, dst)
+        result = self.adb(command, timeout=timeout)
+        METRICS.counter('pull_bytes').add(_transferred(result))
+        return result
+
+    def exec_out(self, command: str, data: Optional[bytes] = None, timeout: int = TIMEOUT) -> bytes:
+        """ Call `adb -s {target} exec-out command`, or `exec-in command` with standard input data.
+
+        Arguments:
+            command(str): A string of program arguments.
+            data(Optional[bytes]): standard input data. if set, exec-in is used.
+            timeout(int): Expired Time. default: 30.
+
+        Raises:
+            AndroidError: Execution Error.
+
+        Returns:
+            result(bytes): raw standard out.
+        """
+        command = 'adb %s %s %s' % (self._target(), 'exec-out' if data is None else 'exec-in', command)
+        try:
+            with trace.span('adb', 'adb', serial=self.profile.SERIAL, command=command, sync=True), \
+                    METRICS.timer('command'):
+                result = self.executor.run(command, timeout=timeout, data=data, decode=False)
+        except RunError as e:
+            logger.warning(str(e))
+            raise AndroidError(str(e))
+        if result is None:
+            raise AndroidError('Android Execute Failed. : %s' % command)
+        METRICS.counter('push_bytes').add(len(data or b''))
+        METRICS.counter('pull_bytes').add(len(result[1]))
+        return cast(bytes, result[1])
 
     def shell(self, command: str, sync: bool = True, debug: bool = False, timeout: int = TIMEOUT) -> Optional[str]:
         """ Call `adb -s {target} shell command`
@@ -230,42 +252,110 @@ class AndroidBase:
             return self._adb(command)
         return None
 
-    def usb(self) -> Optional[str]:
-        """ Call `adb usb`
+    def forward(self, command: str) -> Optional[str]:
+        """ Call `adb -s [SERIAL] forward command`, and record it to restore after transitions.
+
+        Arguments:
+            command(str): A string of program arguments. (local remote, --remove local, --remove-all)
 
         Returns:
-            result(Optional[str]): result
+            result(Optional[str]): adb result.
         """
-        if self.WIFI:
-            self.disconnect()
-            self.WIFI = False
-        return self.adb('usb')
+        result = self.adb('forward %s' % command)
+        args = command.split()
+        if args and args[0] == '--remove-all':
+            self.forwards = {}
+        elif args and args[0] == '--remove':
+            self.forwards.pop(args[-1], None)
+        elif len(args) >= 2:
+            self.forwards[args[-2]] = args[-1]
+        return result
+
+    def usb(self, timeout: int = TIMEOUT) -> Optional[str]:
+        """ Call `adb -s [IP Address]:[Port] usb`, and wait for the device on usb.
 
-    def tcpip(self) -> Optional[str]:
-        """ Call `adb tcpip [Port]`
+        Arguments:
+            timeout(int): Expired Time. default : 30.
 
         Returns:
-            result(Optional[str]): adb result.
+            result(Optional[str]): result
         """
         if not self.WIFI:
+            return None
+        begin = time.time()
+        result = self.adb('usb')
+        try:
             self.disconnect()
-            self.WIFI = True
-        command = 'tcpip %s' % (self.profile.PORT)
-        return self._adb(command)
+        except (AndroidError, RunError) as e:
+            logger.debug('Disconnect failed. : %s', e)
+        self.WIFI = False
+        self._settle('usb', begin, timeout)
+        return result
 
-    def root(self) -> Optional[str]:
-        """ Call `adb -s [SERIAL] root`
+    def tcpip(self, timeout: int = TIMEOUT) -> Optional[str]:
+        """ Call `adb -s [SERIAL] tcpip [Port]`, and connect the device.
+
+        Arguments:
+            timeout(int): Expired Time. default : 30.
 
         Returns:
             result(Optional[str]): adb result.
         """
-        logger.debug(str(self.adb('root')))
-        self.kill()
         if self.WIFI:
-            self.tcpip()
-        else:
-            self.usb()
-        return self.connect()
+            return None
+        begin = time.time()
+        result = self.adb('tcpip %s' % (self.profile.PORT))
+        self.WIFI = True
+        self._settle('tcpip', begin, timeout)
+        return result
+
+    def root(self, timeout: int = TIMEOUT) -> Optional[str]:
+        """ Call `adb -s [SERIAL] root`, and wait for the device.
+        Only the target device restarts adbd. The adb server is not restarted.
+
+        Arguments:
+            timeout(int): Expired Time. default : 30.
+
+        Returns:
+            result(Optional[str]): adb result.
+        """
+        begin = time.time()
+        result = self.adb('root')
+        logger.debug(str(result))
+        if result is not None and 'already running as root' in result:
+            return result
+        self._settle('root', begin, timeout)
+        return result
+
+    def _settle(self, name: str, begin: float, timeout: int) -> None:
+        """ Wait for the device after adbd restarts, and restore forwards.
+
+        Arguments:
+            name(str): transition name.
+            begin(float): transition start time.
+            timeout(int): Expired Time.
+
+        Raises:
+            AndroidError: the device does not come back.
+        """
+        deadline = begin + timeout
+        while True:
+            try:
+                if self.WIFI:
+                    result = self.connect()
+                    if result is not None and 'connected' not in result:
+                        raise AndroidError(result.strip())
+                self.wait(timeout=max(1, int(deadline - time.time())))
+                break
+            except (AndroidError, RunError) as e:
+                if time.time() >= deadline:
+                    raise AndroidError('Device is not back after %s. : %s' % (name, e))
+                time.sleep(0.5)
+        for local, remote in list(self.forwards.items()):
+            self.adb('forward %s %s' % (local, remote))
+        elapsed = time.time() - begin
+        self.transitions.append((name, elapsed))
+        logger.info('Transition %s : %s : %.3f sec', name, self._target(), elapsed)
 
     def remount(self) -> None:
         """ Call `adb -s [SERIAL] remount`
@@ -290,6 +380,19 @@ class AndroidBase:
         command = 'install -r %s' % (application)
         return self.adb(command, timeout=timeout)
 
+    def install_multiple(self, applications: Sequence[str], timeout: int = TIMEOUT) -> Optional[str]:
+        """ Call `adb -s [SERIAL] install-multiple -r [applications]`
+
+        Arguments:
+            applications(Sequence[str]): base and split apk paths.
+            timeout(int): Expired Time. default : 30.
+
+        Returns:
+            result(Optional[str]): result
+        """
+        command = 'install-multiple -r %s' % (' '.join(applications))
+        return self.adb(command, timeout=timeout)
+
     def uninstall(self, application: str, timeout: int = TIMEOUT) -> Optional[str]:
         """ Call `adb -s [SERIAL] uninstall [application]`
 
@@ -321,10 +424,21 @@ class Android:
     Attributes:
         profile(str): android profile path. default: ~/profile.
         host(str): base path of profile. default: PROFILE_PATH.
+        executor(Optional[CommandExecutor]): command executor. default: child programs.
     """
 
-    def __init__(self, profile: str, host: str = PROFILE_PATH) -> None:
-        self._adb = AndroidBase(profile, host)
+    def __init__(self, profile: str, host: str = PROFILE_PATH, executor: Optional[CommandExecutor] = None) -> None:
+        self._adb = AndroidBase(profile, host, executor)
+        self._touch: Optional[Any] = None
+        self.sysinfo = Dumpsys(self)
+
+    def set_touch(self, touch: Optional[Any]) -> None:
+        """ Set touch backend. tap and swipe are sent by the backend instead of `input`.
+
+        Arguments:
+            touch(Optional[MinitouchClient]): connected touch backend. None is `input` command.
+        """
+        self._touch = touch
 
     def get(self) -> AndroidProp:
         """ Get profile Dict.
@@ -334,6 +448,14 @@ class Android:
         """
         return self._adb.get_profile()
 
+    def target(self) -> List[str]:
+        """ Target arguments of adb. `-s [SERIAL]`, or `-s [IP Address]:[Port]` on tcpip.
+
+        Returns:
+            target(List[str]): program arguments.
+        """
+        return self._adb.target()
+
     def shell(self, command: str, sync: bool = True, debug: bool = False, timeout: int = TIMEOUT) -> Optional[str]:
         """ Call `adb -s [serial] shell command`
 
@@ -386,37 +508,63 @@ class Android:
         """
         return self._adb.shell('am start -n %s' % intent)
 
-    def push(self, src: str, dst: str) -> Optional[str]:
+    def push(self, src: str, dst: str, timeout: int = TIMEOUT) -> Optional[str]:
         """ Call `adb -s {target} push src dst`
 
         Arguments:
             src(str): push source path.
             dst(str): push destination path.
+            timeout(int): Expired Time. default: 30.
 
         Returns:
             result(Optional[str]): adb push result.
         """
-        return self._adb.push(src, dst)
+        return self._adb.push(src, dst, timeout)
 
-    def pull(self, src: str, dst: str) -> Optional[str]:
-        """ Call `adb -s {target} pull src dst`
+    def pull(self, src: str, dst: str, timeout: int = TIMEOUT, preserve: bool = False) -> Optional[str]:
+        """ Call `adb -s {target} pull [-a] src dst`
 
         Arguments:
             src(str): pull source path.
             dst(str): pull destination path.
+            timeout(int): Expired Time. default: 30.
+            preserve(bool): preserve file timestamp and mode. default: False.
 
         Returns:
             result(Optional[str]): adb pull result.
         """
-        return self._adb.pull(src, dst)
+        return self._adb.pull(src, dst, timeout, preserve)
+
+    def exec_out(self, command: str, data: Optional[bytes] = None, timeout: int = TIMEOUT) -> bytes:
+        """ Call `adb -s {target} exec-out command`, or `exec-in command` with standard input data.
 
-    def install(self, application: str) -> None:
+        Arguments:
+            command(str): A string of program arguments.
+            data(Optional[bytes]): standard input data.
+            timeout(int): Expired Time. default: 30.
+
+        Returns:
+            result(bytes): raw standard out.
+        """
+        return self._adb.exec_out(command, data, timeout)
+
+    def install(self, application: str, timeout: int = TIMEOUT) -> None:
         """ Call `adb -s [SERIAL] install -r [application]`
 
         Arguments:
             application(str): A string of application arguments.
+            timeout(int): Expired Time. default : 30.
         """
-        self._adb.install(application)
+        self._adb.install(application, timeout)
+
+    def install_multiple(self, applications: Sequence[str], timeout: int = TIMEOUT) -> None:
+        """ Call `adb -s [SERIAL] install-multiple -r [applications]`
+
+        Arguments:
+            applications(Sequence[str]): base and split apk paths.
+            timeout(int): Expired Time. default : 30.
+        """
+        self._adb.install_multiple(applications, timeout)
 
     def uninstall(self, application: str) -> None:
         """ Call `adb -s [SERIAL] uninstall [application]`
@@ -435,8 +583,48 @@ class Android:
         Returns:
             result(Optional[str]): adb result.
         """
-        command = 'forward %s' % command
-        return self._adb.adb(command)
+        return self._adb.forward(command)
+
+    def root(self, timeout: int = TIMEOUT) -> Optional[str]:
+        """ Call `adb -s [SERIAL] root`. Other devices on the adb server are not affected.
+
+        Arguments:
+            timeout(int): Expired Time. default : 30.
+
+        Returns:
+            result(Optional[str]): adb result.
+        """
+        return self._adb.root(timeout)
+
+    def tcpip(self, timeout: int = TIMEOUT) -> Optional[str]:
+        """ Switch the device to tcpip, and connect it.
+
+        Arguments:
+            timeout(int): Expired Time. default : 30.
+
+        Returns:
+            result(Optional[str]): adb result.
+        """
+        return self._adb.tcpip(timeout)
+
+    def usb(self, timeout: int = TIMEOUT) -> Optional[str]:
+        """ Switch the device to usb.
+
+        Arguments:
+            timeout(int): Expired Time. default : 30.
+
+        Returns:
+            result(Optional[str]): adb result.
+        """
+        return self._adb.usb(timeout)
+
+    def transitions(self) -> List[Tuple[str, float]]:
+        """ Get elapsed time of transitions. (root, tcpip, usb)
+
+        Returns:
+            transitions(List[Tuple[str, float]]): transition name and elapsed time. (sec)
+        """
+        return list(self._adb.transitions)
 
     def input(self, command: str, sync: bool = True, debug: bool = False) -> Optional[str]:
         """ Call `adb -s [SERIAL] shell input command`
@@ -450,6 +638,7 @@ class Android:
             result(Optional[str]): adb result or None.
         """
         command = 'input %s' % command
+        self.sysinfo.invalidate()
         return self._adb.shell(command, sync, debug)
 
     def am(self, command: str, sync: bool = True) -> Optional[str]:
@@ -463,6 +652,7 @@ class Android:
             result(Optional[str]): adb result.
         """
         command = 'am %s' % command
+        self.sysinfo.invalidate()
         return self._adb.shell(command, sync=sync)
 
     def tap(self, x: int, y: int) -> Optional[str]:
@@ -475,9 +665,31 @@ class Android:
         Returns:
             result(Optional[str]): adb result.
         """
+        if self._touch is not None:
+            self._touch.tap(x, y)
+            return None
         command = 'tap %d %d' % (x, y)
         return self.input(command, sync=True)
 
+    def swipe(self, x1: int, y1: int, x2: int, y2: int, duration: int = 300) -> Optional[str]:
+        """ Call `adb -s [SERIAL] shell input swipe x1 y1 x2 y2 duration`
+
+        Arguments:
+            x1(int): start position x.
+            y1(int): start position y.
+            x2(int): end position x.
+            y2(int): end position y.
+            duration(int): swipe duration. (msec)
+
+        Returns:
+            result(Optional[str]): adb result.
+        """
+        if self._touch is not None:
+            self._touch.swipe(x1, y1, x2, y2, duration)
+            return None
+        command = 'swipe %d %d %d %d %d' % (x1, y1, x2, y2, duration)
+        return self.input(command, sync=True)
+
     def invoke(self, app: str) -> Optional[str]:
         """ Call `adb -s [SERIAL] shell am start -n [app]`
 
@@ -587,13 +799,17 @@ class Android:
         Returns:
             result(int): adb result.
         """
-        result = self.dumpsys('input')
-        if result is None:
-            return None
-        if isinstance(result, bytes):
-            result = result.encode()
-        result_code = result.split('\n')
-        for line in result_code:
-            if line.find('SurfaceOrientation') >= 0:
-                return int(line.split(':')[1])
-        return None
+        return self.sysinfo.orientation(refresh=True)
+
+
+def _transferred(result: Optional[str]) -> int:
+    """ Transferred bytes in the result of adb push / pull.
+
+    Arguments:
+        result(Optional[str]): adb result. (`... (12345 bytes in 0.010s)`)
+
+    Returns:
+        size(int): transferred bytes. 0 if unknown.
+    """
+    match = re.search(r'\((\d+) bytes', result or '')
+    return int(match.group(1)) if match else 0
@@ -0,0 +1,295 @@
+""" YoRHa Plugins : Android Application Installer Utility. """
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import os
+import re
+import time
+import struct
+import hashlib
+import logging
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from yorha.device.adb import Android, TIMEOUT
+from yorha.exception import AndroidError, RunError
+
+RATE = 2 * 1024 * 1024
+WORKERS = 8
+ATTR_VERSION_CODE = 0x0101021b
+ATTR_VERSION_NAME = 0x0101021c
+logger = logging.getLogger(__name__)
+
+
+class ApkInfo:
+    """ Application Package Information. (AndroidManifest.xml)
+    Attributes:
+        path(str): apk filepath.
+        package(str): package name.
+        version_code(int): versionCode.
+        version_name(str): versionName.
+        split(Optional[str]): split name. None is the base apk.
+    """
+
+    def __init__(self, path: str, package: str, version_code: int, version_name: str = '',
+                 split: Optional[str] = None) -> None:
+        self.path = path
+        self.package = package
+        self.version_code = version_code
+        self.version_name = version_name
+        self.split = split
+
+    def __repr__(self) -> str:
+        return 'ApkInfo()'
+
+    def __str__(self) -> str:
+        return 'ApkInfo [ Package = %s, VersionCode = %d, VersionName = %s, Split = %s ]' % (
+            self.package, self.version_code, self.version_name, self.split)
+
+    @classmethod
+    def load(cls, path: str) -> 'ApkInfo':
+        """ Read the binary manifest of the apk.
+        Arguments:
+            path(str): apk filepath.
+        Raises:
+            AndroidError: invalid apk.
+        Returns:
+            info(ApkInfo): package information.
+        """
+        try:
+            with zipfile.ZipFile(path) as apk:
+                attrs = manifest_attributes(apk.read('AndroidManifest.xml'))
+        except (OSError, KeyError, zipfile.BadZipFile, struct.error) as e:
+            raise AndroidError('Invalid apk. : %s : %s' % (path, e))
+        if 'package' not in attrs:
+            raise AndroidError('Package name is not found. : %s' % path)
+        return cls(path, str(attrs['package']), int(attrs.get('versionCode', 0)), str(attrs.get('versionName', '')),
+                   attrs.get('split'))
+
+
+def manifest_attributes(data: bytes) -> Dict[str, Any]:
+    """ Attributes of the manifest element in binary xml. (AXML)
+    Arguments:
+        data(bytes): AndroidManifest.xml in apk.
+    Returns:
+        attrs(Dict[str, Any]): attribute values by name. strings, or integers.
+    """
+    strings: List[str] = []
+    resources: List[int] = []
+    offset = struct.unpack_from('<HH', data, 0)[1]
+    while offset + 8 <= len(data):
+        chunk, header, size = struct.unpack_from('<HHI', data, offset)
+        if chunk == 0x0001:
+            strings = _string_pool(data, offset)
+        elif chunk == 0x0180:
+            resources = list(struct.unpack_from('<%dI' % ((size - header) // 4), data, offset + header))
+        elif chunk == 0x0102:
+            name = struct.unpack_from('<I', data, offset + 20)[0]
+            if strings[name] == 'manifest':
+                return _attributes(data, offset, header, strings, resources)
+        if size <= 0:
+            break
+        offset += size
+    return {}
+
+
+def _string_pool(data: bytes, offset: int) -> List[str]:
+    """ Read string pool chunk.
+    Arguments:
+        data(bytes): binary xml.
+        offset(int): chunk offset.
+    Returns:
+        strings(List[str]): strings.
+    """
+    _, header, _, count, _, flags, start = struct.unpack_from('<HHIIIII', data, offset)
+    offsets = struct.unpack_from('<%dI' % count, data, offset + header)
+    utf8 = bool(flags & 0x100)
+    strings = []
+    for position in offsets:
+        cursor = offset + start + position
+        if utf8:
+            cursor += 2 if data[cursor] & 0x80 else 1
+            length = data[cursor]
+            if length & 0x80:
+                length = ((length & 0x7f) << 8) | data[cursor + 1]
+                cursor += 1
+            strings.append(data[cursor + 1:cursor + 1 + length].decode('utf-8', 'replace'))
+        else:
+            length = struct.unpack_from('<H', data, cursor)[0]
+            if length & 0x8000:
+                length = ((length & 0x7fff) << 16) | struct.unpack_from('<H', data, cursor + 2)[0]
+                cursor += 2
+            strings.append(data[cursor + 2:cursor + 2 + length * 2].decode('utf-16-le', 'replace'))
+    return strings
+
+
+def _attributes(data: bytes, offset: int, header: int, strings: List[str], resources: List[int]) -> Dict[str, Any]:
+    """ Read attributes of start element chunk.
+    Arguments:
+        data(bytes): binary xml.
+        offset(int): chunk offset.
+        header(int): chunk header size.
+        strings(List[str]): string pool.
+        resources(List[int]): resource map. resource id by string index.
+    Returns:
+        attrs(Dict[str, Any]): attribute values by name.
+    """
+    start, size, count = struct.unpack_from('<HHH', data, offset + header + 8)
+    names = {ATTR_VERSION_CODE: 'versionCode', ATTR_VERSION_NAME: 'versionName'}
+    attrs: Dict[str, Any] = {}
+    for i in range(count):
+        cursor = offset + header + start + i * size
+        _, name, raw, _, _, kind, value = struct.unpack_from('<IIIHBBI', data, cursor)
+        key = strings[name] if name < len(strings) and strings[name] else ''
+        if name < len(resources) and resources[name] in names:
+            key = names[resources[name]]
+        if raw != 0xFFFFFFFF:
+            attrs[key] = strings[raw]
+        elif kind == 0x03:
+            attrs[key] = strings[value]
+        else:
+            attrs[key] = value
+    return attrs
+
+
+class InstallResult:
+    """ Application Install Result.
+    Attributes:
+        serial(str): android serial.
+        package(str): package name.
+    """
+
+    def __init__(self, serial: str, package: str) -> None:
+        self.serial = serial
+        self.package = package
+        self.installed: Optional[int] = None
+        self.version_code = 0
+        self.skipped = False
+        self.elapsed = 0.0
+        self.error: Optional[str] = None
+
+    def __repr__(self) -> str:
+        return 'InstallResult()'
+
+    def __str__(self) -> str:
+        return 'InstallResult [ Serial = %s, Package = %s, %s -> %s, Skipped = %s, Elapsed = %.3f, Error = %s ]' % (
+            self.serial, self.package, self.installed, self.version_code, self.skipped, self.elapsed, self.error)
+
+
+class ApkInstaller:
+    """ Install applications only on devices which do not have the same build.
+    The local versionCode is compared with `dumpsys package`, and the md5 of the base apk optionally.
+
+    Attributes:
+        checksum(bool): also compare md5 of the installed base apk. (same versionCode development builds)
+        workers(int): max parallel devices.
+        rate(int): expected install throughput for the timeout. (bytes/sec)
+    """
+
+    def __init__(self, checksum: bool = False, workers: int = WORKERS, rate: int = RATE) -> None:
+        self.checksum = checksum
+        self.workers = workers
+        self.rate = rate
+        self._cache: Dict[Tuple[str, int, int], Tuple[ApkInfo, str]] = {}
+
+    def inspect(self, apks: Sequence[str]) -> Tuple[ApkInfo, str]:
+        """ Inspect the base apk. cached by path, size and mtime.
+        Arguments:
+            apks(Sequence[str]): base and split apk paths.
+        Raises:
+            AndroidError: base apk is not found.
+        Returns:
+            result(Tuple[ApkInfo, str]): base package information, and md5 of the base apk.
+        """
+        for path in apks:
+            stat = os.stat(path)
+            key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+            if key not in self._cache:
+                md5 = hashlib.md5()
+                with open(path, 'rb') as f:
+                    for chunk in iter(lambda: f.read(1 << 20), b''):
+                        md5.update(chunk)
+                self._cache[key] = (ApkInfo.load(path), md5.hexdigest())
+            if self._cache[key][0].split is None:
+                return self._cache[key]
+        raise AndroidError('Base apk is not found. : %s' % ', '.join(apks))
+
+    def installed(self, adb: Android, package: str) -> Tuple[Optional[int], Optional[str]]:
+        """ Installed versionCode, and md5 of the installed base apk if checksum is enabled.
+        Arguments:
+            adb(Android): android adaptor object.
+            package(str): package name.
+        Returns:
+            result(Tuple[Optional[int], Optional[str]]): versionCode and md5. None if not installed.
+        """
+        result = adb.shell('dumpsys package %s | grep versionCode' % package) or ''
+        match = re.search(r'versionCode=(\d+)', result)
+        if match is None:
+            return None, None
+        checksum = None
+        if self.checksum:
+            result = adb.shell('md5sum $(pm path %s | grep base.apk | cut -d: -f2)' % package) or ''
+            checksum = result.split()[0].lower() if result.split() else None
+        return int(match.group(1)), checksum
+
+    def timeout(self, apks: Sequence[str]) -> int:
+        """ Install timeout by apk size.
+        Arguments:
+            apks(Sequence[str]): apk paths.
+        Returns:
+            timeout(int): Expired Time. (sec)
+        """
+        return TIMEOUT + int(sum([os.path.getsize(path) for path in apks]) / self.rate)
+
+    def install(self, adb: Android, apks: Sequence[str], force: bool = False) -> InstallResult:
+        """ Install the application if the device does not have the same build.
+        Arguments:
+            adb(Android): android adaptor object.
+            apks(Sequence[str]): apk path, or base and split apk paths.
+            force(bool): install without comparing.
+        Raises:
+            AndroidError: install failed.
+        Returns:
+            result(InstallResult): install result.
+        """
+        begin = time.time()
+        info, checksum = self.inspect(apks)
+        result = InstallResult(adb.get().SERIAL, info.package)
+        result.version_code = info.version_code
+        if not force:
+            result.installed, current = self.installed(adb, info.package)
+            if result.installed == info.version_code and (not self.checksum or current == checksum):
+                result.skipped = True
+                result.elapsed = time.time() - begin
+                logger.info(result)
+                return result
+        if len(apks) == 1:
+            adb.install(apks[0], self.timeout(apks))
+        else:
+            adb.install_multiple(apks, self.timeout(apks))
+        result.elapsed = time.time() - begin
+        logger.info(result)
+        return result
+
+    def install_all(self, devices: Sequence[Android], apks: Sequence[str], force: bool = False) -> List[InstallResult]:
+        """ Install the application on the devices in parallel. A failure of one device does not stop the others.
+        Arguments:
+            devices(Sequence[Android]): android adaptor objects.
+            apks(Sequence[str]): apk path, or base and split apk paths.
+            force(bool): install without comparing.
+        Returns:
+            results(List[InstallResult]): install results in the order of devices.
+        """
+        info, _ = self.inspect(apks)
+
+        def _install(adb: Android) -> InstallResult:
+            try:
+                return self.install(adb, apks, force)
+            except (AndroidError, RunError) as e:
+                logger.warning('Install failed. : %s : %s', adb.get().SERIAL, e)
+                result = InstallResult(adb.get().SERIAL, info.package)
+                result.error = str(e)
+                return result
+
+        if not devices:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(devices))) as executor:
+            return list(executor.map(_install, devices))
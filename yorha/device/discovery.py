@@ -0,0 +1,246 @@
+""" YoRHa Plugins : Android Device Discovery Utility. """
+from typing import Callable, Dict, List, Optional
+import socket
+import logging
+import threading
+
+from yorha.device.adb import Android
+from yorha.device.factory import AndroidFactory
+from yorha.exception import AndroidError
+
+ADB_HOST = '127.0.0.1'
+ADB_PORT = 5037
+RETRY = 1.0
+logger = logging.getLogger(__name__)
+
+
+class DeviceInfo:
+    """ Tracked Device Information.
+    Attributes:
+        serial(str): android serial.
+        state(str): device state. (device, offline, unauthorized, ...)
+        properties(Dict[str, str]): long format properties. (product, model, device, transport_id)
+    """
+
+    def __init__(self, serial: str, state: str, properties: Optional[Dict[str, str]] = None) -> None:
+        self.serial = serial
+        self.state = state
+        self.properties = properties or {}
+
+    def __repr__(self) -> str:
+        return 'DeviceInfo()'
+
+    def __str__(self) -> str:
+        return 'DeviceInfo [ Serial = %s, State = %s, Transport = %s ]' % (self.serial, self.state, self.transport)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, DeviceInfo) and (self.serial, self.state, self.properties) == (
+            other.serial, other.state, other.properties)
+
+    @property
+    def transport(self) -> Optional[str]:
+        """ Transport id.
+        """
+        return self.properties.get('transport_id')
+
+    @property
+    def online(self) -> bool:
+        """ Device is ready.
+        """
+        return self.state == 'device'
+
+    @classmethod
+    def parse(cls, line: str) -> Optional['DeviceInfo']:
+        """ Parse a line of `adb devices -l`.
+        Arguments:
+            line(str): device line.
+        Returns:
+            info(Optional[DeviceInfo]): device information, or None for an empty line.
+        """
+        args = line.split()
+        if len(args) < 2:
+            return None
+        properties = dict([arg.split(':', 1) for arg in args[2:] if ':' in arg])
+        return cls(args[0], args[1], properties)
+
+
+Listener = Callable[[str, DeviceInfo], None]
+
+
+class DeviceTracker:
+    """ Push-based device discovery by `host:track-devices-l` of the adb server.
+    Listeners are called with ('attach' | 'detach' | 'change', DeviceInfo) on the tracker thread.
+
+    Attributes:
+        host(str): adb server host. default : 127.0.0.1.
+        port(int): adb server port. default : 5037.
+        retry(float): reconnect interval. (sec)
+    """
+
+    def __init__(self, host: str = ADB_HOST, port: int = ADB_PORT, retry: float = RETRY) -> None:
+        self.host = host
+        self.port = port
+        self.retry = retry
+        self.listeners: List[Listener] = []
+        self._devices: Dict[str, DeviceInfo] = {}
+        self._adaptors: Dict[str, Android] = {}
+        self._cond = threading.Condition()
+        self._flag = threading.Event()
+        self._socket: Optional[socket.socket] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def __repr__(self) -> str:
+        return 'DeviceTracker()'
+
+    def __str__(self) -> str:
+        return 'DeviceTracker [ Host = %s, Port = %d, Devices = %d ]' % (self.host, self.port, len(self._devices))
+
+    def add_listener(self, listener: Listener) -> None:
+        """ Add event listener.
+        Arguments:
+            listener(Callable[[str, DeviceInfo], None]): called with event name and device information.
+        """
+        self.listeners.append(listener)
+
+    def start(self) -> None:
+        """ start tracker thread.
+        """
+        self._flag.clear()
+        self._thread = threading.Thread(target=self.main_loop, name='yorha-discovery', daemon=True)
+        self._thread.start()
+
+    def finish(self) -> None:
+        """ finish tracker thread.
+        """
+        self._flag.set()
+        if self._socket is not None:
+            try:
+                self._socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout=self.retry + 1)
+            self._thread = None
+
+    def devices(self, state: Optional[str] = None) -> Dict[str, DeviceInfo]:
+        """ Get tracked devices.
+        Arguments:
+            state(Optional[str]): filter by state. default : all.
+        Returns:
+            devices(Dict[str, DeviceInfo]): device information by serial.
+        """
+        with self._cond:
+            return {s: d for s, d in self._devices.items() if state is None or d.state == state}
+
+    def wait_for(self, serial: str, state: str = 'device', timeout: float = 30) -> bool:
+        """ Wait until the device is in the state.
+        Arguments:
+            serial(str): android serial.
+            state(str): device state. default : device.
+            timeout(float): timeout. (sec)
+        Returns:
+            result(bool): true if the device is in the state, false on timeout.
+        """
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: serial in self._devices and self._devices[serial].state == state, timeout=timeout)
+
+    def adaptor(self, serial: str) -> Android:
+        """ Get android adaptor of the tracked device. created once by AndroidFactory.
+        Arguments:
+            serial(str): android serial.
+        Raises:
+            AndroidError: the device is not online.
+        Returns:
+            adaptor(Android): android adaptor object.
+        """
+        with self._cond:
+            info = self._devices.get(serial)
+            if info is None or not info.online:
+                raise AndroidError('Device is not online. : %s' % serial)
+            if serial not in self._adaptors:
+                self._adaptors[serial] = AndroidFactory.create(serial)
+            return self._adaptors[serial]
+
+    def update(self, payload: str) -> None:
+        """ Apply a device list, and emit events.
+        Arguments:
+            payload(str): device list of `adb devices -l`.
+        """
+        current = {}
+        for line in payload.splitlines():
+            info = DeviceInfo.parse(line)
+            if info is not None:
+                current[info.serial] = info
+        events = []
+        with self._cond:
+            for serial, info in current.items():
+                previous = self._devices.get(serial)
+                if previous is None:
+                    events.append(('attach', info))
+                elif previous != info:
+                    events.append(('change', info))
+            for serial, info in self._devices.items():
+                if serial not in current:
+                    events.append(('detach', info))
+                    self._adaptors.pop(serial, None)
+            self._devices = current
+            self._cond.notify_all()
+        for event, info in events:
+            logger.info('Device %s : %s', event, info)
+            for listener in self.listeners:
+                try:
+                    listener(event, info)
+                except Exception as e:  # pylint: disable=W0703
+                    logger.warning('Device listener error : %s', e)
+
+    def main_loop(self) -> None:
+        """ Tracker Main Loop. Reconnect to the adb server until finished.
+        Devices are regarded as detached while the adb server is not reachable.
+        """
+        while not self._flag.is_set():
+            try:
+                self._track()
+            except OSError as e:
+                logger.debug('Adb server is not reachable. : %s', e)
+            except AndroidError as e:
+                logger.warning(str(e))
+            if self._devices and not self._flag.is_set():
+                self.update('')
+            self._flag.wait(self.retry)
+
+    def _track(self) -> None:
+        """ Subscribe track-devices, and apply each device list.
+        Raises:
+            AndroidError: adb server refused the request.
+        """
+        with socket.create_connection((self.host, self.port), timeout=self.retry) as sock:
+            self._socket = sock
+            request = b'host:track-devices-l'
+            sock.sendall(b'%04x%s' % (len(request), request))
+            status = _recv(sock, 4)
+            if status != b'OKAY':
+                raise AndroidError('Adb server refused track-devices. : %s' % status.decode('ascii', 'replace'))
+            sock.settimeout(None)
+            while not self._flag.is_set():
+                length = _recv(sock, 4)
+                if len(length) < 4:
+                    return
+                self.update(_recv(sock, int(length, 16)).decode('utf-8', 'replace'))
+
+
+def _recv(sock: socket.socket, length: int) -> bytes:
+    """ Receive exact length.
+    Arguments:
+        sock(socket.socket): connected socket.
+        length(int): length.
+    Returns:
+        data(bytes): received data. shorter on EOF.
+    """
+    data = b''
+    while len(data) < length:
+        chunk = sock.recv(length - len(data))
+        if not chunk:
+            break
+        data += chunk
+    return data
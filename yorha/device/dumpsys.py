@@ -0,0 +1,246 @@
+""" YoRHa Plugins : Android Dumpsys Utility. """
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import re
+import time
+import logging
+import threading
+
+TTL = 1.0
+logger = logging.getLogger(__name__)
+
+
+class DumpsysNode:
+    """ Dumpsys Output Tree Node. Children are parsed from the indentation on first access.
+    Attributes:
+        text(str): line text without indentation. empty for the root.
+        lines(List[str]): raw lines of the subtree.
+    """
+
+    def __init__(self, text: str, lines: List[str]) -> None:
+        self.text = text
+        self._lines = lines
+        self._children: Optional[List['DumpsysNode']] = None
+
+    def __repr__(self) -> str:
+        return 'DumpsysNode()'
+
+    def __str__(self) -> str:
+        return 'DumpsysNode [ Text = %s, Lines = %d ]' % (self.text, len(self._lines))
+
+    @classmethod
+    def parse(cls, output: str) -> 'DumpsysNode':
+        """ Root node of dumpsys output.
+        Arguments:
+            output(str): dumpsys output.
+        Returns:
+            root(DumpsysNode): root node.
+        """
+        return cls('', [line for line in output.replace('\r', '').split('\n') if line.strip()])
+
+    @property
+    def children(self) -> List['DumpsysNode']:
+        """ Child nodes. lines indented deeper than the first line belong to it.
+        """
+        if self._children is None:
+            children: List[DumpsysNode] = []
+            base = -1
+            for line in self._lines:
+                indent = len(line) - len(line.lstrip())
+                if base < 0 or indent <= base:
+                    base = indent if base < 0 else min(base, indent)
+                    children.append(DumpsysNode(line.strip(), []))
+                else:
+                    children[-1]._lines.append(line)
+            self._children = children
+        return self._children
+
+    def walk(self) -> Iterator['DumpsysNode']:
+        """ Iterate descendant nodes in depth first order.
+        Returns:
+            nodes(Iterator[DumpsysNode]): descendant nodes.
+        """
+        for child in self.children:
+            yield child
+            for node in child.walk():
+                yield node
+
+    def find(self, key: str) -> Optional['DumpsysNode']:
+        """ Find the first descendant node whose text contains the key.
+        Arguments:
+            key(str): search key.
+        Returns:
+            node(Optional[DumpsysNode]): found node, or None.
+        """
+        for node in self.walk():
+            if key in node.text:
+                return node
+        return None
+
+    def child(self, key: str) -> Optional['DumpsysNode']:
+        """ Find the direct child whose text starts with the key. (section)
+        Arguments:
+            key(str): section name.
+        Returns:
+            node(Optional[DumpsysNode]): found node, or None.
+        """
+        for node in self.children:
+            if node.text.startswith(key):
+                return node
+        return None
+
+    def value(self, key: str) -> Optional[str]:
+        """ Value of `key=value` or `key: value` in the subtree.
+        Arguments:
+            key(str): field name.
+        Returns:
+            value(Optional[str]): field value, or None.
+        """
+        pattern = re.compile(r'(?:^|[\s{,])%s\s*[=:]\s*(\S+)' % re.escape(key))
+        for node in [self] + list(self.walk()):
+            match = pattern.search(node.text)
+            if match:
+                return match.group(1).rstrip(',')
+        return None
+
+
+class Dumpsys:
+    """ Structured dumpsys with cache per command.
+    Accessors run the narrowest command with a device side filter, and parse only the matched lines.
+
+    Attributes:
+        adb(Android): android adaptor object.
+        ttl(float): cache lifetime. (sec) 0 is no cache.
+    """
+
+    def __init__(self, adb: Any, ttl: float = TTL) -> None:
+        self.adb = adb
+        self.ttl = ttl
+        self._cache: Dict[Tuple[str, Optional[str]], Tuple[float, DumpsysNode]] = {}
+        self._mutex = threading.Lock()
+
+    def __repr__(self) -> str:
+        return 'Dumpsys()'
+
+    def __str__(self) -> str:
+        return 'Dumpsys [ TTL = %s, Cached = %d ]' % (self.ttl, len(self._cache))
+
+    def get(self, category: str, grep: Optional[str] = None, refresh: bool = False) -> DumpsysNode:
+        """ Get dumpsys tree of the category.
+        Arguments:
+            category(str): dumpsys category. (with arguments)
+            grep(Optional[str]): extended regular expression filtered on the device.
+            refresh(bool): ignore cache.
+        Returns:
+            root(DumpsysNode): root node.
+        """
+        key = (category, grep)
+        now = time.time()
+        with self._mutex:
+            cached = self._cache.get(key)
+        if cached is not None and not refresh and now - cached[0] < self.ttl:
+            return cached[1]
+        command = 'dumpsys %s' % category
+        if grep is not None:
+            command += " | grep -E '%s'" % grep
+        root = DumpsysNode.parse(self.adb.shell(command) or '')
+        with self._mutex:
+            self._cache[key] = (now, root)
+        return root
+
+    def invalidate(self, category: Optional[str] = None) -> None:
+        """ Discard cache.
+        Arguments:
+            category(Optional[str]): dumpsys category. default : all.
+        """
+        with self._mutex:
+            if category is None:
+                self._cache = {}
+            else:
+                self._cache = {k: v for k, v in self._cache.items() if k[0] != category}
+
+    def orientation(self, refresh: bool = False) -> Optional[int]:
+        """ Surface orientation. (0 - 3)
+        Arguments:
+            refresh(bool): ignore cache.
+        Returns:
+            orientation(Optional[int]): orientation, or None.
+        """
+        value = self.get(self.adb.get().CATEGORY_INPUT, 'SurfaceOrientation', refresh).value('SurfaceOrientation')
+        return int(value) if value is not None and value.isdigit() else None
+
+    def top_activity(self, refresh: bool = False) -> Optional[str]:
+        """ Resumed activity component.
+        Arguments:
+            refresh(bool): ignore cache.
+        Returns:
+            component(Optional[str]): package/activity, or None.
+        """
+        root = self.get(self.adb.get().CATEGORY_ACTIVITY, 'mResumedActivity|topResumedActivity', refresh)
+        return _component(root)
+
+    def window_focus(self, refresh: bool = False) -> Optional[str]:
+        """ Focused window.
+        Arguments:
+            refresh(bool): ignore cache.
+        Returns:
+            window(Optional[str]): focused window name, or None.
+        """
+        root = self.get('window windows', 'mCurrentFocus', refresh)
+        node = root.find('mCurrentFocus')
+        if node is None:
+            return None
+        match = re.search(r'\{\S+ \S+ ([^}]+)\}', node.text)
+        return match.group(1) if match else node.value('mCurrentFocus')
+
+    def battery_level(self, refresh: bool = False) -> Optional[int]:
+        """ Battery level. (VAL_BATTERY of power)
+        Arguments:
+            refresh(bool): ignore cache.
+        Returns:
+            level(Optional[int]): battery level, or None.
+        """
+        value = self._power(refresh).value(self.adb.get().VAL_BATTERY)
+        return int(value) if value is not None and value.isdigit() else None
+
+    def wakefulness(self, refresh: bool = False) -> Optional[str]:
+        """ Power state.
+        Arguments:
+            refresh(bool): ignore cache.
+        Returns:
+            state(Optional[str]): Awake, Asleep, Dozing or Dreaming. None if unknown.
+        """
+        return self._power(refresh).value('mWakefulness')
+
+    def _power(self, refresh: bool = False) -> DumpsysNode:
+        """ Power facts in one command. (wakefulness, battery level)
+        Arguments:
+            refresh(bool): ignore cache.
+        Returns:
+            root(DumpsysNode): filtered power tree.
+        """
+        profile = self.adb.get()
+        return self.get(profile.CATEGORY_POWER, 'mWakefulness=|%s' % profile.VAL_BATTERY, refresh)
+
+    def screen_on(self, refresh: bool = False) -> bool:
+        """ Screen is on.
+        Arguments:
+            refresh(bool): ignore cache.
+        Returns:
+            result(bool): true if awake.
+        """
+        return self.wakefulness(refresh) == 'Awake'
+
+
+def _component(root: DumpsysNode) -> Optional[str]:
+    """ Component of ActivityRecord in the tree.
+    Arguments:
+        root(DumpsysNode): root node.
+    Returns:
+        component(Optional[str]): package/activity, or None.
+    """
+    for node in root.walk():
+        if 'ActivityRecord{' in node.text:
+            for token in node.text.split('ActivityRecord{', 1)[1].split():
+                if '/' in token:
+                    return token.rstrip('}')
+    return None
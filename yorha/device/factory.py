@@ -1,5 +1,6 @@
 """ YoRHa Plugins : Adb Factory Utility. """
-from typing import TypeVar, Dict, List, Any
+from typing import TypeVar, Dict, List, Any, Optional
+from yorha.cmd import CommandExecutor
 from yorha.device.adb import Android
 from yorha.device.adb import PROFILE_PATH
 
@@ -23,14 +24,15 @@ class AndroidFactory:
     __metaclass__ = Singleton
 
     @classmethod
-    def create(cls, serial: str, host: str = PROFILE_PATH) -> Android:
+    def create(cls, serial: str, host: str = PROFILE_PATH, executor: Optional[CommandExecutor] = None) -> Android:
         """ Create Android Device.
 
         Arguments:
             serial(str): android serial number.
             host(str): host filepath. default : PROFILE_PATH.
+            executor(Optional[CommandExecutor]): command executor. default : child programs.
 
         Returns:
             device(Android): Android Device Adaptor.
         """
-        return Android(serial, host)
+        return Android(serial, host, executor)
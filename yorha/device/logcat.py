@@ -0,0 +1,267 @@
+""" YoRHa Plugins : Android Logcat Utility. """
+from typing import Any, Deque, List, Optional, Pattern, Sequence, Tuple, Union
+import os
+import re
+import time
+import logging
+import threading
+import subprocess
+import weakref
+from collections import deque
+
+SIZE = 20000
+MAX_LINE = 4096
+MARGIN = 5.0
+RETRY = 1.0
+# `logcat -v threadtime` timestamp. (MM-DD hh:mm:ss.mmm)
+TIMESTAMP = re.compile(r'^\d\d-\d\d \d\d:\d\d:\d\d\.\d{3}')
+logger = logging.getLogger(__name__)
+
+# (sequence number, received time, line)
+Entry = Tuple[int, float, str]
+
+
+class LogcatCollector:
+    """ Background logcat collector. Stream `logcat -v threadtime` into a bounded ring.
+    Filters are applied on the device. (filterspecs: `tag:priority`, `*:S`)
+    When logcat exits (device reconnect, root), the stream is restarted from the last received timestamp.
+
+    Attributes:
+        adb(Android): android adaptor object.
+        filterspecs(Sequence[str]): logcat filterspecs. default : all.
+        size(int): max lines in the ring.
+        directory(Optional[str]): dump directory on test failure.
+        buffers(Sequence[str]): logcat buffers. default : main, system, crash.
+    """
+    _instances: 'weakref.WeakSet[LogcatCollector]' = weakref.WeakSet()
+
+    def __init__(self, adb: Any, filterspecs: Sequence[str] = (), size: int = SIZE, directory: Optional[str] = None,
+                 buffers: Sequence[str] = ()) -> None:
+        self.adb = adb
+        self.filterspecs = list(filterspecs)
+        self.size = size
+        self.directory = directory
+        self.buffers = list(buffers)
+        self.proc: Optional[subprocess.Popen] = None
+        self._ring: Deque[Entry] = deque(maxlen=size)
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        # last received timestamp, and the lines at it. they are skipped on restart.
+        self._last: Optional[str] = None
+        self._last_lines: List[str] = []
+
+    def __repr__(self) -> str:
+        return 'LogcatCollector()'
+
+    def __str__(self) -> str:
+        return 'LogcatCollector [ Serial = %s, Filters = %s, Lines = %d / %d ]' % (
+            self.adb.get().SERIAL, ' '.join(self.filterspecs) or '*', len(self._ring), self._seq)
+
+    @classmethod
+    def instances(cls) -> List['LogcatCollector']:
+        """ Running collectors.
+        Returns:
+            collectors(List[LogcatCollector]): running collectors.
+        """
+        return [c for c in list(cls._instances) if c.alive()]
+
+    def command(self, tail: Optional[Union[int, str]] = None) -> List[str]:
+        """ logcat command line.
+        Arguments:
+            tail(Optional[Union[int, str]]): start from the recent lines, or the timestamp. default : whole buffer.
+        Returns:
+            command(List[str]): program arguments.
+        """
+        command = ['adb'] + self.adb.target() + ['logcat', '-v', 'threadtime']
+        for buffer in self.buffers:
+            command += ['-b', buffer]
+        if tail is not None:
+            command += ['-T', str(tail)]
+        return command + self.filterspecs
+
+    def start(self, tail: Optional[int] = 1) -> None:
+        """ start collector.
+        Arguments:
+            tail(Optional[int]): start from the recent lines. None is the whole device buffer.
+        """
+        if self.alive():
+            return
+        self._stop.clear()
+        self._open(tail)
+        self._thread = threading.Thread(target=self.main_loop, name='yorha-logcat', daemon=True)
+        self._thread.start()
+        LogcatCollector._instances.add(self)
+
+    def _open(self, tail: Optional[Union[int, str]]) -> subprocess.Popen:
+        """ start logcat process.
+        Arguments:
+            tail(Optional[Union[int, str]]): start from the recent lines, or the timestamp.
+        Returns:
+            proc(subprocess.Popen): logcat process.
+        """
+        command = self.command(tail)
+        logger.debug(' '.join(command))
+        proc = subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL)
+        with self._cond:
+            self.proc = proc
+        if self._stop.is_set():
+            proc.kill()
+        return proc
+
+    def finish(self) -> None:
+        """ finish collector. lines in the ring are kept.
+        """
+        self._stop.set()
+        with self._cond:
+            proc, self.proc = self.proc, None
+        if proc is not None:
+            proc.kill()
+            proc.wait()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        LogcatCollector._instances.discard(self)
+
+    def alive(self) -> bool:
+        """ Collector is running. true while the stream is restarted.
+        Returns:
+            result(bool): true if running.
+        """
+        return self._thread is not None and self._thread.is_alive() and not self._stop.is_set()
+
+    def feed(self, line: str) -> None:
+        """ Append a line to the ring.
+        Arguments:
+            line(str): logcat line.
+        """
+        with self._cond:
+            self._seq += 1
+            self._ring.append((self._seq, time.time(), line[:MAX_LINE]))
+            self._cond.notify_all()
+
+    def main_loop(self) -> None:
+        """ Collector Main Loop. restart logcat from the last timestamp until finish().
+        """
+        while True:
+            with self._cond:
+                proc = self.proc
+            if proc is None:
+                return
+            resume, skip = self._last, list(self._last_lines)
+            for raw in iter(proc.stdout.readline, b''):  # type: ignore
+                line = raw.decode('utf-8', 'replace').rstrip('\r\n')
+                if not line or line.startswith('--------- beginning of'):
+                    continue
+                if skip:
+                    # `-T timestamp` repeats the lines at the timestamp.
+                    if line in skip:
+                        skip.remove(line)
+                        continue
+                    if not line.startswith(str(resume)):
+                        skip = []
+                self._received(line)
+                self.feed(line)
+            proc.wait()
+            if self._stop.wait(RETRY):
+                return
+            logger.warning('Logcat stream closed. restart from %s : %s', self._last, self.adb.get().SERIAL)
+            self._open(self._last if self._last is not None else 1)
+
+    def _received(self, line: str) -> None:
+        """ Record the timestamp of the received line.
+        Arguments:
+            line(str): logcat line.
+        """
+        match = TIMESTAMP.match(line)
+        if match is None:
+            return
+        if match.group(0) != self._last:
+            self._last, self._last_lines = match.group(0), []
+        self._last_lines.append(line)
+
+    def lines(self, since: Optional[float] = None, until: Optional[float] = None) -> List[str]:
+        """ Lines in the ring.
+        Arguments:
+            since(Optional[float]): received after the time. default : oldest.
+            until(Optional[float]): received before the time. default : latest.
+        Returns:
+            lines(List[str]): logcat lines.
+        """
+        with self._cond:
+            entries = list(self._ring)
+        return [line for _, t, line in entries if (since is None or t >= since) and (until is None or t <= until)]
+
+    def mark(self) -> int:
+        """ Current sequence number. lines after it are new.
+        Returns:
+            seq(int): sequence number.
+        """
+        with self._cond:
+            return self._seq
+
+    def wait_for(self, pattern: Union[str, Pattern], timeout: float = 10,
+                 since: Optional[int] = None) -> Optional['re.Match']:
+        """ Wait for a line matching the regular expression.
+        Arguments:
+            pattern(Union[str, Pattern]): regular expression.
+            timeout(float): timeout. (sec)
+            since(Optional[int]): sequence number by mark(). lines after it are searched. default : new lines only.
+        Returns:
+            match(Optional[re.Match]): match object of the first line, or None on timeout.
+        """
+        regex = re.compile(pattern) if isinstance(pattern, str) else pattern
+        deadline = time.time() + timeout
+        with self._cond:
+            seen = self._seq if since is None else since
+            while True:
+                for seq, _, line in self._ring:
+                    if seq <= seen:
+                        continue
+                    match = regex.search(line)
+                    if match:
+                        return match
+                seen = self._seq
+                remaining = deadline - time.time()
+                if remaining <= 0 or not self._cond.wait(remaining):
+                    return None
+
+    def dump(self, path: str, since: Optional[float] = None, until: Optional[float] = None) -> Optional[str]:
+        """ Dump lines in the window to a file.
+        Arguments:
+            path(str): output filepath.
+            since(Optional[float]): received after the time.
+            until(Optional[float]): received before the time.
+        Returns:
+            path(Optional[str]): output filepath, or None if no lines.
+        """
+        lines = self.lines(since, until)
+        if not lines:
+            return None
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        return path
+
+
+def dump_failure(name: str, since: Optional[float] = None) -> List[str]:
+    """ Dump the window of running collectors on test failure.
+    Arguments:
+        name(str): test name.
+        since(Optional[float]): test start time. lines from MARGIN seconds before are dumped.
+    Returns:
+        paths(List[str]): dumped filepaths.
+    """
+    paths = []
+    stamp = time.strftime('%Y_%m_%d_%H_%M_%S')
+    for collector in LogcatCollector.instances():
+        if collector.directory is None:
+            continue
+        # tcp serials and parametrized ids contain ':' and '/'.
+        filename = re.sub(r'[^\w.\-\[\]]', '_', 'logcat_{}_{}_{}.txt'.format(collector.adb.get().SERIAL, name, stamp))
+        path = collector.dump(os.path.join(collector.directory, filename), None if since is None else since - MARGIN)
+        if path is not None:
+            paths.append(path)
+    return paths
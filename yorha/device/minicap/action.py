@@ -0,0 +1,229 @@
+""" YoRHa Plugins : Frame Synchronized Action Utility. """
+from typing import Any, Callable, Optional, Tuple
+import abc
+import time
+import logging
+
+import numpy as np
+
+from ..adb import Android
+from ...exception import AndroidError
+from ...picture import Picture, ChangeDetector, Frame
+from ...picture.module import THRESHOLD
+
+POLL = 0.1
+logger = logging.getLogger(__name__)
+
+Box = Tuple[int, int, int, int]
+
+
+class Condition(abc.ABC):
+    """ Screen Condition Interface.
+    """
+
+    def reset(self, frame: Optional[Frame]) -> None:
+        """ Reset condition before the input.
+        Arguments:
+            frame(Optional[Frame]): the latest frame before the input.
+        """
+
+    def start(self, now: float) -> None:
+        """ Start condition after the input is sent.
+        Arguments:
+            now(float): time the input returned.
+        """
+
+    @abc.abstractmethod
+    def check(self, frame: Frame) -> Any:
+        """ Check condition on a frame newer than the input.
+        Arguments:
+            frame(Frame): decoded frame.
+        Returns:
+            result(Any): truthy value if the condition is satisfied.
+        """
+
+    def idle(self, now: float) -> Any:
+        """ Check condition while no new frame arrives. minicap sends no frame on a static screen.
+        Arguments:
+            now(float): current time.
+        Returns:
+            result(Any): truthy value if the condition is satisfied.
+        """
+        return False
+
+
+class Visible(Condition):
+    """ Template is visible.
+    Attributes:
+        target(str): template image filepath.
+        box(Optional[Box]): search box. (x, y, width, height)
+        threshold(float): match threshold. default : 0.8.
+    """
+
+    def __init__(self, target: str, box: Optional[Box] = None, threshold: float = THRESHOLD) -> None:
+        self.target = target
+        self.box = box
+        self.threshold = threshold
+
+    def __str__(self) -> str:
+        return 'Visible [ Target = %s, Box = %s ]' % (self.target, self.box)
+
+    def check(self, frame: Frame) -> Any:
+        return Picture.search_pattern(frame.pyramid, self.target, self.box, self.threshold)[0]
+
+
+class Changed(Condition):
+    """ Region has changed from the frame before the input.
+    Attributes:
+        roi(Optional[Box]): target region. (x, y, width, height)
+        detector(Optional[ChangeDetector]): change detector.
+    """
+
+    def __init__(self, roi: Optional[Box] = None, detector: Optional[ChangeDetector] = None) -> None:
+        self.roi = roi
+        self.detector = detector or ChangeDetector()
+        self.signature: Optional[np.ndarray] = None
+
+    def __str__(self) -> str:
+        return 'Changed [ Roi = %s ]' % (self.roi, )
+
+    def reset(self, frame: Optional[Frame]) -> None:
+        self.signature = None if frame is None else self.detector.signature(frame.bgr, self.roi)
+
+    def check(self, frame: Frame) -> Any:
+        return self.detector.changed(self.signature, self.detector.signature(frame.bgr, self.roi))
+
+
+class Stable(Condition):
+    """ Region does not change for the duration after the input.
+    The duration is counted from the input return, and at least one frame after the input is required.
+    Attributes:
+        roi(Optional[Box]): target region. (x, y, width, height)
+        duration(float): stable duration. (sec)
+        detector(Optional[ChangeDetector]): change detector.
+    """
+
+    def __init__(self, roi: Optional[Box] = None, duration: float = 0.5,
+                 detector: Optional[ChangeDetector] = None) -> None:
+        self.roi = roi
+        self.duration = duration
+        self.detector = detector or ChangeDetector()
+        self.signature: Optional[np.ndarray] = None
+        self.since: Optional[float] = None
+        self.frames = 0
+
+    def __str__(self) -> str:
+        return 'Stable [ Roi = %s, Duration = %s ]' % (self.roi, self.duration)
+
+    def reset(self, frame: Optional[Frame]) -> None:
+        self.signature = None if frame is None else self.detector.signature(frame.bgr, self.roi)
+        self.since, self.frames = None, 0
+
+    def start(self, now: float) -> None:
+        self.since = now
+
+    def check(self, frame: Frame) -> Any:
+        if self.since is None:
+            return False
+        self.frames += 1
+        signature = self.detector.signature(frame.bgr, self.roi)
+        if self.detector.changed(self.signature, signature):
+            # frames received during a blocking input do not move the timer before the input return.
+            self.signature, self.since = signature, max(self.since, frame.timestamp)
+            return False
+        return frame.timestamp - self.since >= self.duration
+
+    def idle(self, now: float) -> Any:
+        return self.since is not None and self.frames > 0 and now - self.since >= self.duration
+
+
+class ActionVerifier:
+    """ Input actions synchronized on frames.
+    Send the input, and wait until a frame newer than the input satisfies the condition.
+
+    Attributes:
+        adb(Android): android adaptor object.
+        proc(MinicapProc): minicap process. (get_latest, wait_frame)
+    """
+
+    def __init__(self, adb: Android, proc: Any) -> None:
+        self.adb = adb
+        self.proc = proc
+
+    def perform(self, action: Callable[[], Any], until: Condition, timeout: float = 5, retries: int = 1) -> Any:
+        """ Perform the action until the condition is satisfied.
+        Arguments:
+            action(Callable[[], Any]): input action.
+            until(Condition): screen condition.
+            timeout(float): timeout of each attempt. (sec)
+            retries(int): retry count of the input on timeout. default : 1.
+        Raises:
+            AndroidError: the condition is not satisfied.
+        Returns:
+            result(Any): condition result.
+        """
+        for attempt in range(retries + 1):
+            frame = self.proc.get_latest()
+            seq = 0 if frame is None else frame.seq
+            until.reset(frame)
+            begin = time.time()
+            action()
+            until.start(time.time())
+            deadline = begin + timeout
+            while time.time() < deadline:
+                frame = self.proc.wait_frame(seq, _timeout=max(0.0, min(POLL, deadline - time.time())))
+                if frame is None:
+                    # no new frame means no change since the last frame.
+                    result = until.idle(time.time())
+                else:
+                    seq = frame.seq
+                    if frame.timestamp < begin:
+                        continue
+                    result = until.check(frame)
+                if result:
+                    logger.debug('Verified %s in %.3f sec.', until, time.time() - begin)
+                    return result
+            logger.warning('Not verified %s. attempt : %d', until, attempt + 1)
+        raise AndroidError('Action is not verified. : %s' % until)
+
+    def tap(self, x: int, y: int, until: Condition, timeout: float = 5, retries: int = 1) -> Any:
+        """ Tap and verify.
+        Arguments:
+            x(int): position x.
+            y(int): position y.
+            until(Condition): screen condition.
+            timeout(float): timeout of each attempt. (sec)
+            retries(int): retry count.
+        Returns:
+            result(Any): condition result.
+        """
+        return self.perform(lambda: self.adb.tap(x, y), until, timeout, retries)
+
+    def keyevent(self, code: str, until: Condition, timeout: float = 5, retries: int = 1) -> Any:
+        """ Keyevent and verify.
+        Arguments:
+            code(str): keycode.
+            until(Condition): screen condition.
+            timeout(float): timeout of each attempt. (sec)
+            retries(int): retry count.
+        Returns:
+            result(Any): condition result.
+        """
+        return self.perform(lambda: self.adb.keyevent(code), until, timeout, retries)
+
+    def swipe(self, x1: int, y1: int, x2: int, y2: int, until: Condition, duration: int = 300, timeout: float = 5,
+              retries: int = 1) -> Any:
+        """ Swipe and verify.
+        Arguments:
+            x1(int): start position x.
+            y1(int): start position y.
+            x2(int): end position x.
+            y2(int): end position y.
+            until(Condition): screen condition.
+            duration(int): swipe duration. (msec)
+            timeout(float): timeout of each attempt. (sec)
+            retries(int): retry count.
+        Returns:
+            result(Any): condition result.
+        """
+        return self.perform(lambda: self.adb.swipe(x1, y1, x2, y2, duration), until, timeout, retries)
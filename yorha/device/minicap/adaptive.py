@@ -0,0 +1,123 @@
+""" YoRHa Plugins : Minicap Adaptive Quality Utility. """
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import time
+import logging
+import threading
+
+LEVELS = ((1.0, 80), (0.75, 70), (0.5, 60), (0.5, 40))
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveController:
+    """ Adapt minicap resolution and jpeg quality to the pipeline load.
+    Downgrade one level when frames are dropped, the stream queue is backlogged or the bandwidth is over the limit.
+    Upgrade one level after sustained headroom.
+
+    Attributes:
+        proc(MinicapProc): minicap process. (module, metrics_snapshot, reconfigure)
+        levels(Sequence[Tuple[float, int]]): (scale, quality) from the best to the worst.
+        interval(float): sampling interval. (sec)
+        backlog(int): queue depth regarded as behind.
+        bandwidth(Optional[float]): bandwidth limit. (bytes/sec)
+        headroom(int): intervals without pressure before upgrade.
+        fps(Optional[int]): max frame rate passed to minicap.
+    """
+
+    def __init__(self, proc: Any, levels: Sequence[Tuple[float, int]] = LEVELS, interval: float = 2.0,
+                 backlog: int = 2, bandwidth: Optional[float] = None, headroom: int = 5,
+                 fps: Optional[int] = None) -> None:
+        self.proc = proc
+        self.levels = list(levels)
+        self.interval = interval
+        self.backlog = backlog
+        self.bandwidth = bandwidth
+        self.headroom = headroom
+        self.fps = fps
+        self.level = 0
+        self.history: List[Dict[str, Any]] = []
+        self._calm = 0
+        self._last: Optional[Tuple[float, int, int]] = None
+        self._flag = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __repr__(self) -> str:
+        return 'AdaptiveController()'
+
+    def __str__(self) -> str:
+        scale, quality = self.levels[self.level]
+        return 'AdaptiveController [ Level = %d, Scale = %s, Quality = %d ]' % (self.level, scale, quality)
+
+    def start(self) -> None:
+        """ start controller thread.
+        """
+        self._flag.clear()
+        self._last = None
+        self._thread = threading.Thread(target=self.main_loop, name='yorha-adaptive', daemon=True)
+        self._thread.start()
+
+    def finish(self) -> None:
+        """ finish controller thread.
+        """
+        self._flag.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+    def sample(self) -> Optional[Dict[str, float]]:
+        """ Sample the pipeline load since the previous sample.
+        Returns:
+            load(Optional[Dict[str, float]]): drops, bandwidth (bytes/sec) and backlog. None at the first sample.
+        """
+        counters = self.proc.metrics_snapshot()['stream']['counters']
+        now, drops, received = time.time(), counters.get('drops', 0), counters.get('bytes', 0)
+        last, self._last = self._last, (now, drops, received)
+        if last is None or now <= last[0]:
+            return None
+        return {'drops': drops - last[1], 'bandwidth': (received - last[2]) / (now - last[0]),
+                'backlog': self.proc.module['stream'].get_d()}
+
+    def decide(self, load: Dict[str, float]) -> int:
+        """ Decide the next level.
+        Arguments:
+            load(Dict[str, float]): pipeline load. see sample().
+        Returns:
+            level(int): next level.
+        """
+        pressure = load['drops'] > 0 or load['backlog'] >= self.backlog
+        if self.bandwidth is not None and load['bandwidth'] > self.bandwidth:
+            pressure = True
+        if pressure:
+            self._calm = 0
+            return min(self.level + 1, len(self.levels) - 1)
+        self._calm += 1
+        if self._calm >= self.headroom and self.level > 0:
+            self._calm = 0
+            return self.level - 1
+        return self.level
+
+    def apply(self, level: int) -> None:
+        """ Reconfigure minicap to the level.
+        Arguments:
+            level(int): level index.
+        """
+        if level == self.level:
+            return
+        previous, self.level = self.level, level
+        scale, quality = self.levels[level]
+        logger.info('Minicap level %d -> %d : scale = %s, quality = %d', previous, level, scale, quality)
+        self.history.append({'time': time.time(), 'level': level, 'scale': scale, 'quality': quality})
+        if self.levels[previous] == (scale, quality):
+            return
+        self.proc.reconfigure(scale, quality, self.fps)
+        self._last = None
+
+    def main_loop(self) -> None:
+        """ Controller Main Loop.
+        """
+        while not self._flag.wait(self.interval):
+            try:
+                load = self.sample()
+                if load is not None:
+                    self.apply(self.decide(load))
+            except Exception as e:  # pylint: disable=W0703
+                logger.warning('Adaptive controller error : %s', e)
@@ -0,0 +1,251 @@
+""" YoRHa Plugins : Minicap Shared Memory Frame Bus. """
+from typing import Optional, Tuple
+import re
+import time
+import struct
+import logging
+import threading
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from yorha.exception import AndroidError
+
+SLOTS = 4
+MAGIC = b'YRHA'
+HEADER = struct.Struct('<4sIQQI')  # magic, slots, slot size, latest seq, latest slot
+SLOT = struct.Struct('<QQdIIIIQ')  # version, seq, timestamp, height, width, channels, orientation, nbytes
+logger = logging.getLogger(__name__)
+
+
+def bus_name(serial: str) -> str:
+    """ Shared memory name of the device.
+    Arguments:
+        serial(str): android serial.
+    Returns:
+        name(str): shared memory name.
+    """
+    return 'yorha_%s' % re.sub(r'[^0-9A-Za-z]', '_', serial)
+
+
+class FrameMeta:
+    """ Frame Metadata.
+    Attributes:
+        seq(int): frame sequence number.
+        timestamp(float): received time.
+        shape(Tuple[int, int, int]): frame shape. (height, width, channels)
+        orientation(int): display orientation. (0, 90, 180, 270)
+    """
+
+    def __init__(self, seq: int, timestamp: float, shape: Tuple[int, int, int], orientation: int) -> None:
+        self.seq = seq
+        self.timestamp = timestamp
+        self.shape = shape
+        self.orientation = orientation
+
+    def __repr__(self) -> str:
+        return 'FrameMeta()'
+
+    def __str__(self) -> str:
+        return 'FrameMeta [ Seq = %d, Shape = %s, Orientation = %d ]' % (self.seq, self.shape, self.orientation)
+
+
+class FrameBusPublisher:
+    """ Publish decoded frames in a shared memory ring.
+    Attributes:
+        serial(str): android serial.
+        slots(int): ring size. default : 4.
+        replace(bool): if true, remove the frame bus of the device remained by a crashed process.
+    Raises:
+        AndroidError: the frame bus of the device is already published, and replace is false.
+    """
+
+    def __init__(self, serial: str, slots: int = SLOTS, replace: bool = False) -> None:
+        self.name = bus_name(serial)
+        self.slots = slots
+        self.slot_size = 0
+        self.replace = replace
+        self.shm: Optional[shared_memory.SharedMemory] = None
+        self._mutex = threading.Lock()
+        self._closed = False
+        if not replace and _exists(self.name):
+            raise AndroidError('Frame Bus is already published. : %s' % self.name)
+
+    def _create(self, nbytes: int) -> shared_memory.SharedMemory:
+        """ Create shared memory. Slot size covers both orientations of the first frame.
+        Arguments:
+            nbytes(int): frame size. (bytes)
+        Raises:
+            AndroidError: the frame bus of the device is already published, and replace is false.
+        Returns:
+            shm(SharedMemory): shared memory.
+        """
+        self.slot_size = nbytes
+        size = HEADER.size + self.slots * (SLOT.size + self.slot_size)
+        try:
+            shm = shared_memory.SharedMemory(name=self.name, create=True, size=size)
+        except FileExistsError:
+            # the subscribers of another live publisher would lose their frames.
+            if not self.replace:
+                raise AndroidError('Frame Bus is already published. : %s' % self.name)
+            logger.warning('Shared memory is remained, recreate. : %s', self.name)
+            stale = shared_memory.SharedMemory(name=self.name)
+            stale.close()
+            stale.unlink()
+            shm = shared_memory.SharedMemory(name=self.name, create=True, size=size)
+        HEADER.pack_into(shm.buf, 0, MAGIC, self.slots, self.slot_size, 0, 0)
+        return shm
+
+    def publish(self, seq: int, image: np.ndarray, orientation: int = 0, timestamp: Optional[float] = None) -> None:
+        """ Publish frame. Frames after close() are dropped.
+        Arguments:
+            seq(int): frame sequence number. (> 0)
+            image(numpy.ndarray): decoded frame.
+            orientation(int): display orientation.
+            timestamp(Optional[float]): received time. default : now.
+        Raises:
+            AndroidError: frame is larger than slot, or the frame bus is already published.
+        """
+        with self._mutex:
+            if not self._closed:
+                self._publish(seq, image, orientation, timestamp)
+
+    def _publish(self, seq: int, image: np.ndarray, orientation: int, timestamp: Optional[float]) -> None:
+        """ Write frame in the next slot.
+        Arguments:
+            seq(int): frame sequence number. (> 0)
+            image(numpy.ndarray): decoded frame.
+            orientation(int): display orientation.
+            timestamp(Optional[float]): received time. default : now.
+        """
+        if self.shm is None:
+            side = max(image.shape[0], image.shape[1])
+            self.shm = self._create(side * side * (image.shape[2] if image.ndim == 3 else 1))
+        if image.nbytes > self.slot_size:
+            raise AndroidError('Frame is larger than the frame bus slot. : %d > %d' % (image.nbytes, self.slot_size))
+        index = seq % self.slots
+        offset = HEADER.size + index * (SLOT.size + self.slot_size)
+        buf = self.shm.buf
+        version = SLOT.unpack_from(buf, offset)[0]
+        SLOT.pack_into(buf, offset, version + 1, 0, 0.0, 0, 0, 0, 0, 0)
+        data = np.ndarray((image.nbytes, ), np.uint8, buf, offset + SLOT.size)
+        data[:] = np.ascontiguousarray(image).reshape(-1)
+        channels = image.shape[2] if image.ndim == 3 else 1
+        SLOT.pack_into(buf, offset, version + 2, seq, time.time() if timestamp is None else timestamp, image.shape[0],
+                       image.shape[1], channels, orientation, image.nbytes)
+        HEADER.pack_into(buf, 0, MAGIC, self.slots, self.slot_size, seq, index)
+
+    def close(self) -> None:
+        """ Close and remove shared memory.
+        """
+        with self._mutex:
+            self._closed = True
+            if self.shm is not None:
+                self.shm.close()
+                self.shm.unlink()
+                self.shm = None
+
+
+class FrameBusSubscriber:
+    """ Attach to the shared memory ring of the device, and read frames zero-copy.
+    Attributes:
+        serial(str): android serial.
+    """
+
+    def __init__(self, serial: str) -> None:
+        self.name = bus_name(serial)
+        self.shm = _attach(self.name)
+        magic, self.slots, self.slot_size, _, _ = HEADER.unpack_from(self.shm.buf, 0)
+        if magic != MAGIC:
+            self.shm.close()
+            raise AndroidError('Not Frame Bus. : %s' % self.name)
+
+    def seq(self) -> int:
+        """ Latest sequence number.
+        Returns:
+            seq(int): latest sequence number. 0 is no frame.
+        """
+        return int(HEADER.unpack_from(self.shm.buf, 0)[3])
+
+    def latest(self, copy: bool = False) -> Optional[Tuple[FrameMeta, np.ndarray]]:
+        """ Read the latest frame.
+        Arguments:
+            copy(bool): if false, the image is a view of shared memory. It is valid until the slot is reused.
+        Returns:
+            frame(Optional[Tuple[FrameMeta, numpy.ndarray]]): metadata and image, or None if no frame.
+        """
+        for _ in range(self.slots):
+            index = HEADER.unpack_from(self.shm.buf, 0)[4]
+            offset = HEADER.size + index * (SLOT.size + self.slot_size)
+            version, seq, timestamp, height, width, channels, orientation, nbytes = SLOT.unpack_from(
+                self.shm.buf, offset)
+            if not seq or version % 2:
+                continue
+            shape = (height, width, channels) if channels > 1 else (height, width)
+            image = np.ndarray(shape, np.uint8, self.shm.buf, offset + SLOT.size)
+            if copy:
+                image = image.copy()
+            if SLOT.unpack_from(self.shm.buf, offset)[0] != version:
+                continue
+            return FrameMeta(seq, timestamp, (height, width, channels), orientation), image
+        return None
+
+    def wait(self, seq: int = 0, timeout: float = 5, interval: float = 0.002,
+             copy: bool = False) -> Optional[Tuple[FrameMeta, np.ndarray]]:
+        """ Wait for a frame newer than the sequence number.
+        Arguments:
+            seq(int): sequence number.
+            timeout(float): timeout.
+            interval(float): polling interval.
+            copy(bool): if true, copy image from shared memory.
+        Returns:
+            frame(Optional[Tuple[FrameMeta, numpy.ndarray]]): metadata and image, or None on timeout.
+        """
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.seq() > seq:
+                result = self.latest(copy)
+                if result is not None and result[0].seq > seq:
+                    return result
+            time.sleep(interval)
+        return None
+
+    def close(self) -> None:
+        """ Detach shared memory.
+        """
+        self.shm.close()
+
+
+def _exists(name: str) -> bool:
+    """ Shared memory exists.
+    Arguments:
+        name(str): shared memory name.
+    Returns:
+        result(bool): true if exists.
+    """
+    try:
+        _attach(name).close()
+    except AndroidError:
+        return False
+    return True
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """ Attach shared memory without tracking. The owner process removes it.
+    Arguments:
+        name(str): shared memory name.
+    Raises:
+        AndroidError: frame bus is not published.
+    Returns:
+        shm(SharedMemory): shared memory.
+    """
+    try:
+        try:
+            return shared_memory.SharedMemory(name=name, track=False)  # type: ignore
+        except TypeError:
+            shm = shared_memory.SharedMemory(name=name)
+            from multiprocessing import resource_tracker  # pylint: disable=import-outside-toplevel
+            resource_tracker.unregister(shm._name, 'shared_memory')  # type: ignore # pylint: disable=protected-access
+            return shm
+    except FileNotFoundError:
+        raise AndroidError('Frame Bus is not published. : %s' % name)
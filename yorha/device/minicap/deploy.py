@@ -0,0 +1,169 @@
+""" YoRHa Plugins : Minicap Deploy Utility. """
+from typing import Dict, List, Optional, Sequence, Tuple
+import os
+import time
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from .service import DEVICE_PATH
+
+from ..adb import Android
+from ...exception import AndroidError, RunError
+
+PREBUILT_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', 'vendor', 'minicap'))
+WORKERS = 8
+logger = logging.getLogger(__name__)
+
+
+class DeployResult:
+    """ Minicap Deploy Result.
+    Attributes:
+        serial(str): android serial.
+        abi(str): ro.product.cpu.abi.
+        sdk(str): ro.build.version.sdk.
+    """
+
+    def __init__(self, serial: str, abi: str, sdk: str) -> None:
+        self.serial = serial
+        self.abi = abi
+        self.sdk = sdk
+        self.pushed: List[str] = []
+        self.skipped: List[str] = []
+        self.elapsed = 0.0
+        self.error: Optional[str] = None
+
+    def __repr__(self) -> str:
+        return 'DeployResult()'
+
+    def __str__(self) -> str:
+        return 'DeployResult [ Serial = %s, ABI = %s, SDK = %s, Pushed = %s, Skipped = %s, Elapsed = %.3f ]' % (
+            self.serial, self.abi, self.sdk, self.pushed, self.skipped, self.elapsed)
+
+    @property
+    def updated(self) -> bool:
+        """ Some files were pushed.
+        """
+        return bool(self.pushed)
+
+
+class MinicapDeployer:
+    """ Deploy minicap binary and shared library for the device abi and sdk.
+    Files are pushed only when the md5 checksum differs from the device copy.
+
+    Attributes:
+        prebuilt(str): minicap directory.
+            - {prebuilt}/libs/{abi}/minicap
+            - {prebuilt}/jni/minicap-shared/aosp/libs/android-{sdk}/{abi}/minicap.so
+        remote(str): device directory. default : /data/local/tmp/minicap-devel.
+    """
+
+    def __init__(self, prebuilt: str = PREBUILT_PATH, remote: str = DEVICE_PATH) -> None:
+        self.prebuilt = prebuilt
+        self.remote = remote
+        self._checksums: Dict[str, str] = {}
+
+    def locate(self, abi: str, sdk: str) -> List[Tuple[str, str]]:
+        """ Locate local files for the abi and sdk.
+        Arguments:
+            abi(str): ro.product.cpu.abi.
+            sdk(str): ro.build.version.sdk.
+        Raises:
+            AndroidError: prebuilt file is not found.
+        Returns:
+            files(List[Tuple[str, str]]): (local path, remote path).
+        """
+        binary = os.path.join(self.prebuilt, 'libs', abi, 'minicap')
+        library = os.path.join(self.prebuilt, 'jni', 'minicap-shared', 'aosp', 'libs', 'android-%s' % sdk, abi,
+                               'minicap.so')
+        for path in (binary, library):
+            if not os.path.exists(path):
+                raise AndroidError('Minicap prebuilt is not found. : %s' % path)
+        return [(binary, '%s/minicap' % self.remote), (library, '%s/minicap.so' % self.remote)]
+
+    def checksum(self, path: str) -> str:
+        """ md5 checksum of the local file. cached by path, size and mtime.
+        Arguments:
+            path(str): local file path.
+        Returns:
+            checksum(str): md5 hex digest.
+        """
+        stat = os.stat(path)
+        key = '%s:%d:%d' % (path, stat.st_size, stat.st_mtime_ns)
+        if key not in self._checksums:
+            md5 = hashlib.md5()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    md5.update(chunk)
+            self._checksums[key] = md5.hexdigest()
+        return self._checksums[key]
+
+    def remote_checksums(self, adb: Android, paths: Sequence[str]) -> Dict[str, str]:
+        """ md5 checksums of the device files in one shell call.
+        Arguments:
+            adb(Android): android adaptor object.
+            paths(Sequence[str]): device file paths.
+        Returns:
+            checksums(Dict[str, str]): md5 hex digest by path. missing files are not included.
+        """
+        targets = ' '.join(paths)
+        result = adb.shell('md5sum %s 2>/dev/null || md5 %s 2>/dev/null; true' % (targets, targets))
+        checksums = {}
+        for line in str(result or '').splitlines():
+            args = line.split()
+            if len(args) == 2 and len(args[0]) == 32:
+                checksums[args[1]] = args[0].lower()
+        return checksums
+
+    def deploy(self, adb: Android) -> DeployResult:
+        """ Deploy minicap to the device.
+        Arguments:
+            adb(Android): android adaptor object.
+        Raises:
+            AndroidError: prebuilt file is not found.
+            RunError: adb command failed.
+        Returns:
+            result(DeployResult): deploy result.
+        """
+        begin = time.time()
+        abi = str(adb.getprop('ro.product.cpu.abi')).strip()
+        sdk = str(adb.getprop('ro.build.version.sdk')).strip()
+        result = DeployResult(adb.get().SERIAL, abi, sdk)
+        files = self.locate(abi, sdk)
+        remote = self.remote_checksums(adb, [dst for _, dst in files])
+        for src, dst in files:
+            if remote.get(dst) == self.checksum(src):
+                result.skipped.append(dst)
+                continue
+            if not result.pushed:
+                adb.shell('mkdir -p %s' % self.remote)
+            adb.push(src, dst)
+            result.pushed.append(dst)
+        if '%s/minicap' % self.remote in result.pushed:
+            adb.shell('chmod 755 %s/minicap' % self.remote)
+        result.elapsed = time.time() - begin
+        logger.info(result)
+        return result
+
+    def deploy_all(self, devices: Sequence[Android], workers: int = WORKERS) -> List[DeployResult]:
+        """ Deploy minicap to the devices in parallel. A failure of one device does not stop the others.
+        Arguments:
+            devices(Sequence[Android]): android adaptor objects.
+            workers(int): max parallel devices.
+        Returns:
+            results(List[DeployResult]): deploy results in the order of devices.
+        """
+
+        def _deploy(adb: Android) -> DeployResult:
+            try:
+                return self.deploy(adb)
+            except (AndroidError, RunError) as e:
+                logger.warning('Minicap deploy failed. : %s : %s', adb.get().SERIAL, e)
+                result = DeployResult(adb.get().SERIAL, '', '')
+                result.error = str(e)
+                return result
+
+        if not devices:
+            return []
+        with ThreadPoolExecutor(max_workers=min(workers, len(devices))) as executor:
+            return list(executor.map(_deploy, devices))
@@ -0,0 +1,215 @@
+""" YoRHa Plugins : Input-to-Display Latency Utility. """
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import time
+import logging
+
+import numpy as np
+
+from ..adb import Android
+from ...picture import ChangeDetector
+
+SETTLE = 0.5
+logger = logging.getLogger(__name__)
+
+Box = Tuple[int, int, int, int]
+
+
+class LatencySample:
+    """ Latency Sample of one trial.
+    Attributes:
+        command(float): input command round trip. (sec)
+        display(Optional[float]): input issued to the first changed frame. None on timeout. (sec)
+        frames(int): frames received until the change.
+    """
+
+    def __init__(self, command: float, display: Optional[float], frames: int) -> None:
+        self.command = command
+        self.display = display
+        self.frames = frames
+
+    def __repr__(self) -> str:
+        return 'LatencySample()'
+
+    def __str__(self) -> str:
+        display = 'timeout' if self.display is None else '%.3f' % self.display
+        return 'LatencySample [ Command = %.3f, Display = %s, Frames = %d ]' % (self.command, display, self.frames)
+
+
+class LatencyReport:
+    """ Latency Distribution over trials.
+    Attributes:
+        samples(List[LatencySample]): trial samples.
+    """
+
+    def __init__(self, samples: Optional[List[LatencySample]] = None) -> None:
+        self.samples: List[LatencySample] = samples or []
+
+    def __repr__(self) -> str:
+        return 'LatencyReport()'
+
+    def __str__(self) -> str:
+        summary = self.summary()
+        return 'LatencyReport [ Trials = %d, Timeouts = %d, Command p50 = %.3f, Display p50 = %.3f, p90 = %.3f ]' % (
+            summary['trials'], summary['timeouts'], summary['command']['p50'], summary['display']['p50'],
+            summary['display']['p90'])
+
+    def summary(self) -> Dict[str, Any]:
+        """ Get distribution summary.
+        Returns:
+            summary(Dict[str, Any]): trials, timeouts, and distribution of command, display and after command.
+                - after_command : display latency minus command round trip. (app response and capture)
+        """
+        display = [s.display for s in self.samples if s.display is not None]
+        after = [s.display - s.command for s in self.samples if s.display is not None]
+        return {
+            'trials': len(self.samples),
+            'timeouts': len(self.samples) - len(display),
+            'command': _distribution([s.command for s in self.samples]),
+            'display': _distribution(display),
+            'after_command': _distribution(after),
+        }
+
+
+class LatencyProbe:
+    """ Measure latency from input command to visible change in the minicap stream.
+    Attributes:
+        adb(Android): android adaptor object.
+        proc(MinicapProc): minicap process. (wait_frame)
+        detector(Optional[ChangeDetector]): change detector.
+    """
+
+    def __init__(self, adb: Android, proc: Any, detector: Optional[ChangeDetector] = None) -> None:
+        self.adb = adb
+        self.proc = proc
+        self.detector = detector or ChangeDetector()
+
+    def settle(self, roi: Optional[Box] = None, duration: float = SETTLE, timeout: float = 10) -> Any:
+        """ Wait until the region is stable.
+        Arguments:
+            roi(Optional[Box]): target region. (x, y, width, height)
+            duration(float): stable duration. (sec)
+            timeout(float): timeout. (sec)
+        Returns:
+            frame(Optional[Frame]): the last frame, or None on timeout.
+        """
+        deadline = time.time() + timeout
+        frame = self.proc.wait_frame(0, _timeout=timeout)
+        if frame is None:
+            return None
+        signature, since = self.detector.signature(frame.bgr, roi), frame.timestamp
+        while time.time() < deadline:
+            if frame.timestamp - since >= duration:
+                return frame
+            latest = self.proc.wait_frame(frame.seq, _timeout=max(0.0, deadline - time.time()))
+            if latest is None:
+                # no new frame means the screen is static.
+                return frame
+            frame = latest
+            current = self.detector.signature(frame.bgr, roi)
+            if self.detector.changed(signature, current):
+                signature, since = current, frame.timestamp
+        return None
+
+    def measure_once(self, action: Callable[[], Any], roi: Optional[Box] = None,
+                     timeout: float = 5) -> LatencySample:
+        """ Measure one trial.
+        Arguments:
+            action(Callable[[], Any]): input action. (e.g. lambda: adb.tap(x, y))
+            roi(Optional[Box]): watched region. (x, y, width, height)
+            timeout(float): timeout. (sec)
+        Returns:
+            sample(LatencySample): latency sample.
+        """
+        frame = self.proc.wait_frame(0, _timeout=timeout)
+        base: Optional[np.ndarray] = None if frame is None else self.detector.signature(frame.bgr, roi)
+        seq = 0 if frame is None else frame.seq
+        frames = 0
+
+        begin = time.time()
+        action()
+        command = time.time() - begin
+
+        deadline = begin + timeout
+        while time.time() < deadline:
+            frame = self.proc.wait_frame(seq, _timeout=max(0.0, deadline - time.time()))
+            if frame is None:
+                break
+            seq = frame.seq
+            frames += 1
+            if frame.timestamp < begin:
+                continue
+            if self.detector.changed(base, self.detector.signature(frame.bgr, roi)):
+                return LatencySample(command, frame.timestamp - begin, frames)
+        return LatencySample(command, None, frames)
+
+    def measure(self, action: Callable[[], Any], roi: Optional[Box] = None, trials: int = 10,
+                reset: Optional[Callable[[], Any]] = None, timeout: float = 5,
+                settle: float = SETTLE) -> LatencyReport:
+        """ Measure latency distribution over repeated trials.
+        Arguments:
+            action(Callable[[], Any]): input action.
+            roi(Optional[Box]): watched region. (x, y, width, height)
+            trials(int): number of trials. default : 10.
+            reset(Optional[Callable[[], Any]]): action to restore the screen after each trial.
+            timeout(float): timeout of each trial. (sec)
+            settle(float): stable duration before each trial. (sec)
+        Returns:
+            report(LatencyReport): latency report.
+        """
+        report = LatencyReport()
+        for trial in range(trials):
+            self.settle(roi, settle)
+            sample = self.measure_once(action, roi, timeout)
+            logger.debug('Trial %d : %s', trial, sample)
+            report.samples.append(sample)
+            if reset is not None:
+                reset()
+        logger.info(report)
+        return report
+
+    def tap(self, x: int, y: int, roi: Optional[Box] = None, trials: int = 10, **kwargs: Any) -> LatencyReport:
+        """ Measure tap latency.
+        Arguments:
+            x(int): position x.
+            y(int): position y.
+            roi(Optional[Box]): watched region. (x, y, width, height)
+            trials(int): number of trials.
+            kwargs(Any): see measure.
+        Returns:
+            report(LatencyReport): latency report.
+        """
+        return self.measure(lambda: self.adb.tap(x, y), roi, trials, **kwargs)
+
+    def keyevent(self, code: str, roi: Optional[Box] = None, trials: int = 10, **kwargs: Any) -> LatencyReport:
+        """ Measure keyevent latency.
+        Arguments:
+            code(str): keycode.
+            roi(Optional[Box]): watched region. (x, y, width, height)
+            trials(int): number of trials.
+            kwargs(Any): see measure.
+        Returns:
+            report(LatencyReport): latency report.
+        """
+        return self.measure(lambda: self.adb.keyevent(code), roi, trials, **kwargs)
+
+
+def _distribution(values: List[float]) -> Dict[str, float]:
+    """ Distribution of values.
+    Arguments:
+        values(List[float]): values.
+    Returns:
+        distribution(Dict[str, float]): count, min, mean, p50, p90, p99, max.
+    """
+    if not values:
+        return {'count': 0, 'min': 0.0, 'mean': 0.0, 'p50': 0.0, 'p90': 0.0, 'p99': 0.0, 'max': 0.0}
+    array = np.asarray(values, dtype=np.float64)
+    p50, p90, p99 = np.percentile(array, [50, 90, 99])
+    return {
+        'count': len(values),
+        'min': float(array.min()),
+        'mean': float(array.mean()),
+        'p50': float(p50),
+        'p90': float(p90),
+        'p99': float(p99),
+        'max': float(array.max())
+    }
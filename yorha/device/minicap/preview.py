@@ -0,0 +1,152 @@
+""" YoRHa Plugins : Minicap Preview Utility. """
+from typing import Any, Optional
+import time
+import logging
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import cv2
+
+FPS = 10
+BOUNDARY = 'yorhaframe'
+logger = logging.getLogger(__name__)
+
+
+class PreviewWindow:
+    """ Preview window. Pull the latest frame of the process at throttled fps.
+    Attributes:
+        proc(MinicapProc): minicap process. (wait_frame)
+        fps(int): max preview fps. default : 10.
+        name(str): window name.
+    """
+
+    def __init__(self, proc: Any, fps: int = FPS, name: str = 'debug') -> None:
+        self.proc = proc
+        self.fps = fps
+        self.name = name
+        self._loop_flag = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """ start preview window.
+        """
+        self._loop_flag = True
+        self._thread = threading.Thread(target=self.main_loop, name='yorha-preview', daemon=True)
+        self._thread.start()
+
+    def finish(self) -> None:
+        """ finish preview window.
+        """
+        self._loop_flag = False
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def main_loop(self) -> None:
+        """ Preview Main Loop. ESC closes the preview only.
+        """
+        cv2.namedWindow(self.name)
+        seq = 0
+        while self._loop_flag:
+            begin = time.time()
+            frame = self.proc.wait_frame(seq, _timeout=1)
+            if frame is not None:
+                seq = frame.seq
+                cv2.imshow(self.name, frame.half)
+            if cv2.waitKey(1) == 27:
+                break
+            time.sleep(max(0.0, 1.0 / self.fps - (time.time() - begin)))
+        cv2.destroyWindow(self.name)
+
+
+class MjpegServer:
+    """ MJPEG over HTTP preview server. Serve the original jpeg data of the latest frame.
+        - / : multipart/x-mixed-replace stream.
+        - /snapshot.jpg : the latest frame.
+
+    Attributes:
+        proc(MinicapProc): minicap process. (wait_frame)
+        port(int): server port. 0 is any free port.
+        host(str): server address. default : 127.0.0.1.
+        fps(int): max stream fps for each client. default : 10.
+    """
+
+    def __init__(self, proc: Any, port: int = 0, host: str = '127.0.0.1', fps: int = FPS) -> None:
+        self.proc = proc
+        self.fps = fps
+        self._loop_flag = True
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    def get_port(self) -> int:
+        """ get Port.
+        Returns:
+            port(int): server port.
+        """
+        return int(self.server.server_address[1])
+
+    def start(self) -> None:
+        """ start server.
+        """
+        self._thread = threading.Thread(target=self.server.serve_forever, name='yorha-mjpeg', daemon=True)
+        self._thread.start()
+        logger.info('MJPEG Preview : http://%s:%d/', self.server.server_address[0], self.get_port())
+
+    def finish(self) -> None:
+        """ finish server.
+        """
+        self._loop_flag = False
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _handler(self) -> type:
+        """ Request handler class bound to this server.
+        Returns:
+            handler(type): request handler class.
+        """
+        owner = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """ MJPEG Request Handler. """
+
+            def log_message(self, format: str, *args: Any) -> None:  # pylint: disable=redefined-builtin
+                logger.debug(format, *args)
+
+            def do_GET(self) -> None:  # pylint: disable=invalid-name
+                """ GET request. """
+                if self.path.startswith('/snapshot'):
+                    frame = owner.proc.wait_frame(0, _timeout=5)
+                    if frame is None:
+                        self.send_error(503, 'No Frame.')
+                        return
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'image/jpeg')
+                    self.send_header('Content-Length', str(len(frame.data)))
+                    self.end_headers()
+                    self.wfile.write(frame.data)
+                    return
+                if self.path not in ('/', '/stream.mjpg'):
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Cache-Control', 'no-cache')
+                self.send_header('Content-Type', 'multipart/x-mixed-replace; boundary=%s' % BOUNDARY)
+                self.end_headers()
+                seq = 0
+                try:
+                    while owner._loop_flag:  # pylint: disable=protected-access
+                        begin = time.time()
+                        frame = owner.proc.wait_frame(seq, _timeout=1)
+                        if frame is None:
+                            continue
+                        seq = frame.seq
+                        self.wfile.write(('--%s\r\nContent-Type: image/jpeg\r\nContent-Length: %d\r\n\r\n' %
+                                          (BOUNDARY, len(frame.data))).encode())
+                        self.wfile.write(frame.data)
+                        self.wfile.write(b'\r\n')
+                        time.sleep(max(0.0, 1.0 / owner.fps - (time.time() - begin)))
+                except (BrokenPipeError, ConnectionResetError):
+                    logger.debug('MJPEG Client Disconnected.')
+
+        return Handler
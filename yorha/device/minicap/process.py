@@ -1,22 +1,28 @@
 """  Orlov Plugins : Minicap Process Utility. """
-from typing import Tuple, Dict, Any, Optional
+from typing import Tuple, Dict, List, Any, Optional, Sequence, Union
 import os
-import io
 import sys
 import time
 import logging
 import threading
-from queue import Queue
+from queue import Queue, Empty
 
 import cv2
-from PIL import Image
 import numpy as np
 import fasteners
 
+from .bus import FrameBusPublisher
+from .preview import PreviewWindow, MjpegServer
 from .service import MinicapService
 from .stream import MinicapStream
 
 from ..adb import Android
+from ... import trace
+from ...exception import AndroidError
+from ...metrics import Metrics, MetricsDumper
+from ...ocr import Ocr
+from ...picture import Picture, PatternObject, PatternResult, ChangeDetector, Locator, Frame
+from ...picture.module import scale_box
 from ...workspace import Workspace
 
 PATH = os.path.abspath(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -24,6 +30,9 @@ if PATH not in sys.path:
     sys.path.insert(0, PATH)
 
 MAX_SIZE = 5
+# max pixels per side covered by one signature pixel, for skipping the evaluation of an unchanged region.
+# on a larger region, a small icon or badge may not move the signature.
+RESOLUTION = 4
 logger = logging.getLogger(__name__)
 
 
@@ -35,16 +44,23 @@ class SearchObject:
         box(tuple): target position(x, y)
     """
 
-    def __init__(self, _function: str, _target: str, _box: Optional[Tuple[int, int]]) -> None:
+    def __init__(self, _function: str, _target: Any, _box: Optional[Tuple[int, int]], **kwargs: Any) -> None:
         self.func = _function
         self.target = _target
         self.box = _box
+        self.options = kwargs
+        self.signature: Optional[np.ndarray] = None
+        self.since = 0.0
 
     def __repr__(self) -> str:
         return 'SearchObject()'
 
     def __str__(self) -> str:
-        return 'Target, Box : %s, %s' % (os.path.basename(self.target), self.box)
+        if isinstance(self.target, str):
+            return 'Target, Box : %s, %s' % (os.path.basename(self.target), self.box)
+        if isinstance(self.target, (list, tuple)):
+            return 'Target, Box : %s, %s' % (', '.join([str(t) for t in self.target]), self.box)
+        return 'Target, Box : %s, %s' % (self.target, self.box)
 
 
 # pylint: disable=E1101
@@ -68,11 +84,24 @@ class MinicapProc:
         self._debug = debug
 
         self._search: Optional[SearchObject] = None
-        self.search_result: Queue[str] = Queue()
+        self.search_result: Queue[Any] = Queue()
         self.counter = 1
+        self.frame: Optional[Frame] = None
+        self.frame_cond = threading.Condition()
+        self.publisher: Optional[FrameBusPublisher] = None
+        self.preview: List[Any] = []
+        self.metrics = Metrics('process')
+        self.dumper: Optional[MetricsDumper] = None
+        self.detector = ChangeDetector()
+        self.locator = Locator()
+        self.scale = 1.0
+        self.namespace: Tuple[str, ...] = ()
+        self._thread: Optional[threading.Thread] = None
         self.lock = fasteners.InterProcessLock('.lockfile')
 
-    def start(self, _adb: Android, _workspace: Workspace, _package: Optional[str] = None) -> None:
+    def start(self, _adb: Android, _workspace: Workspace, _package: Optional[str] = None, _publish: bool = False,
+              _preview_port: Optional[int] = None, _metrics_interval: Optional[float] = None,
+              _replace: bool = False) -> None:
         """ Minicap Process Start.
         Arguments:
             _adb(Android): android adaptor object.
@@ -82,7 +111,15 @@ class MinicapProc:
                 - evidence : workspace.tmp.evidence
                 - reference : workspace.tmp.reference
             _package(str): package name. default: None.
+            _publish(bool): if true, publish decoded frames in shared memory. see FrameBusSubscriber.
+            _preview_port(Optional[int]): if set, serve MJPEG preview on the local port. 0 is any free port.
+            _metrics_interval(Optional[float]): if set, dump metrics in workspace.log/metrics.jsonl periodically.
+            _replace(bool): if true, replace the frame bus remained by a crashed process.
+        Raises:
+            AndroidError: the frame bus of the device is already published, and _replace is false.
         """
+        if _publish:
+            self.publisher = FrameBusPublisher(_adb.get().SERIAL, replace=_replace)
         self.module['adb'] = _adb
         self.module['workspace'] = _workspace
 
@@ -104,17 +141,95 @@ class MinicapProc:
         time.sleep(1)
         self.module['adb'].forward('tcp:%s localabstract:minicap' % str(self.module['stream'].get_port()))
         self.module['stream'].start()
-        threading.Thread(target=self.main_loop).start()
+        self._thread = threading.Thread(target=self.main_loop)
+        self._thread.start()
+
+        if self._debug:
+            self.preview.append(PreviewWindow(self))
+        if _preview_port is not None:
+            self.preview.append(MjpegServer(self, _preview_port))
+        for preview in self.preview:
+            preview.start()
+        if _metrics_interval is not None:
+            self.dumper = MetricsDumper([self.module['stream'].metrics, self.metrics],
+                                        os.path.join(self.space['log'], 'metrics.jsonl'), _metrics_interval)
+            self.dumper.start()
 
     def finish(self) -> None:
         """ Minicap Process Finish.
         """
+        # stop publishing before the shared memory is removed.
+        publisher, self.publisher = self.publisher, None
+        if publisher is not None:
+            publisher.close()
         self._loop_flag = False
+        for preview in self.preview:
+            preview.finish()
+        self.preview = []
+        if self.dumper is not None:
+            self.dumper.finish()
+            self.dumper = None
         time.sleep(1)
+        logger.info('Locator Statistics : %s', self.locator.statistics())
         self.module['stream'].finish()
         if 'service' in self.module and self.module['service'] is not None:
             self.module['service'].stop()
 
+    def reconfigure(self, scale: float = 1.0, quality: Optional[int] = None, fps: Optional[int] = None) -> None:
+        """ Restart minicap with new projection scale, jpeg quality and frame rate.
+        Boxes of the search api stay in the profile resolution, and are scaled on evaluation.
+        Arguments:
+            scale(float): projection scale against MINICAP_WIDTH, MINICAP_HEIGHT. default : 1.0.
+            quality(Optional[int]): jpeg quality. (0 - 100)
+            fps(Optional[int]): max frame rate.
+        """
+        profile = self.module['adb'].get()
+        size = (int(int(profile.MINICAP_WIDTH) * scale), int(int(profile.MINICAP_HEIGHT) * scale))
+        logger.info('Reconfigure Minicap : scale = %s, quality = %s, fps = %s', scale, quality, fps)
+        self.module['service'].restart(self.module['adb'], self.space['log'], quality, size, fps)
+        time.sleep(1)
+        # frames are tagged with the scale of their connection. queued frames keep the previous scale.
+        self.module['stream'].restart(scale)
+        self.scale = scale
+
+    def locator_key(self) -> Tuple[str, ...]:
+        """ Get locator namespace of the device and profile.
+        Returns:
+            key(Tuple[str, ...]): serial, profile name and namespace of the view.
+        """
+        if self.module.get('adb') is None:
+            return ()
+        profile = self.module['adb'].get()
+        return (profile.SERIAL, profile.__name__) + self.namespace
+
+    def alive(self) -> bool:
+        """ Check the pipeline. minicap service, stream thread and main loop are running.
+        Returns:
+            result(bool): true if alive.
+        """
+        service, stream = self.module['service'], self.module['stream']
+        if not self._loop_flag or self._thread is None or not self._thread.is_alive():
+            return False
+        if stream.read_image_stream_task is None or not stream.read_image_stream_task.is_alive():
+            return False
+        return service.proc is not None and service.proc.poll() is None
+
+    def metrics_snapshot(self) -> Dict[str, Any]:
+        """ Get pipeline metrics snapshot.
+        Returns:
+            snapshot(Dict[str, Any]): stream and process metrics.
+                - stream : bytes, frames, drops, parse.
+                - process : frames, queue_wait, decode, match.<function>, evidence.
+        """
+        return {'stream': self.module['stream'].metrics.snapshot(), 'process': self.metrics.snapshot()}
+
+    def locator_stats(self) -> Dict[str, float]:
+        """ Get locator hit-rate statistics.
+        Returns:
+            stats(Dict[str, float]): locator statistics.
+        """
+        return self.locator.statistics()
+
     def get_d(self) -> int:
         """ Get output queue size.
         Returns:
@@ -129,6 +244,26 @@ class MinicapProc:
         """
         return self.output.get()
 
+    def get_latest(self) -> Optional[Frame]:
+        """ Get the latest decoded frame.
+        Returns:
+            frame(Optional[Frame]): the latest frame, or None before the first frame.
+        """
+        return self.frame
+
+    def wait_frame(self, seq: int = 0, _timeout: float = 5) -> Optional[Frame]:
+        """ Wait for a frame newer than the sequence number.
+        Arguments:
+            seq(int): sequence number. frames after it are waited.
+            _timeout(float): timeout.
+        Returns:
+            frame(Optional[Frame]): the latest frame, or None on timeout.
+        """
+        with self.frame_cond:
+            self.frame_cond.wait_for(lambda: self.frame is not None and self.frame.seq > seq, timeout=_timeout)
+            frame = self.frame
+        return frame if frame is not None and frame.seq > seq else None
+
     def __save(self, filename: str, data: bytearray) -> None:
         """ Save framedata in files.
         Arguments:
@@ -157,28 +292,68 @@ class MinicapProc:
         """
         zpnum = '{0:08d}'.format(int(number))
         if 'tmp.evidence' in self.space:
-            self.__save_cv(os.path.join(self.space['tmp.evidence'], 'image_%s.png' % str(zpnum)), data)
+            with self.metrics.timer('evidence'):
+                self.__save_cv(os.path.join(self.space['tmp.evidence'], 'image_%s.png' % str(zpnum)), data)
 
-    def __search(self, func: str, target: str, box: Optional[Tuple[int, int]] = None,
-                 _timeout: int = 5) -> Optional[str]:
+    def __search(self, func: str, target: Any, box: Optional[Tuple[int, int]] = None, _timeout: int = 5,
+                 **kwargs: Any) -> Any:
         """ Search Object.
         Arguments:
             func(str): function name.
-                - capture, patternmatch, ocr.
+                - capture, patternmatch, multipattern, ocr.
             target(object): Target Object. only capture, filename.
             box(Optional[Tuple]): box object. (x, y, width, height)
             _timeout(int): Expired Time. default : 5.
+            kwargs(Any): function options.
         Returns:
-            result(Optional[str]): return target.
+            result(Any): return target.
         """
 
-        with self.lock:
-            self._search = SearchObject(func, target, box)
-            result = self.search_result.get(timeout=_timeout)
-            self._search = None
+        with trace.span('search.%s' % func, 'minicap', target=target, box=box), self.metrics.timer('search'), \
+                self.lock:
+            while not self.search_result.empty():
+                self.search_result.get_nowait()
+            search = SearchObject(func, target, box, **kwargs)
+            if func == 'stable':
+                # minicap sends no frame on a static screen. the latest frame is the baseline.
+                frame = self.frame
+                search.since = time.time() if frame is None else frame.timestamp
+                if frame is not None:
+                    search.signature = self.detector.signature(frame.bgr, scale_box(_region(box), frame.scale))
+            self._search = search
+            try:
+                result = self.__wait(search, _timeout)
+            finally:
+                self._search = None
 
         return result
 
+    def __wait(self, search: SearchObject, _timeout: float) -> Any:
+        """ Wait Search Result.
+        The stable search is resolved on the wall clock, since the last change of the region.
+        Arguments:
+            search(SearchObject): search object.
+            _timeout(float): Expired Time.
+        Raises:
+            Empty: timeout.
+        Returns:
+            result(Any): return target.
+        """
+        if search.func != 'stable':
+            return self.search_result.get(timeout=_timeout)
+        duration = search.options.get('duration', 0)
+        deadline = time.time() + _timeout
+        while True:
+            now = time.time()
+            if now - search.since >= duration:
+                return True
+            if now >= deadline:
+                raise Empty
+            try:
+                return self.search_result.get(timeout=min(deadline, search.since + duration) - now)
+            except Empty:
+                pass
+
     def capture_image(self, filename: str, _timeout: int = 5) -> Optional[str]:
         """ Capture Image File.
         Arguments:
@@ -195,74 +370,196 @@ class MinicapProc:
             target(str): target file path.
             box(tuple): target search box.
             _timeout(int): timeout.
+        Raises:
+            PictureError: template image is not found.
         Returns:
             result(Optional[str]): search pattern point.
         """
+        # load on the caller thread. errors in main_loop would stop the capture.
+        Picture.template(target)
         return self.__search('patternmatch', target, box=box, _timeout=_timeout)
 
-    def search_ocr(self, box: Optional[Tuple[int, int]] = None, _timeout: int = 5) -> Optional[str]:
+    def search_patterns(self, patterns: Sequence[PatternObject], first: bool = False,
+                        _timeout: int = 5) -> Optional[List[PatternResult]]:
+        """ Search Multiple Patterns in the same frame.
+        Arguments:
+            patterns(Sequence[PatternObject]): search patterns. each has own box and threshold.
+            first(bool): if true, return at the first hit.
+            _timeout(int): timeout.
+        Raises:
+            PictureError: template image is not found.
+        Returns:
+            result(Optional[List[PatternResult]]): all hits in one frame.
+        """
+        for pattern in patterns:
+            Picture.template(pattern.target)
+        return self.__search('multipattern', list(patterns), box=None, _timeout=_timeout, first=first)
+
+    def search_ocr(self, box: Any = None, text: Optional[str] = None,
+                   _timeout: int = 5) -> Optional[Union[str, List[str]]]:
         """ Search OCR File.
         Arguments:
-            box(tuple): target search box.
+            box(Any): target search box, or list of target search boxes.
+            text(Optional[str]): expected text. if set, wait until any box contains it.
+            _timeout(int): timeout.
+        Raises:
+            OcrError: ocr engine is not available.
+        Returns:
+            result(Optional[Union[str, List[str]]]): recognized text. list for multiple boxes.
+        """
+        # resolve on the caller thread. errors in main_loop would stop the capture.
+        Ocr.get_engine()
+        return self.__search('ocr', text, box=box, _timeout=_timeout, expect=text)
+
+    def wait_for_change(self, roi: Optional[Tuple[int, int, int, int]] = None, _timeout: int = 5) -> bool:
+        """ Wait until the region changes from the first frame.
+        Arguments:
+            roi(Optional[tuple]): target region. (x, y, width, height). default : full frame.
+            _timeout(int): timeout.
+        Returns:
+            result(bool): true if the region has changed, false on timeout.
+        """
+        try:
+            return bool(self.__search('change', 'change', box=roi, _timeout=_timeout))
+        except Empty:
+            return False
+
+    def wait_for_stable(self, roi: Optional[Tuple[int, int, int, int]] = None, duration: float = 1.0,
+                        _timeout: int = 5) -> bool:
+        """ Wait until the region does not change for the duration.
+        A static screen sends no frame, so the duration is measured from the last change on the wall clock.
+        Arguments:
+            roi(Optional[tuple]): target region. (x, y, width, height). default : full frame.
+            duration(float): stable duration. (sec)
             _timeout(int): timeout.
         Returns:
-            result(tuple): search pattern point.
+            result(bool): true if the region is stable, false on timeout.
         """
-        return self.__search('ocr', 'dummy', box=box, _timeout=_timeout)
+        try:
+            return bool(self.__search('stable', 'stable', box=roi, _timeout=_timeout, duration=duration))
+        except Empty:
+            return False
+
+    def __evaluate(self, search: SearchObject, frame: Frame) -> Tuple[bool, np.ndarray]:
+        """ Evaluate Search Object on the frame.
+        The region of patternmatch and ocr is evaluated only when it has changed since the last evaluation,
+        if the region is small enough for the signature to resolve. larger regions are evaluated on every frame.
+        Arguments:
+            search(SearchObject): search object.
+            frame(Frame): decoded frame.
+        Returns:
+            result(Tuple[bool, numpy.ndarray]): save flag, and framedata for evidence.
+        """
+        image_cv = frame.bgr
+        if search.func == 'capture':
+            outputfile = os.path.join(self.space['tmp'], search.target)
+            if outputfile.lower().endswith(('.jpg', '.jpeg')):
+                self.__save(outputfile, frame.data)
+                self.search_result.put(outputfile)
+            else:
+                result = self.__save_cv(outputfile, image_cv)
+                if result:
+                    self.search_result.put(result)
+            return False, image_cv
+
+        scale = frame.scale
+        region = scale_box(_region(search.box), scale)
+        signature = self.detector.signature(image_cv, region)
+        changed = self.detector.changed(search.signature, signature)
+        if search.func == 'change':
+            if search.signature is None:
+                search.signature = signature
+            elif changed:
+                self.search_result.put(True)
+            return False, image_cv
+
+        if search.func == 'stable':
+            now = time.time()
+            if changed:
+                search.signature, search.since = signature, now
+            elif now - search.since >= search.options.get('duration', 0):
+                self.search_result.put(True)
+            return False, image_cv
+
+        width, height = (image_cv.shape[1], image_cv.shape[0]) if region is None else (region[2], region[3])
+        if not changed and max(width, height) <= self.detector.size * RESOLUTION:
+            return False, image_cv
+        search.signature = signature
+
+        if search.func == 'patternmatch':
+            result, image_cv = self.locator.search_pattern(frame.pyramid, search.target, search.box,
+                                                           self.locator_key(), scale=scale)
+            if result:
+                self.search_result.put(result)
+                return True, image_cv
+
+        elif search.func == 'multipattern':
+            results, image_cv = Picture.search_patterns(frame.pyramid, search.target,
+                                                        search.options.get('first', False), scale)
+            if results:
+                self.search_result.put(results)
+                return True, image_cv
+
+        elif search.func == 'ocr':
+            box = search.box
+            if box and not isinstance(box[0], (int, np.integer)):
+                box = [scale_box(b, scale) for b in box]
+            else:
+                box = scale_box(box, scale)
+            result, image_cv = Ocr.img_to_string(image_cv, box, search.options.get('expect'))
+            if result:
+                self.search_result.put(result)
+                return True, image_cv
+        else:
+            logger.warning('Could not find function : %s', search.func)
+        return False, image_cv
 
     def main_loop(self) -> None:
         """ Minicap Process Main Loop.
         """
-        if self._debug:
-            cv2.namedWindow('debug')
-
+        frames = self.metrics.counter('frames')
         while self._loop_flag:
-            data = self.module['stream'].picture.get()
+            with self.metrics.timer('queue_wait'):
+                data = self.module['stream'].picture.get()
             save_flag = False
-
-            image_pil = Image.open(io.BytesIO(data))
-            image_cv = cv2.cvtColor(np.asarray(image_pil), cv2.COLOR_RGB2BGR)
-
-            if self._search is not None:
-                if self._search.func == 'capture':
-                    outputfile = os.path.join(self.space['tmp'], self._search.target)
-                    result = self.__save_cv(outputfile, image_cv)
-                    if result:
-                        self.search_result.put(result)
-
-                elif self._search.func == 'patternmatch':
-                    result, image_cv = Picture.search_pattern(image_cv, self._search.target, self._search.box,
-                                                              self.space['tmp'])
-                    if result:
-                        self.search_result.put(result)
-                        save_flag = True
-
-                elif self._search.func == 'ocr':
-                    result, image_cv = Ocr.img_to_string(image_cv, self._search.box, self.space['tmp'])
-                    if result:
-                        self.search_result.put(result)
-                        save_flag = True
-                else:
-                    logger.warning('Could not find function : %s', self._search.func)
+            frames.add()
+
+            frame = Frame(self.counter, data, getattr(data, 'timestamp', None), getattr(data, 'scale', self.scale))
+            with self.metrics.timer('decode'):
+                image_cv = frame.bgr
+            with self.frame_cond:
+                self.frame = frame
+                self.frame_cond.notify_all()
+            publisher = self.publisher
+            if publisher is not None:
+                try:
+                    publisher.publish(frame.seq, image_cv, self.module['stream'].banner.orientation, frame.timestamp)
+                except AndroidError as e:
+                    # errors in main_loop would stop the capture.
+                    logger.error('Frame Bus is stopped. : %s', e)
+                    self.publisher = None
+
+            search = self._search
+            if search is not None:
+                with self.metrics.timer('match.%s' % search.func):
+                    with trace.span('match.%s' % search.func, 'minicap', seq=frame.seq):
+                        save_flag, image_cv = self.__evaluate(search, frame)
 
             if (not self.counter % 5) or save_flag:
                 self.__save_evidence(self.counter / 5, image_cv)
 
-            if self._debug:
-                if self.module['adb'] is None:
-                    resize_image_cv = cv2.resize(image_cv, (640, 360))
-                else:
-                    h = int(int(self.module['adb'].get().MINICAP_WIDTH) / 2)
-                    w = int(int(self.module['adb'].get().MINICAP_HEIGHT) / 2)
-                    if not int(self.module['adb'].get().ROTATE):
-                        resize_image_cv = cv2.resize(image_cv, (h, w))
-                    else:
-                        resize_image_cv = cv2.resize(image_cv, (w, h))
-                cv2.imshow('debug', resize_image_cv)
-                key = cv2.waitKey(5)
-                if key == 27:
-                    break
             self.counter += 1
 
-        if self._debug:
-            cv2.destroyAllWindows()
+
+def _region(box: Any) -> Optional[Tuple[int, int, int, int]]:
+    """ Bounding region of box, or list of boxes.
+    Arguments:
+        box(Any): box object, or list of box objects. (x, y, width, height)
+    Returns:
+        region(Optional[Tuple[int, int, int, int]]): bounding box. None is full frame.
+    """
+    if not box or isinstance(box[0], (int, np.integer)):
+        return box
+    x0, y0 = min([b[0] for b in box]), min([b[1] for b in box])
+    x1, y1 = max([b[0] + b[2] for b in box]), max([b[1] + b[3] for b in box])
+    return (x0, y0, x1 - x0, y1 - y0)
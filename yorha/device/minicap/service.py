@@ -1,5 +1,5 @@
 """  Orlov Plugins : Minicap Service Utility. """
-from typing import Optional
+from typing import Dict, Optional, Tuple, Any
 import os
 import sys
 import logging
@@ -11,6 +11,7 @@ PATH = os.path.abspath(os.path.dirname(os.path.dirname(os.path.dirname(os.path.a
 if PATH not in sys.path:
     sys.path.insert(0, PATH)
 
+DEVICE_PATH = '/data/local/tmp/minicap-devel'
 logger = logging.getLogger(__name__)
 
 
@@ -24,23 +25,27 @@ class MinicapService:
         self.name = name
         self.proc: Optional[subprocess.Popen] = None
         self.description = 'Minicap Server Process.'
+        self.config: Dict[str, Any] = {}
 
-    def start(self, adb: Android, log: str) -> None:
+    def start(self, adb: Android, log: str, quality: Optional[int] = None, size: Optional[Tuple[int, int]] = None,
+              fps: Optional[int] = None) -> None:
         """ start minicap service.
         Arguments:
             adb(Android): android target object.
             log(str): log file path.
+            quality(Optional[int]): jpeg quality. (0 - 100) default : minicap default.
+            size(Optional[Tuple[int, int]]): projection size. (width, height) default : MINICAP_WIDTH, MINICAP_HEIGHT.
+            fps(Optional[int]): max frame rate. default : no limit.
         """
         APP_LOG = os.path.abspath(os.path.join(log, 'bin'))
         if not os.path.exists(APP_LOG):
             os.mkdir(APP_LOG)
         log_folder = open(os.path.abspath(os.path.join(APP_LOG, '%s.log' % self.name)), 'w')
 
-        LD_LIB = 'LD_LIBRARY_PATH=//data//local//tmp//minicap-devel'
-        BIN = '//data//local//tmp//minicap-devel//minicap'
-        ARGS = '%sx%s@%sx%s/%s' % (adb.get().WIDTH, adb.get().HEIGHT, adb.get().MINICAP_WIDTH, adb.get().MINICAP_HEIGHT,
-                                   adb.get().ROTATE)  # v: 0, h: 90
-        EXEC = 'adb -s %s shell %s %s -P %s' % (adb.get().SERIAL, LD_LIB, BIN, ARGS)
+        if size is None:
+            size = (int(adb.get().MINICAP_WIDTH), int(adb.get().MINICAP_HEIGHT))
+        self.config = {'quality': quality, 'size': size, 'fps': fps}
+        EXEC = self.command(adb, quality, size, fps)
         logger.debug(EXEC)
         if self.proc is None:
             # subprocess_args = {'stdin': subprocess.PIPE, 'stdout': log_folder, 'stderr': log_folder}
@@ -48,6 +53,28 @@ class MinicapService:
         else:
             pass
 
+    def command(self, adb: Android, quality: Optional[int] = None, size: Optional[Tuple[int, int]] = None,
+                fps: Optional[int] = None) -> str:
+        """ minicap command line.
+        Arguments:
+            adb(Android): android target object.
+            quality(Optional[int]): jpeg quality. (0 - 100) default : minicap default.
+            size(Optional[Tuple[int, int]]): projection size. (width, height) default : MINICAP_WIDTH, MINICAP_HEIGHT.
+            fps(Optional[int]): max frame rate. default : no limit.
+        Returns:
+            command(str): command line.
+        """
+        LD_LIB = 'LD_LIBRARY_PATH=%s' % DEVICE_PATH
+        BIN = '%s/minicap' % DEVICE_PATH
+        if size is None:
+            size = (int(adb.get().MINICAP_WIDTH), int(adb.get().MINICAP_HEIGHT))
+        ARGS = '%sx%s@%sx%s/%s' % (adb.get().WIDTH, adb.get().HEIGHT, size[0], size[1], adb.get().ROTATE)  # v: 0, h: 90
+        if quality is not None:
+            ARGS += ' -Q %d' % quality
+        if fps is not None:
+            ARGS += ' -r %d' % fps
+        return 'adb -s %s shell %s %s -P %s' % (adb.get().SERIAL, LD_LIB, BIN, ARGS)
+
     def stop(self) -> None:
         """ stop minicap service.
         """
@@ -57,6 +84,19 @@ class MinicapService:
         else:
             pass
 
+    def restart(self, adb: Android, log: str, quality: Optional[int] = None, size: Optional[Tuple[int, int]] = None,
+                fps: Optional[int] = None) -> None:
+        """ restart minicap service with new parameters.
+        Arguments:
+            adb(Android): android target object.
+            log(str): log file path.
+            quality(Optional[int]): jpeg quality. (0 - 100)
+            size(Optional[Tuple[int, int]]): projection size. (width, height)
+            fps(Optional[int]): max frame rate.
+        """
+        self.stop()
+        self.start(adb, log, quality, size, fps)
+
     def status(self) -> bool:
         """ get minicap service status.
         Returns:
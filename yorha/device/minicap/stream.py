@@ -2,11 +2,15 @@
 from typing import Union, Optional
 import os
 import sys
+import time
 import socket
 import logging
 import threading
 from queue import Queue
 
+from yorha import trace
+from yorha.metrics import Metrics
+
 PATH = os.path.abspath(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 if PATH not in sys.path:
     sys.path.insert(0, PATH)
@@ -24,6 +28,17 @@ def bytes_to_int(byte_data: Union[int, bytes]) -> int:
         return int.from_bytes(byte_data, 'big')
 
 
+class FrameData(bytearray):
+    """ Minicap Frame Data. (jpeg)
+
+    Attributes:
+        timestamp(float): received time.
+        scale(float): projection scale of the connection.
+    """
+    timestamp = 0.0
+    scale = 1.0
+
+
 class Banner:
     """ Minicap DataSet Object.
     """
@@ -67,10 +82,12 @@ class MinicapStream:
         self.PID = 0
         self.banner = Banner()
         self.minicap_socket: Optional[socket.socket] = None
-        self.read_image_stream_task = None
+        self.read_image_stream_task: Optional[threading.Thread] = None
 
         self.push = None
         self.picture: Queue[bytearray] = Queue()
+        self.metrics = Metrics('stream')
+        self.scale = 1.0
         self.__flag = True
 
     @staticmethod
@@ -122,15 +139,38 @@ class MinicapStream:
     def start(self) -> None:
         """ start Minicap Stream.
         """
+        self.__flag = True
+        self.banner = Banner()
         self.minicap_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.minicap_socket.connect((self.IP, self.PORT))
-        threading.Thread(target=self.read_image_stream).start()
+        self.read_image_stream_task = threading.Thread(target=self.read_image_stream, name='yorha-minicap-stream')
+        self.read_image_stream_task.start()
 
     def finish(self) -> None:
         """ call stop Minicap Stream.
         """
         self.__flag = False
 
+    def restart(self, scale: Optional[float] = None) -> None:
+        """ reconnect Minicap Stream. Frames of the previous connection are discarded.
+        Arguments:
+            scale(Optional[float]): projection scale of the new connection. default : unchanged.
+        """
+        self.finish()
+        if self.minicap_socket is not None:
+            try:
+                self.minicap_socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.minicap_socket.close()
+        if self.read_image_stream_task is not None:
+            self.read_image_stream_task.join(timeout=5)
+        while not self.picture.empty():
+            self.picture.get_nowait()
+        if scale is not None:
+            self.scale = scale
+        self.start()
+
     def read_image_stream(self) -> None:
         """ read Image Stream.
         """
@@ -138,17 +178,27 @@ class MinicapStream:
         banner_length = 2
         read_frame_bytes = 0
         frame_body_length = 0
-        data_body = bytearray(b'')
+        data_body = FrameData()
         counter = 0
+        received = self.metrics.counter('bytes')
+        frames = self.metrics.counter('frames')
+        drops = self.metrics.counter('drops')
+        parse = self.metrics.histogram('parse')
+        parse_time = 0.0
 
         while self.__flag:
             # logger.info('Picture Queue : %s' % (self.get_d()))
             if self.minicap_socket is None:
                 return
-            reallen = self.minicap_socket.recv(4096)
+            try:
+                reallen = self.minicap_socket.recv(4096)
+            except OSError:
+                return
             length = len(reallen)
             if not length:
-                continue
+                return
+            received.add(length)
+            begin = time.perf_counter()
             cursor = 0
             while cursor < length:
                 if read_banner_bytes < banner_length:
@@ -185,19 +235,28 @@ class MinicapStream:
                     read_frame_bytes += 1
                 else:
                     if length - cursor >= frame_body_length:
-                        data_body = data_body + reallen[cursor:(cursor + frame_body_length)]
+                        data_body.extend(reallen[cursor:(cursor + frame_body_length)])
+                        data_body.timestamp = time.time()
+                        data_body.scale = self.scale
                         if bytes_to_int(data_body[0]) != 0xFF or bytes_to_int(data_body[1]) != 0xD8:
                             return
                         self.picture.put(data_body)
+                        trace.instant('frame', 'stream', size=frame_body_length)
                         if self.get_d() > MAX_SIZE:
                             self.picture.get()
+                            drops.add()
+                        frames.add()
+                        parse.observe(parse_time + time.perf_counter() - begin)
+                        parse_time = 0.0
+                        begin = time.perf_counter()
                         cursor += frame_body_length
                         frame_body_length = 0
                         read_frame_bytes = 0
-                        data_body = bytearray(b'')
+                        data_body = FrameData()
                         counter += 1
                     else:
-                        data_body = data_body + reallen[cursor:length]
+                        data_body.extend(reallen[cursor:length])
                         frame_body_length -= length - cursor
                         read_frame_bytes += length - cursor
                         cursor = length
+            parse_time += time.perf_counter() - begin
@@ -0,0 +1,258 @@
+""" YoRHa Plugins : Minitouch Client Utility. """
+from typing import List, Optional, Sequence, Tuple
+import socket
+import logging
+import threading
+
+from yorha.exception import AndroidError
+
+PRESSURE = 50
+STEPS = 10
+logger = logging.getLogger(__name__)
+
+Point = Tuple[int, int]
+
+
+class TouchBanner:
+    """ Minitouch Banner Object.
+    """
+
+    def __init__(self) -> None:
+        self.version = 0
+        self.max_contacts = 0
+        self.max_x = 0
+        self.max_y = 0
+        self.max_pressure = 0
+        self.pid = 0
+
+    def __str__(self) -> str:
+        return 'TouchBanner [ Version = %d, MaxContacts = %d, MaxX = %d, MaxY = %d, MaxPressure = %d, PID = %d ]' % (
+            self.version, self.max_contacts, self.max_x, self.max_y, self.max_pressure, self.pid)
+
+
+class MinitouchClient:
+    """ Minitouch Client. Keep the socket open, and send touch events.
+    Events are buffered and sent at once by flush(), so the timing of `w` runs on the device.
+
+    Attributes:
+        ip(str): server ip address.
+        port(str): server port.
+        size(Optional[Tuple[int, int]]): screen coordinate size. (width, height). default : no scaling.
+    """
+
+    def __init__(self, ip: str = '127.0.0.1', port: str = '1111', size: Optional[Tuple[int, int]] = None) -> None:
+        self.IP = ip
+        self.PORT = int(port)
+        self.size = size
+        self.banner = TouchBanner()
+        self.minitouch_socket: Optional[socket.socket] = None
+        self._buffer: List[str] = []
+        # reentrant : tap and gesture hold it over the whole sequence, so concurrent gestures do not interleave.
+        self._mutex = threading.RLock()
+
+    def get_port(self) -> int:
+        """ get Port.
+        Returns:
+            port(int): server port.
+        """
+        return self.PORT
+
+    def start(self, timeout: float = 5) -> None:
+        """ connect minitouch, and read banner.
+        Arguments:
+            timeout(float): connect timeout.
+        Raises:
+            AndroidError: invalid banner.
+        """
+        self.minitouch_socket = socket.create_connection((self.IP, self.PORT), timeout=timeout)
+        self.minitouch_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        reader = self.minitouch_socket.makefile('r')
+        while True:
+            line = reader.readline()
+            if not line:
+                raise AndroidError('Minitouch Banner is not received.')
+            args = line.split()
+            if args[0] == 'v':
+                self.banner.version = int(args[1])
+            elif args[0] == '^':
+                self.banner.max_contacts, self.banner.max_x, self.banner.max_y, self.banner.max_pressure = [
+                    int(a) for a in args[1:5]
+                ]
+            elif args[0] == '$':
+                self.banner.pid = int(args[1])
+                break
+        self.minitouch_socket.settimeout(None)
+        logger.debug(self.banner)
+
+    def finish(self) -> None:
+        """ close minitouch socket.
+        """
+        if self.minitouch_socket is not None:
+            self.minitouch_socket.close()
+            self.minitouch_socket = None
+
+    def _point(self, x: int, y: int) -> Point:
+        """ Scale screen point to touch device point.
+        Arguments:
+            x(int): position x.
+            y(int): position y.
+        Returns:
+            point(Tuple[int, int]): touch device point.
+        """
+        if self.size is None:
+            return int(x), int(y)
+        return (int(x * self.banner.max_x / max(1, self.size[0] - 1)),
+                int(y * self.banner.max_y / max(1, self.size[1] - 1)))
+
+    def _append(self, event: str) -> 'MinitouchClient':
+        """ Append an event to the buffer.
+        Arguments:
+            event(str): minitouch command line.
+        Returns:
+            client(MinitouchClient): self.
+        """
+        with self._mutex:
+            self._buffer.append(event)
+        return self
+
+    def down(self, contact: int, x: int, y: int, pressure: int = PRESSURE) -> 'MinitouchClient':
+        """ Touch down.
+        Arguments:
+            contact(int): contact id.
+            x(int): position x.
+            y(int): position y.
+            pressure(int): pressure.
+        Returns:
+            client(MinitouchClient): self.
+        """
+        px, py = self._point(x, y)
+        return self._append('d %d %d %d %d\n' % (contact, px, py, pressure))
+
+    def move(self, contact: int, x: int, y: int, pressure: int = PRESSURE) -> 'MinitouchClient':
+        """ Touch move.
+        Arguments:
+            contact(int): contact id.
+            x(int): position x.
+            y(int): position y.
+            pressure(int): pressure.
+        Returns:
+            client(MinitouchClient): self.
+        """
+        px, py = self._point(x, y)
+        return self._append('m %d %d %d %d\n' % (contact, px, py, pressure))
+
+    def up(self, contact: int) -> 'MinitouchClient':
+        """ Touch up.
+        Arguments:
+            contact(int): contact id.
+        Returns:
+            client(MinitouchClient): self.
+        """
+        return self._append('u %d\n' % contact)
+
+    def commit(self) -> 'MinitouchClient':
+        """ Commit events.
+        Returns:
+            client(MinitouchClient): self.
+        """
+        return self._append('c\n')
+
+    def wait(self, ms: int) -> 'MinitouchClient':
+        """ Wait on the device.
+        Arguments:
+            ms(int): wait time. (msec)
+        Returns:
+            client(MinitouchClient): self.
+        """
+        return self._append('w %d\n' % ms)
+
+    def reset(self) -> 'MinitouchClient':
+        """ Reset all contacts.
+        Returns:
+            client(MinitouchClient): self.
+        """
+        return self._append('r\n')
+
+    def flush(self) -> None:
+        """ Send buffered events.
+        Raises:
+            AndroidError: not connected.
+        """
+        if self.minitouch_socket is None:
+            raise AndroidError('Minitouch is not connected.')
+        with self._mutex:
+            data, self._buffer = ''.join(self._buffer), []
+            self.minitouch_socket.sendall(data.encode('ascii'))
+
+    def tap(self, x: int, y: int, duration: int = 50) -> None:
+        """ Tap.
+        Arguments:
+            x(int): position x.
+            y(int): position y.
+            duration(int): touch duration. (msec)
+        """
+        with self._mutex:
+            self.down(0, x, y).commit().wait(duration).up(0).commit().flush()
+
+    def gesture(self, paths: Sequence[Sequence[Point]], duration: int = 300) -> None:
+        """ Multi-touch gesture. Each contact moves along its path at the same pace.
+        Arguments:
+            paths(Sequence[Sequence[Point]]): points of each contact. contact id is the index.
+            duration(int): gesture duration. (msec)
+        Raises:
+            AndroidError: too many contacts.
+        """
+        if self.banner.max_contacts and len(paths) > self.banner.max_contacts:
+            raise AndroidError('Too many contacts. : %d > %d' % (len(paths), self.banner.max_contacts))
+        steps = max([len(path) for path in paths]) - 1
+        with self._mutex:
+            for contact, path in enumerate(paths):
+                self.down(contact, *path[0])
+            self.commit()
+            for step in range(1, steps + 1):
+                self.wait(int(duration / max(1, steps)))
+                for contact, path in enumerate(paths):
+                    if step < len(path):
+                        self.move(contact, *path[step])
+                self.commit()
+            for contact in range(len(paths)):
+                self.up(contact)
+            self.commit().flush()
+
+    def swipe(self, x1: int, y1: int, x2: int, y2: int, duration: int = 300, steps: int = STEPS) -> None:
+        """ Swipe.
+        Arguments:
+            x1(int): start position x.
+            y1(int): start position y.
+            x2(int): end position x.
+            y2(int): end position y.
+            duration(int): swipe duration. (msec)
+            steps(int): move steps.
+        """
+        self.gesture([_line((x1, y1), (x2, y2), steps)], duration)
+
+    def pinch(self, x: int, y: int, start: int, end: int, duration: int = 300, steps: int = STEPS) -> None:
+        """ Pinch with two contacts. (horizontal)
+        Arguments:
+            x(int): center position x.
+            y(int): center position y.
+            start(int): start distance from center.
+            end(int): end distance from center. larger than start is pinch out.
+            duration(int): pinch duration. (msec)
+            steps(int): move steps.
+        """
+        self.gesture([_line((x - start, y), (x - end, y), steps), _line((x + start, y), (x + end, y), steps)], duration)
+
+
+def _line(begin: Point, end: Point, steps: int) -> List[Point]:
+    """ Points on the line.
+    Arguments:
+        begin(Point): start point.
+        end(Point): end point.
+        steps(int): steps.
+    Returns:
+        points(List[Point]): steps + 1 points.
+    """
+    steps = max(1, steps)
+    return [(int(begin[0] + (end[0] - begin[0]) * i / steps), int(begin[1] + (end[1] - begin[1]) * i / steps))
+            for i in range(steps + 1)]
@@ -0,0 +1,88 @@
+"""  YoRHa Plugins : Minitouch Service Utility. """
+from typing import Optional
+import os
+import logging
+import subprocess
+
+from yorha.device.adb import Android
+from yorha.exception import AndroidError, RunError
+
+BIN = '/data/local/tmp/minitouch'
+PORT = 1111
+PREBUILT_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..', '..', '..', 'vendor', 'minitouch', 'libs'))
+logger = logging.getLogger(__name__)
+
+
+class MinitouchService:
+    """ Minitouch Module Service Utility.
+    Attributes:
+        name(str): service name.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.proc: Optional[subprocess.Popen] = None
+        self.adb: Optional[Android] = None
+        self.port: Optional[int] = None
+        self.description = 'Minitouch Server Process.'
+
+    def install(self, adb: Android, prebuilt: str = PREBUILT_PATH) -> Optional[str]:
+        """ push minitouch binary for the device abi.
+        Arguments:
+            adb(Android): android target object.
+            prebuilt(str): prebuilt directory. ({prebuilt}/{abi}/minitouch)
+        Returns:
+            result(Optional[str]): adb push result, or None if the binary is not found.
+        """
+        abi = str(adb.getprop('ro.product.cpu.abi')).strip()
+        binary = os.path.join(prebuilt, abi, 'minitouch')
+        if not os.path.exists(binary):
+            logger.warning('Minitouch binary is not found. : %s', binary)
+            return None
+        result = adb.push(binary, BIN)
+        adb.shell('chmod 755 %s' % BIN)
+        return result
+
+    def start(self, adb: Android, log: str, port: int = PORT) -> None:
+        """ start minitouch service, and forward the local port to it.
+        The forward is recorded by adb, so it is restored after root / tcpip / usb.
+        Arguments:
+            adb(Android): android target object.
+            log(str): log file path.
+            port(int): local port of MinitouchClient. default : 1111.
+        """
+        APP_LOG = os.path.abspath(os.path.join(log, 'bin'))
+        if not os.path.exists(APP_LOG):
+            os.mkdir(APP_LOG)
+        log_folder = open(os.path.abspath(os.path.join(APP_LOG, '%s.log' % self.name)), 'w')
+
+        EXEC = 'adb -s %s shell %s' % (adb.get().SERIAL, BIN)
+        logger.debug(EXEC)
+        if self.proc is None:
+            self.proc = subprocess.Popen(EXEC.split(), stdin=subprocess.PIPE, stdout=log_folder, stderr=log_folder)
+        adb.forward('tcp:%d localabstract:minitouch' % port)
+        self.adb, self.port = adb, port
+
+    def stop(self) -> None:
+        """ stop minitouch service, and remove the forward.
+        """
+        if self.adb is not None and self.port is not None:
+            try:
+                self.adb.forward('--remove tcp:%d' % self.port)
+            except (AndroidError, RunError) as e:
+                logger.warning('Minitouch forward is not removed. : %s', e)
+            self.adb, self.port = None, None
+        if self.proc is not None:
+            if os.name == 'nt':
+                subprocess.Popen('taskkill /F /T /PID %i' % self.proc.pid, shell=True)
+            else:
+                self.proc.kill()
+            self.proc = None
+
+    def status(self) -> bool:
+        """ get minitouch service status.
+        Returns:
+            result(bool): service status.
+        """
+        return self.proc is not None and self.proc.poll() is None
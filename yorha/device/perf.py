@@ -0,0 +1,372 @@
+""" YoRHa Plugins : Android Performance Sampler Utility. """
+from typing import Any, BinaryIO, Dict, List, Optional, Sequence, Tuple
+import os
+import math
+import time
+import struct
+import logging
+import threading
+import subprocess
+
+from yorha.exception import AndroidError
+
+INTERVAL = 1.0
+PAGE_KB = 4
+JANK_MS = 1000.0 / 60
+MAGIC = b'YPRF'
+COLUMNS = ('time', 'cpu', 'app_cpu', 'app_rss', 'mem_available', 'frames', 'janky', 'frame_p90', 'temperature')
+logger = logging.getLogger(__name__)
+
+
+class PerfSeries:
+    """ Compact binary time series. A header of column names, and fixed size records.
+    time is float64 and the other columns are float32. missing values are NaN.
+
+    Attributes:
+        path(str): output filepath. appended if it exists with the same columns.
+        columns(Sequence[str]): column names. the first column is time.
+    """
+
+    def __init__(self, path: str, columns: Sequence[str] = COLUMNS) -> None:
+        self.path = path
+        self.columns = tuple(columns)
+        self.record = struct.Struct('<d%df' % (len(self.columns) - 1))
+        self._file: Optional[BinaryIO] = None
+
+    def __repr__(self) -> str:
+        return 'PerfSeries()'
+
+    def __str__(self) -> str:
+        return 'PerfSeries [ Path = %s, Columns = %s ]' % (self.path, ','.join(self.columns))
+
+    def open(self) -> None:
+        """ Open the file and write the header if new.
+        Raises:
+            AndroidError: the file has other columns.
+        """
+        if os.path.exists(self.path) and os.path.getsize(self.path):
+            columns, _ = _header(self.path)
+            if columns != self.columns:
+                raise AndroidError('Columns are mismatched. : %s' % self.path)
+            self._file = open(self.path, 'ab')
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._file = open(self.path, 'wb')
+        names = ','.join(self.columns).encode('ascii')
+        self._file.write(MAGIC + struct.pack('<H', len(names)) + names)
+
+    def close(self) -> None:
+        """ Close the file.
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def append(self, row: Dict[str, float]) -> None:
+        """ Append a record.
+        Arguments:
+            row(Dict[str, float]): values by column name.
+        """
+        if self._file is None:
+            self.open()
+        values = [row.get(name, math.nan) for name in self.columns]
+        self._file.write(self.record.pack(*values))  # type: ignore
+        self._file.flush()  # type: ignore
+
+    @staticmethod
+    def load(path: str) -> Dict[str, List[float]]:
+        """ Load the series as columns.
+        Arguments:
+            path(str): series filepath.
+        Raises:
+            AndroidError: invalid file.
+        Returns:
+            series(Dict[str, List[float]]): values by column name.
+        """
+        columns, offset = _header(path)
+        record = struct.Struct('<d%df' % (len(columns) - 1))
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+        count = len(data) // record.size
+        rows = [record.unpack_from(data, i * record.size) for i in range(count)]
+        return {name: [row[index] for row in rows] for index, name in enumerate(columns)}
+
+
+def _header(path: str) -> Tuple[Tuple[str, ...], int]:
+    """ Read series header.
+    Arguments:
+        path(str): series filepath.
+    Raises:
+        AndroidError: invalid file.
+    Returns:
+        result(Tuple[Tuple[str, ...], int]): column names, and offset of the first record.
+    """
+    with open(path, 'rb') as f:
+        head = f.read(6)
+        if len(head) < 6 or head[:4] != MAGIC:
+            raise AndroidError('Invalid perf series. : %s' % path)
+        length = struct.unpack('<H', head[4:])[0]
+        return tuple(f.read(length).decode('ascii').split(',')), 6 + length
+
+
+class PerfSampler:
+    """ Device performance sampler on one persistent shell session.
+    Each sample writes one script to the shell, and reads the sections until the end marker.
+    Deltas (cpu, new frames) are computed on the host.
+
+    Attributes:
+        adb(Android): android adaptor object.
+        package(Optional[str]): target application package. None is the system metrics only.
+        path(Optional[str]): series output filepath. None is not saved.
+        interval(float): sampling interval. (sec)
+        frames(bool): sample `dumpsys gfxinfo framestats`.
+        thermal(bool): sample thermal zones.
+    """
+
+    def __init__(self, adb: Any, package: Optional[str] = None, path: Optional[str] = None,
+                 interval: float = INTERVAL, frames: bool = True, thermal: bool = True) -> None:
+        self.adb = adb
+        self.package = package
+        self.path = path
+        self.interval = interval
+        self.frames = frames and package is not None
+        self.thermal = thermal
+        self.samples = 0
+        self.proc: Optional[subprocess.Popen] = None
+        self.series = PerfSeries(path) if path is not None else None
+        self.last: Dict[str, float] = {}
+        self._previous: Optional[Tuple[int, int, Optional[int]]] = None
+        self._vsync = 0
+        self._mutex = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __repr__(self) -> str:
+        return 'PerfSampler()'
+
+    def __str__(self) -> str:
+        return 'PerfSampler [ Serial = %s, Package = %s, Interval = %s, Samples = %d ]' % (
+            self.adb.get().SERIAL, self.package, self.interval, self.samples)
+
+    def command(self) -> List[str]:
+        """ Shell session command line.
+        Returns:
+            command(List[str]): program arguments.
+        """
+        return ['adb'] + self.adb.target() + ['shell']
+
+    def script(self) -> str:
+        """ Shell script of one sample.
+        Returns:
+            script(str): shell script.
+        """
+        lines = ["echo @@stat; grep '^cpu ' /proc/stat",
+                 "echo @@meminfo; grep -E '^MemAvailable:' /proc/meminfo"]
+        if self.package is not None:
+            lines.append('echo @@pid; p=$(pidof -s %s); [ -n "$p" ] && cat /proc/$p/stat' % self.package)
+        if self.frames:
+            lines.append("echo @@gfx; dumpsys gfxinfo %s framestats | grep -E '^(Flags|[0-9]+,)'" % self.package)
+        if self.thermal:
+            lines.append('echo @@thermal; cat /sys/class/thermal/thermal_zone*/temp 2>/dev/null')
+        lines.append('echo @@end')
+        return '\n'.join(lines) + '\n'
+
+    def open(self) -> None:
+        """ Open shell session.
+        """
+        if self.proc is not None and self.proc.poll() is None:
+            return
+        command = self.command()
+        logger.debug(' '.join(command))
+        self.proc = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                     stderr=subprocess.DEVNULL)
+
+    def close(self) -> None:
+        """ Close shell session.
+        """
+        proc, self.proc = self.proc, None
+        if proc is not None:
+            proc.kill()
+            proc.wait()
+
+    def read(self) -> Dict[str, List[str]]:
+        """ Run the script and read the sections.
+        Raises:
+            AndroidError: shell session closed.
+        Returns:
+            sections(Dict[str, List[str]]): output lines by section name.
+        """
+        self.open()
+        proc = self.proc
+        try:
+            proc.stdin.write(self.script().encode('utf-8'))  # type: ignore
+            proc.stdin.flush()  # type: ignore
+        except (OSError, AttributeError) as e:
+            self.close()
+            raise AndroidError('Perf shell closed. : %s' % e)
+        sections: Dict[str, List[str]] = {}
+        current: List[str] = []
+        while True:
+            raw = proc.stdout.readline()  # type: ignore
+            if not raw:
+                self.close()
+                raise AndroidError('Perf shell closed.')
+            line = raw.decode('utf-8', 'replace').rstrip('\r\n')
+            if line == '@@end':
+                return sections
+            if line.startswith('@@'):
+                current = sections.setdefault(line[2:], [])
+            else:
+                current.append(line)
+
+    def sample(self) -> Dict[str, float]:
+        """ Take a sample. deltas of the first sample are NaN.
+        Raises:
+            AndroidError: shell session closed.
+        Returns:
+            row(Dict[str, float]): values by column name.
+        """
+        with self._mutex:
+            now = time.time()
+            sections = self.read()
+            row = self.evaluate(now, sections)
+            self.samples += 1
+            self.last = row
+            if self.series is not None:
+                self.series.append(row)
+            return row
+
+    def evaluate(self, now: float, sections: Dict[str, List[str]]) -> Dict[str, float]:
+        """ Compute values from the sections, and keep counters for the next deltas.
+        Arguments:
+            now(float): sample time.
+            sections(Dict[str, List[str]]): output lines by section name.
+        Returns:
+            row(Dict[str, float]): values by column name.
+        """
+        row = {name: math.nan for name in COLUMNS}
+        row['time'] = now
+        total, idle = _cpu(sections.get('stat', []))
+        app, rss = _process(sections.get('pid', []))
+        previous, self._previous = self._previous, (total, idle, app)
+        if previous is not None and total > previous[0]:
+            elapsed = total - previous[0]
+            row['cpu'] = 100.0 * (elapsed - (idle - previous[1])) / elapsed
+            if app is not None and previous[2] is not None and app >= previous[2]:
+                row['app_cpu'] = 100.0 * (app - previous[2]) / elapsed
+        if rss is not None:
+            row['app_rss'] = rss * PAGE_KB
+        for line in sections.get('meminfo', []):
+            args = line.split()
+            if len(args) >= 2 and args[1].isdigit():
+                row['mem_available'] = int(args[1])
+        if self.frames:
+            durations, self._vsync = _frames(sections.get('gfx', []), self._vsync)
+            row['frames'] = len(durations)
+            row['janky'] = len([d for d in durations if d > JANK_MS])
+            if durations:
+                row['frame_p90'] = sorted(durations)[min(len(durations) - 1, int(len(durations) * 0.9))]
+        temperatures = [int(v) for v in sections.get('thermal', []) if v.strip().lstrip('-').isdigit()]
+        if temperatures:
+            value = max(temperatures)
+            row['temperature'] = value / 1000.0 if abs(value) >= 1000 else float(value)
+        return row
+
+    def start(self) -> None:
+        """ start sampling thread.
+        """
+        if self.series is not None:
+            self.series.open()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.main_loop, name='yorha-perf', daemon=True)
+        self._thread.start()
+
+    def finish(self) -> None:
+        """ finish sampling thread, and close the session and the series.
+        """
+        self._stop.set()
+        self.close()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 5)
+            self._thread = None
+        if self.series is not None:
+            self.series.close()
+
+    def main_loop(self) -> None:
+        """ Sampler Main Loop. samples on a fixed schedule, and skips missed ticks.
+        """
+        deadline = time.time()
+        while not self._stop.is_set():
+            try:
+                self.sample()
+            except AndroidError as e:
+                if self._stop.is_set():
+                    return
+                logger.warning('Perf sample failed. : %s', e)
+            deadline += self.interval
+            now = time.time()
+            if deadline < now:
+                deadline = now + self.interval - (now - deadline) % self.interval
+            self._stop.wait(deadline - now)
+
+
+def _cpu(lines: List[str]) -> Tuple[int, int]:
+    """ Total and idle jiffies of /proc/stat.
+    Arguments:
+        lines(List[str]): `cpu` line.
+    Returns:
+        result(Tuple[int, int]): total and idle (with iowait) jiffies.
+    """
+    for line in lines:
+        args = line.split()
+        if args and args[0] == 'cpu':
+            values = [int(v) for v in args[1:9] if v.isdigit()]
+            return sum(values), sum(values[3:5])
+    return 0, 0
+
+
+def _process(lines: List[str]) -> Tuple[Optional[int], Optional[int]]:
+    """ cpu jiffies and rss pages of /proc/pid/stat.
+    Arguments:
+        lines(List[str]): stat line.
+    Returns:
+        result(Tuple[Optional[int], Optional[int]]): utime + stime, and rss. None if not running.
+    """
+    for line in lines:
+        if ')' not in line:
+            continue
+        args = line.rsplit(')', 1)[1].split()
+        if len(args) > 21:
+            return int(args[11]) + int(args[12]), int(args[21])
+    return None, None
+
+
+def _frames(lines: List[str], vsync: int) -> Tuple[List[float], int]:
+    """ New frame durations of `dumpsys gfxinfo framestats`.
+    Arguments:
+        lines(List[str]): header and frame lines.
+        vsync(int): IntendedVsync of the last seen frame.
+    Returns:
+        result(Tuple[List[float], int]): durations of the new frames (msec), and the last IntendedVsync.
+    """
+    durations = []
+    index: Dict[str, int] = {}
+    latest = vsync
+    for line in lines:
+        args = line.rstrip(',').split(',')
+        if args[0] == 'Flags':
+            index = {name: i for i, name in enumerate(args)}
+            continue
+        if 'IntendedVsync' not in index or 'FrameCompleted' not in index:
+            continue
+        try:
+            flags, intended = int(args[0]), int(args[index['IntendedVsync']])
+            completed = int(args[index['FrameCompleted']])
+        except (ValueError, IndexError):
+            continue
+        if flags != 0 or intended <= vsync or completed <= intended:
+            continue
+        durations.append((completed - intended) / 1e6)
+        latest = max(latest, intended)
+    return durations, latest
@@ -1,4 +1,5 @@
 """ Android Base Class. """
 from yorha.device.profile.android_base import AndroidProp
+from yorha.device.profile.registry import ProfileRegistry, PROFILE_PATH, get_registry
 
-__all__ = ['AndroidProp']
+__all__ = ['AndroidProp', 'ProfileRegistry', 'PROFILE_PATH', 'get_registry']
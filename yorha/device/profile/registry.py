@@ -0,0 +1,238 @@
+""" Android Profile Registry. """
+from typing import Any, Dict, Optional, Set, Type
+import os
+import json
+import logging
+import threading
+import importlib
+import importlib.util
+
+try:
+    import tomllib  # type: ignore
+except ImportError:  # pragma: no cover
+    try:
+        import toml as tomllib  # type: ignore
+    except ImportError:
+        tomllib = None
+
+from yorha.device.profile.android_base import AndroidProp
+from yorha.exception import AndroidError
+
+PACKAGE = 'yorha.device.profile'
+PROFILE_PATH = os.path.abspath(os.path.dirname(__file__))
+DEFAULT = '0000000000000000'
+EXTENSIONS = ('.py', '.json', '.toml')
+logger = logging.getLogger(__name__)
+
+
+class ProfileRegistry:
+    """ Android Profile Registry.
+    The profile directory is indexed once, and loaded profile classes are cached.
+
+    Profile files are named by the serial. (_{serial}.py, _{serial}.json, _{serial}.toml)
+    Python profiles define the class `_{serial}`. Data profiles have attributes, and `extends` is the base profile.
+    (serial of another profile, or `AndroidProp`. default : AndroidProp)
+
+    Attributes:
+        host(str): profile directory. default : PROFILE_PATH.
+    """
+
+    def __init__(self, host: str = PROFILE_PATH) -> None:
+        self.host = os.path.abspath(host)
+        self._index: Optional[Dict[str, str]] = None
+        self._classes: Dict[str, Type[AndroidProp]] = {}
+        self._devices: Dict[str, Type[AndroidProp]] = {}
+        self._loading: Set[str] = set()
+        self._mutex = threading.RLock()
+
+    def __repr__(self) -> str:
+        return 'ProfileRegistry()'
+
+    def __str__(self) -> str:
+        return 'ProfileRegistry [ Host = %s, Profiles = %d ]' % (self.host, len(self.index()))
+
+    def index(self) -> Dict[str, str]:
+        """ Index profile files.
+        Raises:
+            AndroidError: profile directory is not found.
+        Returns:
+            index(Dict[str, str]): profile filepath by name.
+        """
+        if self._index is None:
+            with self._mutex:
+                if self._index is None:
+                    if not os.path.exists(self.host):
+                        logger.warning('Not Found. : %s', self.host)
+                        raise AndroidError('Not Found. : %s' % self.host)
+                    index = {}
+                    for fdn in sorted(os.listdir(self.host)):
+                        stem, ext = os.path.splitext(fdn)
+                        if ext in EXTENSIONS and stem.startswith('_') and not stem.startswith('__'):
+                            index.setdefault(stem[1:], os.path.join(self.host, fdn))
+                    self._index = index
+        return self._index
+
+    def reload(self) -> None:
+        """ Discard index and cached profiles.
+        """
+        with self._mutex:
+            self._index = None
+            self._classes = {}
+            self._devices = {}
+
+    def find(self, name: str) -> Optional[Type[AndroidProp]]:
+        """ Find profile class.
+        Arguments:
+            name(str): profile name. (serial)
+        Raises:
+            AndroidError: invalid profile.
+        Returns:
+            profile(Optional[Type[AndroidProp]]): profile class, or None if not found.
+        """
+        if name in self._classes:
+            return self._classes[name]
+        path = self.index().get(name)
+        if path is None:
+            return None
+        with self._mutex:
+            if name not in self._classes:
+                self._loading.add(name)
+                try:
+                    self._classes[name] = self._load(name, path)
+                finally:
+                    self._loading.discard(name)
+        return self._classes[name]
+
+    def get(self, serial: str) -> Type[AndroidProp]:
+        """ Get profile of the device. The default profile is used if the serial is not found.
+        The result is a subclass per serial, and the profile class is not changed.
+        Arguments:
+            serial(str): android serial.
+        Raises:
+            AndroidError: profile is not found.
+        Returns:
+            profile(Type[AndroidProp]): device profile.
+        """
+        if serial in self._devices:
+            return self._devices[serial]
+        profile = self.find(serial)
+        if profile is None:
+            logger.warning('The Profile is not found. : %s', serial)
+            profile = self.find(DEFAULT) or _default().find(DEFAULT)
+        if profile is None:
+            raise AndroidError('The Profile is not found. : %s' % serial)
+        with self._mutex:
+            if serial not in self._devices:
+                self._devices[serial] = type(profile.__name__, (profile, ), {
+                    'SERIAL': serial,
+                    'TMP_PICTURE': '%s_TMP.png' % serial,
+                    '__module__': profile.__module__
+                })
+        return self._devices[serial]
+
+    def _load(self, name: str, path: str) -> Type[AndroidProp]:
+        """ Load profile class.
+        Arguments:
+            name(str): profile name.
+            path(str): profile filepath.
+        Raises:
+            AndroidError: invalid profile.
+        Returns:
+            profile(Type[AndroidProp]): profile class.
+        """
+        try:
+            if path.endswith('.py'):
+                return getattr(self._import(name, path), '_' + name)
+            if path.endswith('.json'):
+                with open(path, 'r') as f:
+                    data = json.load(f)
+            else:
+                if tomllib is None:
+                    raise AndroidError('toml is not installed. : %s' % path)
+                with open(path, 'rb') as f:
+                    data = tomllib.load(f)
+            return self._declare(name, data)
+        except AndroidError:
+            raise
+        except Exception as e:
+            logger.debug('Raise Exception : %s', str(e))
+            raise AndroidError('Invalid Profile. : %s : %s' % (path, e))
+
+    def _import(self, name: str, path: str) -> Any:
+        """ Import python profile without changing sys.path.
+        Arguments:
+            name(str): profile name.
+            path(str): profile filepath.
+        Returns:
+            module(Any): profile module.
+        """
+        if self.host == PROFILE_PATH:
+            return importlib.import_module('%s._%s' % (PACKAGE, name))
+        spec = importlib.util.spec_from_file_location('%s._%s' % (PACKAGE, name), path)
+        module = importlib.util.module_from_spec(spec)
+        module.__package__ = PACKAGE
+        spec.loader.exec_module(module)  # type: ignore
+        return module
+
+    def _declare(self, name: str, data: Dict[str, Any]) -> Type[AndroidProp]:
+        """ Declare profile class from data.
+        Arguments:
+            name(str): profile name.
+            data(Dict[str, Any]): profile attributes. `extends` is the base profile.
+        Raises:
+            AndroidError: base profile is not found, or inheritance is circular.
+        Returns:
+            profile(Type[AndroidProp]): profile class.
+        """
+        data = dict(data)
+        extends = str(data.pop('extends', 'AndroidProp'))
+        if extends == 'AndroidProp':
+            base: Optional[Type[AndroidProp]] = AndroidProp
+        elif extends in self._loading:
+            raise AndroidError('Circular Profile. : %s -> %s' % (name, extends))
+        else:
+            base = self.find(extends) or _default().find(extends)
+        if base is None:
+            raise AndroidError('The Base Profile is not found. : %s' % extends)
+        attributes = {key: _attr(value) if key.isupper() else value for key, value in data.items()}
+        attributes['__module__'] = '%s._%s' % (PACKAGE, name)
+        return type('_' + name, (base, ), attributes)
+
+
+def _attr(value: Any) -> Any:
+    """ Profile attribute value. numbers are strings like python profiles.
+    Arguments:
+        value(Any): data value.
+    Returns:
+        value(Any): attribute value.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    return value
+
+
+_registries: Dict[str, ProfileRegistry] = {}
+_mutex = threading.Lock()
+
+
+def get_registry(host: str = PROFILE_PATH) -> ProfileRegistry:
+    """ Get shared registry of the profile directory.
+    Arguments:
+        host(str): profile directory. default : PROFILE_PATH.
+    Returns:
+        registry(ProfileRegistry): profile registry.
+    """
+    host = os.path.abspath(host)
+    if host not in _registries:
+        with _mutex:
+            if host not in _registries:
+                _registries[host] = ProfileRegistry(host)
+    return _registries[host]
+
+
+def _default() -> ProfileRegistry:
+    """ Registry of the bundled profiles.
+    Returns:
+        registry(ProfileRegistry): profile registry.
+    """
+    return get_registry(PROFILE_PATH)
@@ -0,0 +1,163 @@
+""" YoRHa Plugins : Adb Server Stand-in. """
+from typing import Dict, List, Tuple
+import socket
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class FakeAdbServer:
+    """ Local Adb Server Stand-in. Speak the host services of the adb smart socket protocol.
+    Supported requests : host:version, host:devices, host:devices-l, host:track-devices, host:track-devices-l.
+
+    Attributes:
+        port(int): server port. 0 is any free port.
+    """
+
+    def __init__(self, port: int = 0) -> None:
+        self.devices: Dict[str, Tuple[str, Dict[str, str]]] = {}
+        self.requests: List[str] = []
+        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server_socket.bind(('127.0.0.1', port))
+        self.server_socket.listen(8)
+        self._trackers: List[Tuple[socket.socket, bool]] = []
+        self._transport = 0
+        self._flag = True
+        self._mutex = threading.RLock()
+
+    def get_port(self) -> int:
+        """ get Port.
+        Returns:
+            port(int): server port.
+        """
+        return int(self.server_socket.getsockname()[1])
+
+    def start(self) -> None:
+        """ start server.
+        """
+        threading.Thread(target=self.main_loop, name='yorha-adb-server', daemon=True).start()
+
+    def finish(self) -> None:
+        """ finish server. tracking connections are closed.
+        """
+        self._flag = False
+        try:
+            self.server_socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.server_socket.close()
+        with self._mutex:
+            for conn, _ in self._trackers:
+                conn.close()
+            self._trackers = []
+
+    def attach(self, serial: str, state: str = 'device', model: str = 'yorha') -> None:
+        """ Attach device, or change the state.
+        Arguments:
+            serial(str): android serial.
+            state(str): device state.
+            model(str): device model.
+        """
+        with self._mutex:
+            if serial not in self.devices:
+                self._transport += 1
+                transport = str(self._transport)
+            else:
+                transport = self.devices[serial][1]['transport_id']
+            self.devices[serial] = (state, {'product': model, 'model': model, 'device': model,
+                                            'transport_id': transport})
+        self._notify()
+
+    def detach(self, serial: str) -> None:
+        """ Detach device.
+        Arguments:
+            serial(str): android serial.
+        """
+        with self._mutex:
+            self.devices.pop(serial, None)
+        self._notify()
+
+    def listing(self, long: bool = False) -> str:
+        """ Device list.
+        Arguments:
+            long(bool): long format.
+        Returns:
+            devices(str): device list of `adb devices`.
+        """
+        lines = []
+        with self._mutex:
+            for serial, (state, properties) in self.devices.items():
+                if long:
+                    lines.append('%-22s %s %s' % (serial, state, ' '.join(
+                        ['%s:%s' % (k, v) for k, v in properties.items()])))
+                else:
+                    lines.append('%s\t%s' % (serial, state))
+        return ''.join(['%s\n' % line for line in lines])
+
+    def _notify(self) -> None:
+        """ Send the device list to tracking connections.
+        """
+        with self._mutex:
+            trackers = list(self._trackers)
+        for conn, long in trackers:
+            try:
+                conn.sendall(_message(self.listing(long)))
+            except OSError:
+                with self._mutex:
+                    if (conn, long) in self._trackers:
+                        self._trackers.remove((conn, long))
+
+    def main_loop(self) -> None:
+        """ Server Main Loop.
+        """
+        while self._flag:
+            try:
+                conn, _ = self.server_socket.accept()
+            except OSError:
+                return
+            if not self._flag:
+                conn.close()
+                return
+            threading.Thread(target=self._handle, args=(conn, ), daemon=True).start()
+
+    def _handle(self, conn: socket.socket) -> None:
+        """ Handle a request.
+        Arguments:
+            conn(socket.socket): client connection.
+        """
+        try:
+            length = conn.recv(4)
+            request = conn.recv(int(length, 16)).decode('ascii')
+        except (OSError, ValueError):
+            conn.close()
+            return
+        self.requests.append(request)
+        if request == 'host:version':
+            conn.sendall(b'OKAY' + _message('%04x' % 41))
+        elif request in ('host:devices', 'host:devices-l'):
+            conn.sendall(b'OKAY' + _message(self.listing(request.endswith('-l'))))
+        elif request in ('host:track-devices', 'host:track-devices-l'):
+            long = request.endswith('-l')
+            with self._mutex:
+                if not self._flag:
+                    conn.close()
+                    return
+                conn.sendall(b'OKAY' + _message(self.listing(long)))
+                self._trackers.append((conn, long))
+            return
+        else:
+            conn.sendall(b'FAIL' + _message('unknown host service'))
+        conn.close()
+
+
+def _message(payload: str) -> bytes:
+    """ Length prefixed message.
+    Arguments:
+        payload(str): payload.
+    Returns:
+        message(bytes): hex4 length and payload.
+    """
+    data = payload.encode('utf-8')
+    return b'%04x%s' % (len(data), data)
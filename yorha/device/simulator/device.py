@@ -0,0 +1,319 @@
+""" YoRHa Plugins : Android Device Stand-in. """
+from typing import Any, Deque, Dict, List, Optional, Pattern, Tuple
+import os
+import re
+import time
+import shlex
+import shutil
+import hashlib
+import logging
+import threading
+import posixpath
+import subprocess
+from collections import deque
+
+from yorha.cmd import CommandExecutor, TIMEOUT
+from yorha.exception import RunError
+
+HISTORY = 10000
+logger = logging.getLogger(__name__)
+
+
+class SimulatedDevice(CommandExecutor):
+    """ Simulated Android Device. Execute adb commands in memory without a device.
+    Supported : getprop / setprop, push / pull / cat / rm / md5sum on a fake filesystem, screencap from an image file,
+    dumpsys fixtures with `| grep`, and input / am / pm recorded as events.
+
+    Attributes:
+        serial(str): android serial.
+        screen(Optional[str]): image filepath returned by screencap.
+        props(Dict[str, str]): initial properties.
+        dumpsys(Dict[str, str]): dumpsys output by category. (with arguments)
+        latency(float): latency of each command. (sec)
+    """
+
+    def __init__(self, serial: str = 'emulator-5554', screen: Optional[str] = None,
+                 props: Optional[Dict[str, str]] = None, dumpsys: Optional[Dict[str, str]] = None,
+                 latency: float = 0.0) -> None:
+        self.serial = serial
+        self.screen = screen
+        self.props: Dict[str, str] = {'sys.boot_completed': '1', 'ro.product.model': 'yorha'}
+        self.props.update(props or {})
+        self.dumpsys: Dict[str, str] = dict(dumpsys or {})
+        self.latency = latency
+        self.files: Dict[str, bytes] = {}
+        self.events: Deque[str] = deque(maxlen=HISTORY)
+        self.commands: Deque[str] = deque(maxlen=HISTORY)
+        self.count = 0
+        self._latencies: List[Tuple[Pattern, float]] = []
+        self._failures: List[List[Any]] = []
+        self._mutex = threading.Lock()
+
+    def __repr__(self) -> str:
+        return 'SimulatedDevice()'
+
+    def __str__(self) -> str:
+        return 'SimulatedDevice [ Serial = %s, Commands = %d, Files = %d ]' % (self.serial, self.count,
+                                                                              len(self.files))
+
+    def set_latency(self, pattern: str, seconds: float) -> None:
+        """ Set latency of the matched commands.
+        Arguments:
+            pattern(str): regular expression of the adb command.
+            seconds(float): latency. (sec)
+        """
+        with self._mutex:
+            self._latencies.append((re.compile(pattern), seconds))
+
+    def set_failure(self, pattern: str, count: int = 1, message: str = 'error: device offline') -> None:
+        """ Fail the matched commands.
+        Arguments:
+            pattern(str): regular expression of the adb command.
+            count(int): number of failures. negative is always.
+            message(str): error message.
+        """
+        with self._mutex:
+            self._failures.append([re.compile(pattern), count, message])
+
+    def run(self, cmd: str, timeout: int = TIMEOUT, debug: bool = False, data: Optional[bytes] = None,
+            decode: bool = True) -> Optional[Tuple[int, Any, Any]]:
+        """ Execute an adb command on the simulated device.
+
+        Arguments:
+            cmd(str): A string of program arguments.
+            timeout(int): Expired Time. a latency over the timeout raises RunError.
+            debug(bool): debug mode flag.
+            data(Optional[bytes]): Standard input data.
+            decode(bool): If false, standard out and standard error are returned as bytes.
+
+        Raises:
+            RunError: unsupported command, injected failure, or timeout.
+
+        Returns:
+            result(Tuple[int, str, str]): returncode, standard out and standard error.
+        """
+        if debug:
+            logger.debug(cmd)
+        latency, message = self._inject(cmd)
+        if latency > timeout:
+            time.sleep(timeout)
+            raise RunError(cmd, '', message='Raise TimeoutExpired : %s' % cmd)
+        if latency > 0:
+            time.sleep(latency)
+        if message is not None:
+            raise RunError(cmd, '', message='Raise CalledProcess Error : %s' % message)
+        out = self._dispatch(cmd, data)
+        if decode:
+            return (0, out.decode('utf8') if isinstance(out, bytes) else out, '')
+        return (0, out if isinstance(out, bytes) else out.encode('utf8'), b'')
+
+    def run_bg(self, cmd: str, debug: bool = False) -> None:
+        """ Execute an adb command in background. result is discarded.
+
+        Arguments:
+            cmd(str): A string of program arguments.
+            debug(bool): debug mode flag.
+        """
+        try:
+            self.run(cmd, debug=debug)
+        except RunError as e:
+            logger.debug(str(e))
+
+    def _inject(self, cmd: str) -> Tuple[float, Optional[str]]:
+        """ Record the command, and find the injected latency and failure.
+        Arguments:
+            cmd(str): A string of program arguments.
+        Returns:
+            result(Tuple[float, Optional[str]]): latency, and error message. None is no failure.
+        """
+        with self._mutex:
+            self.count += 1
+            self.commands.append(cmd)
+            latency = self.latency
+            for pattern, seconds in self._latencies:
+                if pattern.search(cmd):
+                    latency = seconds
+            for failure in self._failures:
+                if failure[1] != 0 and failure[0].search(cmd):
+                    failure[1] -= 1 if failure[1] > 0 else 0
+                    return latency, failure[2]
+        return latency, None
+
+    def _dispatch(self, cmd: str, data: Optional[bytes] = None) -> Any:
+        """ Execute the adb command.
+        Arguments:
+            cmd(str): A string of program arguments.
+            data(Optional[bytes]): Standard input data.
+        Raises:
+            RunError: unsupported command.
+        Returns:
+            out(Any): standard out. str or bytes.
+        """
+        args = cmd.split(None, 1)
+        if not args or args[0] != 'adb':
+            raise RunError(cmd, '', message='Not adb command. : %s' % cmd)
+        rest = args[1] if len(args) > 1 else ''
+        if rest.startswith('-s '):
+            serial, rest = (rest[3:].split(None, 1) + [''])[:2]
+            if serial != self.serial and ':' not in serial:
+                raise RunError(cmd, '', message="error: device '%s' not found" % serial)
+        service, rest = (rest.split(None, 1) + [''])[:2]
+        if service in ('shell', 'exec-out', 'exec-in'):
+            return self._shell(cmd, rest)
+        if service == 'push':
+            src, dst = rest.split()
+            with open(src, 'rb') as f:
+                content = f.read()
+            with self._mutex:
+                self.files[dst] = content
+            return '%s: 1 file pushed. (%d bytes)\n' % (src, len(content))
+        if service == 'pull':
+            src, dst = [a for a in rest.split() if a != '-a']
+            with self._mutex:
+                content = self.files.get(src)
+            if content is None:
+                raise RunError(cmd, '', message="adb: error: remote object '%s' does not exist" % src)
+            if os.path.isdir(dst):
+                dst = os.path.join(dst, posixpath.basename(src))
+            with open(dst, 'wb') as f:
+                f.write(content)
+            return '%s: 1 file pulled. (%d bytes)\n' % (src, len(content))
+        if service == 'root':
+            return 'restarting adbd as root\n'
+        if service == 'connect':
+            return 'connected to %s\n' % rest
+        if service in ('wait-for-device', 'forward', 'reverse', 'disconnect', 'kill-server', 'tcpip',
+                       'usb', 'remount', 'reboot', 'install', 'install-multiple', 'uninstall'):
+            with self._mutex:
+                self.events.append('%s %s' % (service, rest))
+            return 'Success\n' if service.startswith(('install', 'uninstall')) else ''
+        raise RunError(cmd, '', message='Unsupported command. : %s' % service)
+
+    def _shell(self, cmd: str, command: str) -> Any:
+        """ Execute the shell command. `| grep [-E] pattern` stages are applied to the output.
+        Arguments:
+            cmd(str): A string of program arguments.
+            command(str): shell command.
+        Raises:
+            RunError: unsupported command.
+        Returns:
+            out(Any): standard out. str or bytes.
+        """
+        stages = command.split(' | ')
+        args = shlex.split(stages[0])
+        name = args[0] if args else ''
+        out: Any = ''
+        with self._mutex:
+            if name == 'getprop':
+                if len(args) > 1:
+                    out = self.props.get(args[1], '') + '\n'
+                else:
+                    out = ''.join(['[%s]: [%s]\n' % (k, v) for k, v in sorted(self.props.items())])
+            elif name == 'setprop' and len(args) > 2:
+                self.props[args[1]] = args[2]
+            elif name == 'screencap':
+                image = b''
+                if self.screen is not None:
+                    with open(self.screen, 'rb') as f:
+                        image = f.read()
+                paths = [a for a in args[1:] if not a.startswith('-')]
+                if paths:
+                    self.files[paths[0]] = image
+                else:
+                    out = image
+            elif name == 'cat' and len(args) > 1:
+                if args[1] not in self.files:
+                    raise RunError(cmd, '', message='cat: %s: No such file or directory' % args[1])
+                out = self.files[args[1]]
+            elif name == 'rm':
+                for path in [a for a in args[1:] if not a.startswith('-')]:
+                    self.files.pop(path, None)
+            elif name == 'ls':
+                prefix = args[-1].rstrip('/') + '/' if len(args) > 1 else '/'
+                names = sorted({p[len(prefix):].split('/')[0] for p in self.files if p.startswith(prefix)})
+                out = ''.join(['%s\n' % n for n in names])
+            elif name == 'dumpsys':
+                category = ' '.join(args[1:])
+                out = self.dumpsys.get(category, self.dumpsys.get(args[1] if len(args) > 1 else '', ''))
+            elif name == 'md5sum':
+                # `md5sum a b 2>/dev/null || ...` : files up to the first redirection or operator.
+                paths = []
+                for arg in args[1:]:
+                    if arg.startswith(('2>', '>', '||', '&&', ';')):
+                        break
+                    paths.append(arg)
+                out = ''.join(['%s  %s\n' % (hashlib.md5(self.files[p]).hexdigest(), p) for p in paths
+                               if p in self.files])
+            elif name == 'echo':
+                out = ' '.join(args[1:]) + '\n'
+            elif name in ('input', 'am', 'pm', 'wm', 'monkey', 'mkdir', 'chmod', 'true'):
+                self.events.append(stages[0])
+            else:
+                raise RunError(cmd, '', message='/system/bin/sh: %s: inaccessible or not found' % name)
+        for stage in stages[1:]:
+            out = _grep(cmd, stage, out)
+        return out
+
+
+class LocalDevice(SimulatedDevice):
+    """ Android Device on the local filesystem. shell, exec-out / exec-in, push and pull run on the host.
+    Shell commands need a posix shell. Pulled files get the current time unless `pull -a`, the same as adb.
+    Other commands are simulated.
+    """
+
+    def __repr__(self) -> str:
+        return 'LocalDevice()'
+
+    def __str__(self) -> str:
+        return 'LocalDevice [ Serial = %s, Commands = %d ]' % (self.serial, self.count)
+
+    def _dispatch(self, cmd: str, data: Optional[bytes] = None) -> Any:
+        """ Execute the adb command on the host.
+        Arguments:
+            cmd(str): A string of program arguments.
+            data(Optional[bytes]): Standard input data.
+        Raises:
+            RunError: the command failed.
+        Returns:
+            out(Any): standard out. str or bytes.
+        """
+        args = cmd.split(None, 4)
+        if len(args) < 4 or args[1] != '-s' or args[3] not in ('shell', 'exec-out', 'exec-in', 'push', 'pull'):
+            return super()._dispatch(cmd, data)
+        service, rest = args[3], args[4] if len(args) > 4 else ''
+        if service in ('push', 'pull'):
+            paths = [a for a in rest.split() if a != '-a']
+            src, dst = paths
+            if os.path.isdir(dst):
+                dst = os.path.join(dst, os.path.basename(src))
+            if not os.path.exists(src):
+                raise RunError(cmd, '', message="adb: error: '%s' does not exist" % src)
+            os.makedirs(os.path.dirname(dst) or '.', exist_ok=True)
+            if service == 'push' or '-a' in rest.split():
+                shutil.copy2(src, dst)
+            else:
+                shutil.copy(src, dst)
+            return '%s: 1 file %sed. (%d bytes)\n' % (src, service, os.path.getsize(dst))
+        result = subprocess.run(rest, shell=True, input=data, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if result.returncode:
+            raise RunError(cmd, '', message='Raise CalledProcess Error : %s' % result.stderr.decode('utf8', 'replace'))
+        return result.stdout if service != 'shell' else result.stdout.decode('utf8', 'replace')
+
+
+def _grep(cmd: str, stage: str, out: Any) -> str:
+    """ Apply `grep [-E] pattern` to the output.
+    Arguments:
+        cmd(str): A string of program arguments.
+        stage(str): pipe stage.
+        out(Any): output of the previous stage.
+    Raises:
+        RunError: unsupported pipe stage.
+    Returns:
+        out(str): matched lines.
+    """
+    args = shlex.split(stage)
+    if not args or args[0] != 'grep' or len(args) < 2:
+        raise RunError(cmd, '', message='Unsupported pipe. : %s' % stage)
+    pattern = re.compile(args[-1])
+    text = out.decode('utf8', 'replace') if isinstance(out, bytes) else out
+    return ''.join(['%s\n' % line for line in text.splitlines() if pattern.search(line)])
@@ -0,0 +1,97 @@
+""" YoRHa Plugins : Minitouch Stand-in Server. """
+from typing import List, Tuple
+import time
+import socket
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class MinitouchServer:
+    """ Local Minitouch Stand-in Server. Speak the minitouch text protocol, and record events.
+    Attributes:
+        port(int): server port. 0 is any free port.
+        max_contacts(int): max contacts.
+        max_x(int): max position x.
+        max_y(int): max position y.
+        max_pressure(int): max pressure.
+    """
+
+    def __init__(self, port: int = 0, max_contacts: int = 10, max_x: int = 1079, max_y: int = 1919,
+                 max_pressure: int = 255) -> None:
+        self.banner = 'v 1\n^ %d %d %d %d\n$ %d\n' % (max_contacts, max_x, max_y, max_pressure, 4242)
+        self.events: List[Tuple[float, str]] = []
+        self.errors: List[str] = []
+        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server_socket.bind(('127.0.0.1', port))
+        self.server_socket.listen(1)
+        self.max_contacts = max_contacts
+        self._flag = True
+        self._mutex = threading.Condition()
+
+    def get_port(self) -> int:
+        """ get Port.
+        Returns:
+            port(int): server port.
+        """
+        return int(self.server_socket.getsockname()[1])
+
+    def start(self) -> None:
+        """ start server.
+        """
+        threading.Thread(target=self.main_loop, name='yorha-minitouch', daemon=True).start()
+
+    def finish(self) -> None:
+        """ finish server.
+        """
+        self._flag = False
+        self.server_socket.close()
+
+    def wait_events(self, count: int, timeout: float = 5) -> List[str]:
+        """ Wait until events are received.
+        Arguments:
+            count(int): number of events.
+            timeout(float): timeout.
+        Returns:
+            events(List[str]): received commands.
+        """
+        with self._mutex:
+            self._mutex.wait_for(lambda: len(self.events) >= count, timeout=timeout)
+            return [event for _, event in self.events]
+
+    def main_loop(self) -> None:
+        """ Server Main Loop.
+        """
+        while self._flag:
+            try:
+                conn, _ = self.server_socket.accept()
+            except OSError:
+                return
+            conn.sendall(self.banner.encode('ascii'))
+            for line in conn.makefile('r'):
+                command = line.strip()
+                if not self._valid(command):
+                    self.errors.append(command)
+                    logger.warning('Invalid minitouch command : %s', command)
+                    continue
+                with self._mutex:
+                    self.events.append((time.time(), command))
+                    self._mutex.notify_all()
+            conn.close()
+
+    def _valid(self, command: str) -> bool:
+        """ Validate command.
+        Arguments:
+            command(str): minitouch command.
+        Returns:
+            result(bool): true if valid.
+        """
+        args = command.split()
+        if not args:
+            return False
+        arity = {'d': 5, 'm': 5, 'u': 2, 'c': 1, 'r': 1, 'w': 2}
+        if arity.get(args[0]) != len(args) or not all([a.isdigit() for a in args[1:]]):
+            return False
+        return args[0] not in ('d', 'm', 'u') or int(args[1]) < self.max_contacts
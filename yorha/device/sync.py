@@ -0,0 +1,337 @@
+""" YoRHa Plugins : Android Directory Sync Utility. """
+from typing import Callable, Dict, List, Sequence, Tuple
+import io
+import os
+import time
+import shlex
+import hashlib
+import logging
+import tarfile
+import threading
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+
+from yorha.device.adb import Android, TIMEOUT
+from yorha.exception import AndroidError
+
+SMALL = 256 * 1024
+BATCH = 8 * 1024 * 1024
+BATCH_FILES = 200
+WORKERS = 4
+RATE = 4 * 1024 * 1024
+MISSING = 'yorha: no such directory'
+logger = logging.getLogger(__name__)
+
+# relative path -> (size, mtime or md5)
+Listing = Dict[str, Tuple[int, str]]
+
+
+class SyncReport:
+    """ Directory Sync Report.
+    Attributes:
+        direction(str): push or pull.
+        source(str): source directory.
+        destination(str): destination directory.
+    """
+
+    def __init__(self, direction: str, source: str, destination: str) -> None:
+        self.direction = direction
+        self.source = source
+        self.destination = destination
+        self.transferred: List[str] = []
+        self.transferred_bytes = 0
+        self.skipped: List[str] = []
+        self.skipped_bytes = 0
+        self.deleted: List[str] = []
+        self.batches = 0
+        self.elapsed = 0.0
+        self._mutex = threading.Lock()
+
+    def __repr__(self) -> str:
+        return 'SyncReport()'
+
+    def __str__(self) -> str:
+        return ('SyncReport [ %s %s -> %s, Transferred = %d files (%d bytes), Skipped = %d files (%d bytes), '
+                'Deleted = %d, Batches = %d, Elapsed = %.3f ]') % (
+                    self.direction, self.source, self.destination, len(self.transferred), self.transferred_bytes,
+                    len(self.skipped), self.skipped_bytes, len(self.deleted), self.batches, self.elapsed)
+
+    def transfer(self, files: Sequence[Tuple[str, int]], batch: bool = False) -> None:
+        """ Record transferred files.
+        Arguments:
+            files(Sequence[Tuple[str, int]]): relative path and size.
+            batch(bool): transferred in a tar batch.
+        """
+        with self._mutex:
+            self.transferred.extend([name for name, _ in files])
+            self.transferred_bytes += sum([size for _, size in files])
+            if batch:
+                self.batches += 1
+
+
+class DirectorySync:
+    """ Delta directory sync between host and android.
+    Files are compared by size and mtime (seconds), or by md5 checksum computed on both sides.
+    Small files are sent in tar batches, and large files are sent by adb push / pull, in parallel.
+
+    Attributes:
+        adb(Android): android adaptor object.
+        checksum(bool): compare md5 checksum instead of mtime.
+        workers(int): parallel transfers.
+        small(int): max size of a batched file. (bytes)
+        batch(int): max size of a tar batch. (bytes)
+    """
+
+    def __init__(self, adb: Android, checksum: bool = False, workers: int = WORKERS, small: int = SMALL,
+                 batch: int = BATCH) -> None:
+        self.adb = adb
+        self.checksum = checksum
+        self.workers = workers
+        self.small = small
+        self.batch = batch
+
+    def local_listing(self, directory: str) -> Listing:
+        """ List local files.
+        Arguments:
+            directory(str): local directory.
+        Returns:
+            listing(Listing): size and mtime (or md5) by relative path. separator is '/'.
+        """
+        listing = {}
+        for root, _, files in os.walk(directory):
+            for name in files:
+                path = os.path.join(root, name)
+                rel = os.path.relpath(path, directory).replace(os.sep, '/')
+                stat = os.stat(path)
+                listing[rel] = (stat.st_size, _md5(path) if self.checksum else str(int(stat.st_mtime)))
+        return listing
+
+    def remote_listing(self, directory: str, missing_ok: bool = True) -> Listing:
+        """ List remote files in one shell call.
+        Arguments:
+            directory(str): remote directory.
+            missing_ok(bool): a missing directory is an empty listing. if false, raise AndroidError.
+        Raises:
+            AndroidError: directory does not exist, and missing_ok is false.
+        Returns:
+            listing(Listing): size and mtime (or md5) by relative path.
+        """
+        find = "find . -type f -exec stat -c '%s' {} +" % ('%s %n' if self.checksum else '%s %Y %n')
+        if self.checksum:
+            find += ' -exec md5sum {} +'
+        result = self.adb.shell("if cd %s 2>/dev/null; then %s; else echo '%s'; fi; true" % (
+            shlex.quote(directory), find, MISSING)) or ''
+        if MISSING in result.splitlines():
+            if not missing_ok:
+                raise AndroidError('Remote directory is not found. : %s' % directory)
+            return {}
+        listing: Listing = {}
+        checksums: Dict[str, str] = {}
+        for line in result.splitlines():
+            if self.checksum and line[32:36] == '  ./':
+                checksums[line[36:]] = line[:32].lower()
+                continue
+            args = line.split(' ', 1 if self.checksum else 2)
+            if args[0].isdigit() and args[-1].startswith('./'):
+                listing[args[-1][2:]] = (int(args[0]), '' if self.checksum else args[1])
+        if self.checksum:
+            listing = {name: (size, checksums.get(name, '')) for name, (size, _) in listing.items()}
+        return listing
+
+    def diff(self, source: Listing, destination: Listing) -> Tuple[List[str], List[str], List[str]]:
+        """ Compare listings.
+        Arguments:
+            source(Listing): source listing.
+            destination(Listing): destination listing.
+        Returns:
+            result(Tuple[List[str], List[str], List[str]]): changed, unchanged, and stale files.
+        """
+        changed, unchanged = [], []
+        for name, value in sorted(source.items()):
+            (unchanged if destination.get(name) == value else changed).append(name)
+        stale = sorted([name for name in destination if name not in source])
+        return changed, unchanged, stale
+
+    def push(self, local: str, remote: str, delete: bool = False) -> SyncReport:
+        """ Push changed files of the local directory.
+        Arguments:
+            local(str): local directory.
+            remote(str): remote directory.
+            delete(bool): delete remote files which are not in the local directory.
+        Raises:
+            AndroidError: local directory does not exist, or transfer failed.
+        Returns:
+            report(SyncReport): sync report.
+        """
+        # an empty listing of a mistyped source would delete every destination file.
+        if not os.path.isdir(local):
+            raise AndroidError('Local directory is not found. : %s' % local)
+        begin = time.time()
+        report = SyncReport('push', local, remote)
+        source = self.local_listing(local)
+        changed, unchanged, stale = self.diff(source, self.remote_listing(remote))
+        self._skip(report, source, unchanged)
+        if changed:
+            self.adb.shell('mkdir -p %s' % shlex.quote(remote))
+
+        def _batch(names: List[str]) -> None:
+            buffer = io.BytesIO()
+            with tarfile.open(fileobj=buffer, mode='w', format=tarfile.USTAR_FORMAT) as tar:
+                for name in names:
+                    tar.add(os.path.join(local, *name.split('/')), arcname=name)
+            data = buffer.getvalue()
+            self.adb.exec_out('tar -xf - -C %s' % shlex.quote(remote), data, _timeout(len(data)))
+            report.transfer([(name, source[name][0]) for name in names], batch=True)
+
+        def _single(name: str) -> None:
+            size = source[name][0]
+            self.adb.push(os.path.join(local, *name.split('/')), posixpath.join(remote, name), _timeout(size))
+            report.transfer([(name, size)])
+
+        self._transfer(source, changed, _batch, _single)
+        if delete and stale:
+            for chunk in _chunks(stale, BATCH_FILES):
+                self.adb.shell('rm -f %s' % ' '.join([shlex.quote(posixpath.join(remote, n)) for n in chunk]))
+            report.deleted.extend(stale)
+        report.elapsed = time.time() - begin
+        logger.info(report)
+        return report
+
+    def pull(self, remote: str, local: str, delete: bool = False) -> SyncReport:
+        """ Pull changed files of the remote directory.
+        Arguments:
+            remote(str): remote directory.
+            local(str): local directory.
+            delete(bool): delete local files which are not in the remote directory.
+        Raises:
+            AndroidError: remote directory does not exist, or transfer failed.
+        Returns:
+            report(SyncReport): sync report.
+        """
+        begin = time.time()
+        report = SyncReport('pull', remote, local)
+        source = self.remote_listing(remote, missing_ok=False)
+        changed, unchanged, stale = self.diff(source, self.local_listing(local) if os.path.exists(local) else {})
+        self._skip(report, source, unchanged)
+        os.makedirs(local, exist_ok=True)
+
+        def _batch(names: List[str]) -> None:
+            command = 'tar -cf - -C %s %s' % (shlex.quote(remote), ' '.join([shlex.quote(n) for n in names]))
+            size = sum([source[name][0] for name in names])
+            data = self.adb.exec_out(command, timeout=_timeout(size))
+            with tarfile.open(fileobj=io.BytesIO(data), mode='r') as tar:
+                members = [m for m in tar.getmembers() if m.isfile() and _inside(local, m.name)]
+                if len(members) != len(names):
+                    raise AndroidError('Tar batch is incomplete. : %d / %d' % (len(members), len(names)))
+                if hasattr(tarfile, 'data_filter'):
+                    tar.extractall(local, members=members, filter='data')
+                else:
+                    tar.extractall(local, members=members)
+            report.transfer([(name, source[name][0]) for name in names], batch=True)
+
+        def _single(name: str) -> None:
+            path = os.path.join(local, *name.split('/'))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # keep the remote mtime. otherwise the file differs from the listing on the next sync.
+            self.adb.pull(posixpath.join(remote, name), path, _timeout(source[name][0]), preserve=True)
+            report.transfer([(name, source[name][0])])
+
+        self._transfer(source, changed, _batch, _single)
+        if delete:
+            for name in stale:
+                os.remove(os.path.join(local, *name.split('/')))
+            report.deleted.extend(stale)
+        report.elapsed = time.time() - begin
+        logger.info(report)
+        return report
+
+    def _skip(self, report: SyncReport, source: Listing, unchanged: List[str]) -> None:
+        """ Record skipped files.
+        Arguments:
+            report(SyncReport): sync report.
+            source(Listing): source listing.
+            unchanged(List[str]): unchanged files.
+        """
+        report.skipped.extend(unchanged)
+        report.skipped_bytes += sum([source[name][0] for name in unchanged])
+
+    def _transfer(self, source: Listing, changed: List[str], batch_func: Callable[[List[str]], None],
+                  single_func: Callable[[str], None]) -> None:
+        """ Transfer changed files. small files in batches, and the others one by one, in parallel.
+        Arguments:
+            source(Listing): source listing.
+            changed(List[str]): changed files.
+            batch_func(Callable[[List[str]], None]): batch transfer.
+            single_func(Callable[[str], None]): single file transfer.
+        Raises:
+            AndroidError: transfer failed.
+        """
+        batches: List[List[str]] = []
+        current: List[str] = []
+        size = 0
+        for name in [n for n in changed if 0 <= source[n][0] <= self.small]:
+            if current and (size + source[name][0] > self.batch or len(current) >= BATCH_FILES):
+                batches.append(current)
+                current, size = [], 0
+            current.append(name)
+            size += source[name][0]
+        if current:
+            batches.append(current)
+        singles = [n for n in changed if not 0 <= source[n][0] <= self.small]
+        if not batches and not singles:
+            return
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(batch_func, names) for names in batches]
+            futures += [executor.submit(single_func, name) for name in singles]
+            errors = [f.exception() for f in futures if f.exception() is not None]
+        if errors:
+            raise AndroidError('Sync failed. : %d errors : %s' % (len(errors), errors[0]))
+
+
+def _md5(path: str) -> str:
+    """ md5 checksum of the local file.
+    Arguments:
+        path(str): local file path.
+    Returns:
+        checksum(str): md5 hex digest.
+    """
+    md5 = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
+def _timeout(size: int) -> int:
+    """ Transfer timeout by size.
+    Arguments:
+        size(int): transfer size. (bytes)
+    Returns:
+        timeout(int): Expired Time. (sec)
+    """
+    return TIMEOUT + int(size / RATE)
+
+
+def _chunks(names: List[str], size: int) -> List[List[str]]:
+    """ Split list.
+    Arguments:
+        names(List[str]): names.
+        size(int): chunk size.
+    Returns:
+        chunks(List[List[str]]): chunks.
+    """
+    return [names[i:i + size] for i in range(0, len(names), size)]
+
+
+def _inside(directory: str, name: str) -> bool:
+    """ Check archive member path is inside the directory.
+    Arguments:
+        directory(str): extract directory.
+        name(str): member name.
+    Returns:
+        result(bool): true if inside.
+    """
+    root = os.path.abspath(directory)
+    path = os.path.abspath(os.path.join(root, name))
+    return path.startswith(root + os.sep)
+
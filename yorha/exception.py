@@ -30,10 +30,9 @@ class YoRHaError(Exception):
         super(YoRHaError, self).__init__(self.details['message'])
 
     def __str__(self) -> str:
-        message = self.message.encode('utf8') if self.message else ''
+        message = self.message if self.message else ''
         trace = self.format_trace()
         if trace:
-            trace = str(trace.encode('utf8'))
             return '%s\n Server side traceback: \n%s' % (message, trace)
         return cast(str, message)
 
@@ -45,6 +44,8 @@ class YoRHaError(Exception):
         """
         if self.details is None:
             return None
+        if attribute not in self.details:
+            raise AttributeError(attribute)
         return self.details[attribute]
 
     @property
@@ -141,3 +142,29 @@ class AndroidError(YoRHaError):
         if isinstance(details, STRING_SET):
             details = {'message': details}
         YoRHaError.__init__(self, details)
+
+
+class PictureError(YoRHaError):
+    """ Picture Error.
+
+    Arrtibutes:
+        details(dict): A free form text message.
+    """
+
+    def __init__(self, details: Union[str, Dict[str, str]]) -> None:
+        if isinstance(details, STRING_SET):
+            details = {'message': details}
+        YoRHaError.__init__(self, details)
+
+
+class OcrError(YoRHaError):
+    """ OCR Error.
+
+    Arrtibutes:
+        details(dict): A free form text message.
+    """
+
+    def __init__(self, details: Union[str, Dict[str, str]]) -> None:
+        if isinstance(details, STRING_SET):
+            details = {'message': details}
+        YoRHaError.__init__(self, details)
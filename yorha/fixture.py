@@ -0,0 +1,268 @@
+""" YoRHa Plugins : Session Fixture Utility. """
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import os
+import re
+import time
+import logging
+import threading
+
+import pytest
+
+from yorha.device.factory import AndroidFactory
+from yorha.workspace import Workspace
+
+PORT = 1313
+PORT_STRIDE = 16
+FIRST_FRAME = 10.0
+logger = logging.getLogger(__name__)
+
+
+class CapturePipeline:
+    """ Capture Pipeline of a device. (Android, Workspace, MinicapService, MinicapStream and MinicapProc)
+    Started once, and shared by the views of tests.
+
+    Attributes:
+        serial(str): android serial.
+        path(str): workspace path.
+        port(int): minicap forward port.
+        package(Optional[str]): package name of the workspace.
+    """
+
+    def __init__(self, serial: str, path: str, port: int = PORT, package: Optional[str] = None) -> None:
+        self.serial = serial
+        self.path = path
+        self.port = port
+        self.package = package
+        self.adb: Any = None
+        self.workspace: Optional[Workspace] = None
+        self.proc: Any = None
+        self.evidence = ''
+        self.restarts = 0
+        self.elapsed = 0.0
+
+    def __repr__(self) -> str:
+        return 'CapturePipeline()'
+
+    def __str__(self) -> str:
+        return 'CapturePipeline [ Serial = %s, Port = %d, Restarts = %d, Elapsed = %.3f ]' % (
+            self.serial, self.port, self.restarts, self.elapsed)
+
+    def start(self) -> None:
+        """ Start the pipeline, and wait for the first frame.
+        """
+        # minicap modules (opencv, ocr) are imported on first use, not on plugin load.
+        from yorha.device.minicap.process import MinicapProc
+        from yorha.device.minicap.service import MinicapService
+        from yorha.device.minicap.stream import MinicapStream
+
+        begin = time.time()
+        self.adb = AndroidFactory.create(self.serial)
+        self.workspace = Workspace(self.path)
+        self.proc = MinicapProc(MinicapStream('127.0.0.1', str(self.port)), MinicapService('minicap'))
+        self.proc.start(self.adb, self.workspace, self.package)
+        self.evidence = self.proc.space['tmp.evidence']
+        if self.proc.wait_frame(0, FIRST_FRAME) is None:
+            logger.warning('First frame is not received. : %s', self.serial)
+        self.elapsed = time.time() - begin
+        logger.info(self)
+
+    def finish(self) -> None:
+        """ Finish the pipeline.
+        """
+        if self.proc is not None:
+            self.proc.finish()
+            self.proc = None
+
+    def alive(self) -> bool:
+        """ Check the pipeline.
+        Returns:
+            result(bool): true if alive.
+        """
+        return self.proc is not None and self.proc.alive()
+
+    def ensure(self) -> None:
+        """ Restart the pipeline only if it has died.
+        """
+        if self.alive():
+            return
+        if self.proc is not None:
+            logger.warning('Capture pipeline died. restart. : %s', self.serial)
+            self.restarts += 1
+            try:
+                self.finish()
+            except Exception as e:  # pylint: disable=W0703
+                logger.warning('Capture pipeline finish error : %s', e)
+                self.proc = None
+        self.start()
+
+    def view(self, name: str) -> 'CaptureView':
+        """ Get a per-test view.
+        Arguments:
+            name(str): test name.
+        Returns:
+            view(CaptureView): opened view.
+        """
+        view = CaptureView(self, name)
+        view.open()
+        return view
+
+
+class CaptureView:
+    """ Per-test View of the shared pipeline. Own evidence subdirectory and locator namespace.
+    Attributes of the minicap process (search_pattern, capture_image, wait_frame, ...) are delegated.
+
+    Attributes:
+        pipeline(CapturePipeline): shared pipeline.
+        name(str): test name.
+    """
+
+    def __init__(self, pipeline: CapturePipeline, name: str) -> None:
+        self.pipeline = pipeline
+        self.name = re.sub(r'[^\w.\-\[\]]', '_', name)
+        self.namespace: Tuple[str, ...] = (self.name, )
+        self.evidence_dir = ''
+        self._previous: Optional[Tuple[str, Tuple[str, ...]]] = None
+
+    def __repr__(self) -> str:
+        return 'CaptureView()'
+
+    def __str__(self) -> str:
+        return 'CaptureView [ Serial = %s, Name = %s, Evidence = %s ]' % (self.pipeline.serial, self.name,
+                                                                         self.evidence_dir)
+
+    def __getattr__(self, attribute: str) -> Any:
+        if attribute.startswith('_') or 'pipeline' not in self.__dict__:
+            raise AttributeError(attribute)
+        return getattr(self.pipeline.proc, attribute)
+
+    @property
+    def adb(self) -> Any:
+        """ Android adaptor of the device.
+        """
+        return self.pipeline.adb
+
+    @property
+    def proc(self) -> Any:
+        """ Minicap process of the pipeline.
+        """
+        return self.pipeline.proc
+
+    def open(self) -> None:
+        """ Switch the evidence directory and the locator namespace of the pipeline to the view.
+        """
+        proc = self.pipeline.proc
+        self.evidence_dir = os.path.join(self.pipeline.evidence, self.name)
+        os.makedirs(self.evidence_dir, exist_ok=True)
+        self._previous = (proc.space['tmp.evidence'], proc.namespace)
+        proc.space['tmp.evidence'] = self.evidence_dir
+        proc.namespace = self.namespace
+
+    def close(self) -> None:
+        """ Restore the pipeline, and forget the locations of the view.
+        """
+        proc = self.pipeline.proc
+        if self._previous is None or proc is None:
+            return
+        proc.locator.forget(proc.locator_key())
+        proc.space['tmp.evidence'], proc.namespace = self._previous
+        self._previous = None
+
+
+class PipelinePool:
+    """ Capture Pipelines by serial. One pipeline per device in the session, or in the xdist worker.
+    Attributes:
+        path(str): workspace root path. pipelines use `<path>/<worker>/<serial>`.
+        worker(str): xdist worker id. default : master.
+        package(Optional[str]): package name of the workspace.
+        factory(Optional[Callable]): pipeline constructor. (serial, path, port, package)
+    """
+
+    def __init__(self, path: str, worker: str = 'master', package: Optional[str] = None,
+                 factory: Optional[Callable[..., CapturePipeline]] = None) -> None:
+        self.path = path
+        self.worker = worker
+        self.package = package
+        self.factory = factory or CapturePipeline
+        self.pipelines: Dict[str, CapturePipeline] = {}
+        self._mutex = threading.Lock()
+
+    def __repr__(self) -> str:
+        return 'PipelinePool()'
+
+    def __str__(self) -> str:
+        return 'PipelinePool [ Worker = %s, Devices = %s ]' % (self.worker, ', '.join(self.pipelines))
+
+    def port(self) -> int:
+        """ Forward port of the next device. unique by worker and device.
+        Returns:
+            port(int): local port.
+        """
+        index = int(self.worker[2:]) + 1 if re.match(r'^gw\d+$', self.worker) else 0
+        return PORT + index * PORT_STRIDE + len(self.pipelines)
+
+    def get(self, serial: str) -> CapturePipeline:
+        """ Get the pipeline of the device. started on first use, and restarted if it has died.
+        Arguments:
+            serial(str): android serial.
+        Returns:
+            pipeline(CapturePipeline): alive pipeline.
+        """
+        with self._mutex:
+            pipeline = self.pipelines.get(serial)
+            if pipeline is None:
+                pipeline = self.factory(serial, os.path.join(self.path, self.worker, serial), self.port(),
+                                        self.package)
+                self.pipelines[serial] = pipeline
+            pipeline.ensure()
+            return pipeline
+
+    def finish(self) -> None:
+        """ Finish all pipelines.
+        """
+        with self._mutex:
+            pipelines, self.pipelines = list(self.pipelines.values()), {}
+        for pipeline in pipelines:
+            try:
+                pipeline.finish()
+            except Exception as e:  # pylint: disable=W0703
+                logger.warning('Capture pipeline finish error : %s', e)
+
+
+def _serials(config: Any) -> List[str]:
+    """ Target serials of the session.
+    Arguments:
+        config(pytest.Config): pytest config.
+    Returns:
+        serials(List[str]): android serials. `--yorha-serial`, or ANDROID_SERIAL.
+    """
+    serials = config.getoption('yorha_serial', None) or []
+    if not serials and os.environ.get('ANDROID_SERIAL'):
+        serials = [os.environ['ANDROID_SERIAL']]
+    return list(serials)
+
+
+@pytest.fixture(scope='session')
+def yorha_pipelines(request: Any) -> Iterator[PipelinePool]:
+    """ Capture pipelines shared in the session. (or in the xdist worker)
+    """
+    config = request.config
+    worker = getattr(config, 'workerinput', {}).get('workerid', 'master')
+    pool = PipelinePool(config.getoption('yorha_workspace', None) or 'workspace', worker,
+                        config.getoption('yorha_package', None))
+    yield pool
+    pool.finish()
+
+
+@pytest.fixture
+def yorha_capture(request: Any, yorha_pipelines: PipelinePool) -> Iterator[CaptureView]:
+    """ Per-test view of the capture pipeline. The device is the first serial, or `request.param` (indirect).
+    """
+    serial = getattr(request, 'param', None)
+    if serial is None:
+        serials = _serials(request.config)
+        if not serials:
+            pytest.skip('No target device. use --yorha-serial or ANDROID_SERIAL.')
+        serial = serials[0]
+    view = yorha_pipelines.get(serial).view(request.node.name)
+    yield view
+    view.close()
@@ -0,0 +1,249 @@
+""" YoRHa module : metrics utility. """
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+import json
+import time
+import bisect
+import logging
+import weakref
+import threading
+from contextlib import contextmanager
+
+BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0)
+logger = logging.getLogger(__name__)
+_registry: 'weakref.WeakSet[Metrics]' = weakref.WeakSet()
+# totals of collected metrics. kept so that totals() never decreases.
+# reentrant : the finalizer can run on gc inside totals().
+_retired: Dict[str, float] = {}
+_retired_mutex = threading.RLock()
+
+
+class Counter:
+    """ Monotonic Counter.
+    """
+
+    def __init__(self) -> None:
+        self.value = 0
+
+    def add(self, value: int = 1) -> None:
+        """ Count up.
+        Arguments:
+            value(int): increment. default : 1.
+        """
+        self.value += value
+
+
+class Histogram:
+    """ Fixed Bucket Histogram.
+    Attributes:
+        buckets(Sequence[float]): bucket upper bounds. (sec)
+    """
+
+    def __init__(self, buckets: Sequence[float] = BUCKETS) -> None:
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._mutex = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        """ Observe value.
+        Arguments:
+            value(float): observed value.
+        """
+        index = bisect.bisect_left(self.buckets, value)
+        with self._mutex:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += value
+            if value > self.max:
+                self.max = value
+
+    def quantile(self, q: float) -> float:
+        """ Estimate quantile by bucket upper bound.
+        Arguments:
+            q(float): quantile. (0.0 - 1.0)
+        Returns:
+            value(float): estimated value. the max value for the overflow bucket.
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return self.buckets[index] if index < len(self.buckets) else self.max
+        return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        """ Get snapshot.
+        Returns:
+            snapshot(Dict[str, Any]): count, sum, mean, max, quantiles and bucket counts.
+        """
+        with self._mutex:
+            return {
+                'count': self.count,
+                'sum': self.total,
+                'mean': self.total / self.count if self.count else 0.0,
+                'max': self.max,
+                'p50': self.quantile(0.5),
+                'p90': self.quantile(0.9),
+                'p99': self.quantile(0.99),
+                'buckets': dict(zip([str(b) for b in self.buckets] + ['inf'], self.counts)),
+            }
+
+
+class Metrics:
+    """ Named set of counters and histograms. Always on.
+    Attributes:
+        name(str): metrics name.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.since = time.time()
+        self.counters: Dict[str, Counter] = {}
+        self.histograms: Dict[str, Histogram] = {}
+        self._mutex = threading.Lock()
+        _registry.add(self)
+        weakref.finalize(self, _retire, name, self.counters, self.histograms)
+
+    def counter(self, name: str) -> Counter:
+        """ Get counter. created on first use.
+        Arguments:
+            name(str): counter name.
+        Returns:
+            counter(Counter): counter.
+        """
+        counter = self.counters.get(name)
+        if counter is None:
+            with self._mutex:
+                counter = self.counters.setdefault(name, Counter())
+        return counter
+
+    def histogram(self, name: str) -> Histogram:
+        """ Get histogram. created on first use.
+        Arguments:
+            name(str): histogram name.
+        Returns:
+            histogram(Histogram): histogram.
+        """
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self._mutex:
+                histogram = self.histograms.setdefault(name, Histogram())
+        return histogram
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """ Observe elapsed time of the block in histogram.
+        Arguments:
+            name(str): histogram name.
+        """
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.histogram(name).observe(time.perf_counter() - begin)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """ Get snapshot.
+        Returns:
+            snapshot(Dict[str, Any]): counters, rates per second, and histograms.
+        """
+        elapsed = max(time.time() - self.since, 1e-9)
+        counters = {name: c.value for name, c in list(self.counters.items())}
+        return {
+            'name': self.name,
+            'elapsed': elapsed,
+            'counters': counters,
+            'rates': {name: value / elapsed for name, value in counters.items()},
+            'histograms': {name: h.snapshot() for name, h in list(self.histograms.items())},
+        }
+
+
+def _accumulate(result: Dict[str, float], prefix: str, counters: Dict[str, Counter],
+                histograms: Dict[str, Histogram]) -> None:
+    """ Add counter values and histogram count / sum to the totals.
+    Arguments:
+        result(Dict[str, float]): totals.
+        prefix(str): metrics name.
+        counters(Dict[str, Counter]): counters.
+        histograms(Dict[str, Histogram]): histograms.
+    """
+    for name, counter in list(counters.items()):
+        key = '%s.%s' % (prefix, name)
+        result[key] = result.get(key, 0) + counter.value
+    for name, histogram in list(histograms.items()):
+        key = '%s.%s' % (prefix, name)
+        result[key + '.count'] = result.get(key + '.count', 0) + histogram.count
+        result[key + '.sum'] = result.get(key + '.sum', 0.0) + histogram.total
+
+
+def _retire(name: str, counters: Dict[str, Counter], histograms: Dict[str, Histogram]) -> None:
+    """ Fold the values of collected metrics into the retired totals.
+    Arguments:
+        name(str): metrics name.
+        counters(Dict[str, Counter]): counters.
+        histograms(Dict[str, Histogram]): histograms.
+    """
+    with _retired_mutex:
+        _accumulate(_retired, name, counters, histograms)
+
+
+def totals() -> Dict[str, float]:
+    """ Totals of all metrics, including collected ones. Metrics of the same name are summed.
+    Returns:
+        totals(Dict[str, float]): counter values, and `.count` / `.sum` of histograms, by `<metrics>.<name>`.
+    """
+    with _retired_mutex:
+        result = dict(_retired)
+        for metrics in list(_registry):
+            _accumulate(result, metrics.name, metrics.counters, metrics.histograms)
+    return result
+
+
+class MetricsDumper:
+    """ Dump metrics snapshot periodically. (json lines)
+    Attributes:
+        metrics(List[Metrics]): target metrics.
+        path(str): output filepath.
+        interval(float): dump interval. (sec)
+    """
+
+    def __init__(self, metrics: List[Metrics], path: str, interval: float = 10.0) -> None:
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """ start dump thread.
+        """
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.main_loop, name='yorha-metrics', daemon=True)
+        self._thread.start()
+
+    def finish(self) -> None:
+        """ finish dump thread. dump the last snapshot.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+    def dump(self) -> None:
+        """ Append snapshot in the file.
+        """
+        line = {'time': time.time(), 'metrics': [m.snapshot() for m in self.metrics]}
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(line) + '\n')
+
+    def main_loop(self) -> None:
+        """ Dump Main Loop.
+        """
+        while not self._stop.wait(self.interval):
+            self.dump()
+        self.dump()
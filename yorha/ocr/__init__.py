@@ -0,0 +1,3 @@
+from .module import Ocr, OcrEngine, TesseractEngine
+
+__all__ = ['Ocr', 'OcrEngine', 'TesseractEngine']
@@ -0,0 +1,192 @@
+""" YoRHa Plugins : OCR Utility. """
+from typing import Optional, Tuple, List, Union, Sequence
+import abc
+import logging
+import hashlib
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from yorha.exception import OcrError
+
+try:
+    import pytesseract
+except ImportError:
+    pytesseract = None
+
+CACHE_SIZE = 256
+SCALE = 2
+logger = logging.getLogger(__name__)
+
+Box = Tuple[int, int, int, int]
+
+
+class OcrEngine(abc.ABC):
+    """ OCR Engine Interface.
+    """
+
+    @abc.abstractmethod
+    def recognize(self, image: np.ndarray) -> str:
+        """ Recognize text in preprocessed image.
+        Arguments:
+            image(numpy.ndarray): binarized grayscale image.
+        Returns:
+            text(str): recognized text.
+        """
+
+    def name(self) -> str:
+        """ Get engine name. Used for cache key.
+        Returns:
+            name(str): engine name.
+        """
+        return type(self).__name__
+
+
+class TesseractEngine(OcrEngine):
+    """ Tesseract OCR Engine. (pytesseract)
+    Attributes:
+        lang(str): tesseract language. default : eng.
+        config(str): tesseract config. default : single text line.
+    """
+
+    def __init__(self, lang: str = 'eng', config: str = '--psm 7') -> None:
+        if not self.available():
+            raise OcrError('pytesseract is not installed.')
+        self.lang = lang
+        self.config = config
+
+    @staticmethod
+    def available() -> bool:
+        """ Is pytesseract available.
+        Returns:
+            result(bool): true if pytesseract is installed.
+        """
+        return pytesseract is not None
+
+    def recognize(self, image: np.ndarray) -> str:
+        return str(pytesseract.image_to_string(image, lang=self.lang, config=self.config)).strip()
+
+    def name(self) -> str:
+        return 'tesseract:%s:%s' % (self.lang, self.config)
+
+
+class Ocr:
+    """ OCR Utility Class.
+    Recognition results are cached by the hash of region pixels.
+    """
+    _engine: Optional[OcrEngine] = None
+    _cache: 'OrderedDict[bytes, str]' = OrderedDict()
+    _mutex = threading.Lock()
+    hits = 0
+    misses = 0
+
+    @classmethod
+    def set_engine(cls, engine: Optional[OcrEngine]) -> None:
+        """ Set OCR Engine.
+        Arguments:
+            engine(Optional[OcrEngine]): ocr engine. if None, default engine is used.
+        """
+        with cls._mutex:
+            cls._engine = engine
+            cls._cache.clear()
+
+    @classmethod
+    def get_engine(cls) -> OcrEngine:
+        """ Get OCR Engine.
+        Raises:
+            OcrError: ocr engine is not available.
+        Returns:
+            engine(OcrEngine): ocr engine.
+        """
+        if cls._engine is None:
+            if not TesseractEngine.available():
+                raise OcrError('OCR Engine is not available. Please install pytesseract or call Ocr.set_engine.')
+            cls._engine = TesseractEngine()
+        return cls._engine
+
+    @staticmethod
+    def preprocess(region: np.ndarray) -> np.ndarray:
+        """ Preprocess region for recognition. (grayscale, binarize, upscale)
+        Arguments:
+            region(numpy.ndarray): cropped image. (BGR or grayscale)
+        Returns:
+            image(numpy.ndarray): preprocessed image.
+        """
+        gray = cv2.cvtColor(region, cv2.COLOR_BGR2GRAY) if region.ndim == 3 else region
+        _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        return cv2.resize(binary, None, fx=SCALE, fy=SCALE, interpolation=cv2.INTER_CUBIC)
+
+    @classmethod
+    def read(cls, image: np.ndarray, boxes: Sequence[Optional[Box]]) -> List[str]:
+        """ Read text in boxes.
+        Arguments:
+            image(numpy.ndarray): reference image. (BGR)
+            boxes(Sequence[Optional[Box]]): target boxes. (x, y, width, height). None is full image.
+        Returns:
+            texts(List[str]): recognized texts. (boxes order)
+        """
+        engine = cls.get_engine()
+        texts = []
+        for box in boxes:
+            region = _crop(image, box)
+            if not region.size:
+                texts.append('')
+                continue
+            digest = hashlib.blake2b(region.tobytes(), digest_size=16)
+            digest.update(('%s:%s' % (region.shape, engine.name())).encode())
+            key = digest.digest()
+            with cls._mutex:
+                text = cls._cache.get(key)
+                if text is not None:
+                    cls._cache.move_to_end(key)
+                    cls.hits += 1
+            if text is None:
+                text = engine.recognize(cls.preprocess(region))
+                with cls._mutex:
+                    cls.misses += 1
+                    cls._cache[key] = text
+                    if len(cls._cache) > CACHE_SIZE:
+                        cls._cache.popitem(last=False)
+            texts.append(text)
+        return texts
+
+    @classmethod
+    def img_to_string(cls, image: np.ndarray, box: Union[None, Box, Sequence[Box]],
+                      expect: Optional[str] = None) -> Tuple[Optional[Union[str, List[str]]], np.ndarray]:
+        """ Image to String.
+        Arguments:
+            image(numpy.ndarray): reference image. (BGR)
+            box(Union[None, Box, Sequence[Box]]): target box, or list of target boxes.
+            expect(Optional[str]): if set, the result is returned only when any text contains it.
+        Returns:
+            result(Tuple[Optional[Union[str, List[str]]], numpy.ndarray]): text (list for multiple boxes),
+                and image for evidence.
+        """
+        multiple = box is not None and not isinstance(box[0], (int, np.integer))
+        boxes: List[Optional[Box]] = list(box) if multiple else [box]  # type: ignore
+        texts = cls.read(image, boxes)
+        if expect is not None and not any([expect in text for text in texts]):
+            return None, image
+        if not any(texts):
+            return None, image
+        marked = image.copy()
+        for b in boxes:
+            if b is not None:
+                cv2.rectangle(marked, (b[0], b[1]), (b[0] + b[2], b[1] + b[3]), (255, 0, 0), 2)
+        return (texts if multiple else texts[0]), marked
+
+
+def _crop(image: np.ndarray, box: Optional[Box]) -> np.ndarray:
+    """ Crop image.
+    Arguments:
+        image(numpy.ndarray): reference image.
+        box(Optional[Box]): box object. (x, y, width, height)
+    Returns:
+        region(numpy.ndarray): cropped image.
+    """
+    if box is None:
+        return image
+    x, y, w, h = [max(0, int(v)) for v in box]
+    return image[y:y + h, x:x + w]
@@ -0,0 +1,6 @@
+from .module import Picture, PatternObject, PatternResult, Pyramid
+from .change import ChangeDetector
+from .locator import Locator
+from .frame import Frame
+
+__all__ = ['Picture', 'PatternObject', 'PatternResult', 'Pyramid', 'ChangeDetector', 'Locator', 'Frame']
@@ -0,0 +1,57 @@
+""" YoRHa Plugins : Frame Change Detection Utility. """
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+SIZE = 32
+TOLERANCE = 12
+
+Box = Tuple[int, int, int, int]
+
+
+class ChangeDetector:
+    """ Frame Change Detector.
+    Compare downsampled grayscale thumbnails of the frame, or of the region in the frame.
+
+    Attributes:
+        size(int): thumbnail size. default : 32.
+        tolerance(int): allowed pixel difference of thumbnails. default : 12.
+    """
+
+    def __init__(self, size: int = SIZE, tolerance: int = TOLERANCE) -> None:
+        self.size = size
+        self.tolerance = tolerance
+
+    def signature(self, image: np.ndarray, box: Optional[Box] = None) -> np.ndarray:
+        """ Get region signature.
+        Arguments:
+            image(numpy.ndarray): reference image. (BGR or grayscale)
+            box(Optional[Box]): region. (x, y, width, height). default : full image.
+        Returns:
+            signature(numpy.ndarray): downsampled grayscale thumbnail.
+        """
+        if box is not None:
+            x, y, w, h = [max(0, int(v)) for v in box]
+            image = image[y:y + h, x:x + w]
+        if not image.size:
+            return np.zeros((0, 0), np.uint8)
+        thumbnail = cv2.resize(image, (min(self.size, image.shape[1]), min(self.size, image.shape[0])),
+                               interpolation=cv2.INTER_AREA)
+        if thumbnail.ndim == 3:
+            thumbnail = cv2.cvtColor(thumbnail, cv2.COLOR_BGR2GRAY)
+        return thumbnail
+
+    def changed(self, before: Optional[np.ndarray], after: Optional[np.ndarray]) -> bool:
+        """ Compare signatures.
+        Arguments:
+            before(Optional[numpy.ndarray]): previous signature.
+            after(Optional[numpy.ndarray]): current signature.
+        Returns:
+            result(bool): true if the region has changed, or either signature is missing.
+        """
+        if before is None or after is None or before.shape != after.shape:
+            return True
+        if not before.size:
+            return False
+        return bool(cv2.absdiff(before, after).max() > self.tolerance)
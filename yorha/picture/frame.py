@@ -0,0 +1,140 @@
+""" YoRHa Plugins : Decoded Frame Utility. """
+from typing import Optional, Tuple, Dict, Any
+import time
+import threading
+
+import cv2
+import numpy as np
+
+from .module import Pyramid
+
+Box = Tuple[int, int, int, int]
+
+
+class Frame:
+    """ Decoded Frame.
+    Derived representations are computed on first use, and shared by all consumers of the frame.
+
+    Attributes:
+        seq(int): frame sequence number.
+        data(bytes): jpeg data.
+        timestamp(float): received time. default : now.
+        scale(float): projection scale against the profile resolution. default : 1.0.
+    """
+
+    def __init__(self, seq: int, data: bytes, timestamp: Optional[float] = None, scale: float = 1.0) -> None:
+        self.seq = seq
+        self.data = data
+        self.timestamp = time.time() if timestamp is None else timestamp
+        self.scale = scale
+        self._views: Dict[Any, np.ndarray] = {}
+        self._pyramid: Optional[Pyramid] = None
+        self._mutex = threading.RLock()
+
+    def __repr__(self) -> str:
+        return 'Frame()'
+
+    def __str__(self) -> str:
+        return 'Frame [ Seq = %d, Length = %d ]' % (self.seq, len(self.data))
+
+    def _view(self, key: Any, build: Any) -> np.ndarray:
+        """ Get memoized view.
+        Arguments:
+            key(Any): view key.
+            build(Callable[[], numpy.ndarray]): view builder.
+        Returns:
+            view(numpy.ndarray): view.
+        """
+        view = self._views.get(key)
+        if view is None:
+            with self._mutex:
+                view = self._views.get(key)
+                if view is None:
+                    view = build()
+                    self._views[key] = view
+        return view
+
+    @property
+    def bgr(self) -> np.ndarray:
+        """ BGR image.
+        Returns:
+            image(numpy.ndarray): decoded image.
+        """
+        return self._view('bgr', lambda: cv2.imdecode(np.frombuffer(self.data, np.uint8), cv2.IMREAD_COLOR))
+
+    @property
+    def pyramid(self) -> Pyramid:
+        """ Grayscale pyramid.
+        Returns:
+            pyramid(Pyramid): grayscale pyramid of the frame.
+        """
+        if self._pyramid is None:
+            bgr = self.bgr
+            with self._mutex:
+                if self._pyramid is None:
+                    self._pyramid = Pyramid(bgr)
+        return self._pyramid
+
+    @property
+    def gray(self) -> np.ndarray:
+        """ Grayscale image.
+        Returns:
+            image(numpy.ndarray): grayscale image.
+        """
+        return self.pyramid.gray
+
+    @property
+    def half(self) -> np.ndarray:
+        """ Half scale BGR image.
+        Returns:
+            image(numpy.ndarray): half scale image.
+        """
+        return self.scaled(2)
+
+    @property
+    def quarter(self) -> np.ndarray:
+        """ Quarter scale BGR image.
+        Returns:
+            image(numpy.ndarray): quarter scale image.
+        """
+        return self.scaled(4)
+
+    def scaled(self, divisor: int) -> np.ndarray:
+        """ Downscaled BGR image. Quarter scale is built from half scale.
+        Arguments:
+            divisor(int): scale divisor.
+        Returns:
+            image(numpy.ndarray): downscaled image.
+        """
+        if divisor == 1:
+            return self.bgr
+        if divisor % 2 == 0 and divisor > 2:
+            source = self.scaled(divisor // 2)
+            size = (source.shape[1] // 2, source.shape[0] // 2)
+        else:
+            source = self.bgr
+            size = (source.shape[1] // divisor, source.shape[0] // divisor)
+        return self._view(('scaled', divisor), lambda: cv2.resize(source, size, interpolation=cv2.INTER_AREA))
+
+    def resized(self, size: Tuple[int, int]) -> np.ndarray:
+        """ Resized BGR image.
+        Arguments:
+            size(Tuple[int, int]): (width, height)
+        Returns:
+            image(numpy.ndarray): resized image.
+        """
+        return self._view(('resized', size), lambda: cv2.resize(self.bgr, size, interpolation=cv2.INTER_AREA))
+
+    def crop(self, box: Box, gray: bool = False) -> np.ndarray:
+        """ Region of interest.
+        Arguments:
+            box(Box): region. (x, y, width, height)
+            gray(bool): if true, grayscale region.
+        Returns:
+            image(numpy.ndarray): region.
+        """
+        box = tuple([max(0, int(v)) for v in box])  # type: ignore
+        if gray:
+            return self._view(('crop', box, True), lambda: self.pyramid.crop(box))
+        x, y, w, h = box
+        return self._view(('crop', box, False), lambda: self.bgr[y:y + h, x:x + w])
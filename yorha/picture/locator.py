@@ -0,0 +1,109 @@
+""" YoRHa Plugins : Temporal-Coherence Locator Utility. """
+from typing import Optional, Tuple, Dict, Union
+import threading
+
+import numpy as np
+
+from .module import Picture, PatternObject, Pyramid, THRESHOLD, as_pyramid
+
+MARGIN = 32
+
+Box = Tuple[int, int, int, int]
+Key = Tuple[str, ...]
+
+
+class Locator:
+    """ Temporal-Coherence Locator.
+    Remember the last match location of each template, and search around it before the whole box.
+
+    Attributes:
+        margin(int): search margin around the last location. (pixel) default : 32.
+    """
+
+    def __init__(self, margin: int = MARGIN) -> None:
+        self.margin = margin
+        self._last: Dict[Key, Box] = {}
+        self._stats: Dict[str, int] = {'local_hit': 0, 'local_miss': 0, 'full_hit': 0, 'full_miss': 0}
+        self._mutex = threading.Lock()
+
+    def search_pattern(self, reference: Union[np.ndarray, Pyramid], target: str, box: Optional[Box] = None,
+                       key: Key = (), threshold: float = THRESHOLD,
+                       scale: float = 1.0) -> Tuple[Optional[Box], np.ndarray]:
+        """ Search pattern near the last location first, fall back to the box.
+        Arguments:
+            reference(Union[numpy.ndarray, Pyramid]): reference image (BGR), or its pyramid.
+            target(str): template image filepath.
+            box(Optional[Box]): search box. (x, y, width, height)
+            key(Tuple[str, ...]): location namespace. (e.g. serial, profile)
+            threshold(float): match threshold. default : 0.8.
+            scale(float): frame scale against the profile resolution. box and result are profile coordinates.
+        Returns:
+            result(Tuple[Optional[Box], numpy.ndarray]): matched box, and image for evidence.
+        """
+        name = key + (target,)
+        pyramid = as_pyramid(reference)
+        image = pyramid.reference
+        last = self._last.get(name)
+        if last is not None:
+            roi = self._around(last, box)
+            if roi is not None:
+                result = Picture.match(pyramid, PatternObject(target, roi, threshold), scale)
+                if result is not None:
+                    self._count('local_hit')
+                    self._last[name] = result.box
+                    return result.box, Picture.mark(image, [result], scale)
+                self._count('local_miss')
+
+        result = Picture.match(pyramid, PatternObject(target, box, threshold), scale)
+        if result is None:
+            self._count('full_miss')
+            self._last.pop(name, None)
+            return None, image
+        self._count('full_hit')
+        self._last[name] = result.box
+        return result.box, Picture.mark(image, [result], scale)
+
+    def forget(self, key: Key = ()) -> None:
+        """ Forget the last locations in namespace.
+        Arguments:
+            key(Tuple[str, ...]): location namespace. () is all.
+        """
+        with self._mutex:
+            for name in [n for n in self._last if n[:len(key)] == key]:
+                del self._last[name]
+
+    def statistics(self) -> Dict[str, float]:
+        """ Get hit-rate statistics.
+        Returns:
+            stats(Dict[str, float]): counters, and local hit rate.
+        """
+        with self._mutex:
+            stats: Dict[str, float] = dict(self._stats)
+        tried = stats['local_hit'] + stats['local_miss']
+        stats['local_hit_rate'] = stats['local_hit'] / tried if tried else 0.0
+        return stats
+
+    def _around(self, last: Box, box: Optional[Box]) -> Optional[Box]:
+        """ Region around the last location, clipped by box.
+        Arguments:
+            last(Box): last matched box.
+            box(Optional[Box]): search box.
+        Returns:
+            roi(Optional[Box]): search region, or None if it is out of box.
+        """
+        x0, y0 = last[0] - self.margin, last[1] - self.margin
+        x1, y1 = last[0] + last[2] + self.margin, last[1] + last[3] + self.margin
+        if box is not None:
+            x0, y0 = max(x0, box[0]), max(y0, box[1])
+            x1, y1 = min(x1, box[0] + box[2]), min(y1, box[1] + box[3])
+        if x1 - x0 < last[2] or y1 - y0 < last[3]:
+            return None
+        return (max(0, x0), max(0, y0), x1 - max(0, x0), y1 - max(0, y0))
+
+    def _count(self, name: str) -> None:
+        """ Count up statistics.
+        Arguments:
+            name(str): counter name.
+        """
+        with self._mutex:
+            self._stats[name] += 1
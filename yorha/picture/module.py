@@ -0,0 +1,309 @@
+""" YoRHa Plugins : Picture Utility. """
+from typing import Optional, Tuple, List, Dict, Sequence, Union, cast
+import os
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future, as_completed
+
+import cv2
+import numpy as np
+
+from yorha.exception import PictureError
+
+THRESHOLD = 0.8
+COARSE_SLACK = 0.1
+COARSE_RATIO = 4
+PYRAMID_MIN = 32
+WORKERS = 4
+logger = logging.getLogger(__name__)
+
+Box = Tuple[int, int, int, int]
+
+
+class PatternObject:
+    """ Pattern Object.
+    Attributes:
+        target(str): template image filepath.
+        box(Optional[Box]): search box. (x, y, width, height)
+        threshold(float): match threshold. default : 0.8.
+    """
+
+    def __init__(self, target: str, box: Optional[Box] = None, threshold: float = THRESHOLD) -> None:
+        self.target = target
+        self.box = box
+        self.threshold = threshold
+
+    def __repr__(self) -> str:
+        return 'PatternObject()'
+
+    def __str__(self) -> str:
+        return 'Target, Box, Threshold : %s, %s, %s' % (os.path.basename(self.target), self.box, self.threshold)
+
+
+class PatternResult:
+    """ Pattern Match Result.
+    Attributes:
+        target(str): template image filepath.
+        box(Box): matched box. (x, y, width, height)
+        score(float): match score.
+    """
+
+    def __init__(self, target: str, box: Box, score: float) -> None:
+        self.target = target
+        self.box = box
+        self.score = score
+
+    def __repr__(self) -> str:
+        return 'PatternResult()'
+
+    def __str__(self) -> str:
+        return 'Target, Box, Score : %s, %s, %.3f' % (os.path.basename(self.target), self.box, self.score)
+
+
+class Pyramid:
+    """ Grayscale image pyramid of a single frame. Each level is computed on first use.
+    Attributes:
+        reference(numpy.ndarray): reference image. (BGR or grayscale)
+    """
+
+    def __init__(self, reference: np.ndarray) -> None:
+        self.reference = reference
+        self._gray: Optional[np.ndarray] = reference if reference.ndim == 2 else None
+        self._half: Optional[np.ndarray] = None
+        self._mutex = threading.Lock()
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        """ Reference image shape.
+        Returns:
+            shape(Tuple[int, ...]): image shape.
+        """
+        return cast(Tuple[int, ...], self.reference.shape)
+
+    @property
+    def gray(self) -> np.ndarray:
+        """ Full scale grayscale image.
+        Returns:
+            image(numpy.ndarray): grayscale image.
+        """
+        if self._gray is None:
+            with self._mutex:
+                if self._gray is None:
+                    self._gray = cv2.cvtColor(self.reference, cv2.COLOR_BGR2GRAY)
+        return self._gray
+
+    @property
+    def half(self) -> np.ndarray:
+        """ Half scale grayscale image.
+        Returns:
+            image(numpy.ndarray): half scale image.
+        """
+        if self._half is None:
+            gray = self.gray
+            with self._mutex:
+                if self._half is None:
+                    self._half = cv2.pyrDown(gray)
+        return self._half
+
+    def crop(self, box: Box) -> np.ndarray:
+        """ Grayscale region. Convert only the region unless the full scale image already exists.
+        Arguments:
+            box(Box): region. (x, y, width, height)
+        Returns:
+            image(numpy.ndarray): grayscale region.
+        """
+        x, y, w, h = box
+        if self._gray is not None:
+            return self._gray[y:y + h, x:x + w]
+        return cv2.cvtColor(self.reference[y:y + h, x:x + w], cv2.COLOR_BGR2GRAY)
+
+
+class Picture:
+    """ Picture Utility Class.
+    """
+    _templates: Dict[Tuple[str, float], Tuple[np.ndarray, np.ndarray]] = {}
+    _mutex = threading.Lock()
+    _pool: Optional[ThreadPoolExecutor] = None
+
+    @classmethod
+    def template(cls, target: str, scale: float = 1.0) -> Tuple[np.ndarray, np.ndarray]:
+        """ Load template image. (grayscale, full and half scale)
+        Arguments:
+            target(str): template image filepath.
+            scale(float): frame scale against the profile resolution. default : 1.0.
+        Raises:
+            PictureError: template image is not found.
+        Returns:
+            template(Tuple[numpy.ndarray, numpy.ndarray]): full scale and half scale image.
+        """
+        key = (target, scale)
+        if key not in cls._templates:
+            if scale == 1.0:
+                image = cv2.imread(target, cv2.IMREAD_GRAYSCALE)
+                if image is None:
+                    raise PictureError('Template is not found. : %s' % target)
+            else:
+                image = cls.template(target)[0]
+                image = cv2.resize(image, (max(1, int(round(image.shape[1] * scale))),
+                                           max(1, int(round(image.shape[0] * scale)))),
+                                   interpolation=cv2.INTER_AREA)
+            with cls._mutex:
+                cls._templates[key] = (image, cv2.pyrDown(image))
+        return cls._templates[key]
+
+    @classmethod
+    def pool(cls) -> ThreadPoolExecutor:
+        """ Get shared matching thread pool.
+        Returns:
+            pool(ThreadPoolExecutor): thread pool.
+        """
+        if cls._pool is None:
+            with cls._mutex:
+                if cls._pool is None:
+                    cls._pool = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix='yorha-picture')
+        return cls._pool
+
+    @classmethod
+    def match(cls, pyramid: Pyramid, pattern: PatternObject, scale: float = 1.0) -> Optional[PatternResult]:
+        """ Match a single pattern. Search coarse level first, and refine on full scale.
+        Arguments:
+            pyramid(Pyramid): reference image pyramid.
+            pattern(PatternObject): search pattern.
+            scale(float): frame scale against the profile resolution. box and result are profile coordinates.
+        Returns:
+            result(Optional[PatternResult]): match result, or None.
+        """
+        full, half = cls.template(pattern.target, scale)
+        th, tw = full.shape[:2]
+        x, y, w, h = _clip(scale_box(pattern.box, scale), pyramid.shape)
+        if w < tw or h < th:
+            return None
+
+        if min(half.shape[:2]) >= PYRAMID_MIN and w * h > COARSE_RATIO * tw * th:
+            region = pyramid.half[y // 2:(y + h) // 2, x // 2:(x + w) // 2]
+            if region.shape[0] >= half.shape[0] and region.shape[1] >= half.shape[1]:
+                _, score, _, loc = cv2.minMaxLoc(cv2.matchTemplate(region, half, cv2.TM_CCOEFF_NORMED))
+                if score < pattern.threshold - COARSE_SLACK:
+                    return None
+                # refine the coarse hit with a small window on the full scale image.
+                cx, cy = (x // 2 + loc[0]) * 2, (y // 2 + loc[1]) * 2
+                rx, ry = max(x, cx - 4), max(y, cy - 4)
+                x, y, w, h = rx, ry, min(x + w, cx + tw + 4) - rx, min(y + h, cy + th + 4) - ry
+
+        region = pyramid.crop((x, y, w, h))
+        _, score, _, loc = cv2.minMaxLoc(cv2.matchTemplate(region, full, cv2.TM_CCOEFF_NORMED))
+        if score < pattern.threshold:
+            return None
+        return PatternResult(pattern.target, cast(Box, scale_box((x + loc[0], y + loc[1], tw, th), 1.0 / scale)),
+                             float(score))
+
+    @classmethod
+    def search_pattern(cls, reference: Union[np.ndarray, Pyramid], target: str, box: Optional[Box] = None,
+                       threshold: float = THRESHOLD, scale: float = 1.0) -> Tuple[Optional[Box], np.ndarray]:
+        """ Search pattern in reference image.
+        Arguments:
+            reference(Union[numpy.ndarray, Pyramid]): reference image (BGR), or its pyramid.
+            target(str): template image filepath.
+            box(Optional[Box]): search box. (x, y, width, height)
+            threshold(float): match threshold. default : 0.8.
+            scale(float): frame scale against the profile resolution. default : 1.0.
+        Returns:
+            result(Tuple[Optional[Box], numpy.ndarray]): matched box, and image for evidence.
+        """
+        pyramid = as_pyramid(reference)
+        result = cls.match(pyramid, PatternObject(target, box, threshold), scale)
+        if result is None:
+            return None, pyramid.reference
+        return result.box, cls.mark(pyramid.reference, [result], scale)
+
+    @classmethod
+    def search_patterns(cls, reference: Union[np.ndarray, Pyramid], patterns: Sequence[PatternObject],
+                        first: bool = False, scale: float = 1.0) -> Tuple[List[PatternResult], np.ndarray]:
+        """ Search multiple patterns in one reference image.
+        Grayscale conversion and pyramid are shared, each pattern is matched on the thread pool.
+        Arguments:
+            reference(Union[numpy.ndarray, Pyramid]): reference image (BGR), or its pyramid.
+            patterns(Sequence[PatternObject]): search patterns.
+            first(bool): if true, stop at the first hit.
+            scale(float): frame scale against the profile resolution. default : 1.0.
+        Returns:
+            result(Tuple[List[PatternResult], numpy.ndarray]): all hits (patterns order), and image for evidence.
+        """
+        pyramid = as_pyramid(reference)
+        stop = threading.Event()
+
+        def task(pattern: PatternObject) -> Optional[PatternResult]:
+            if stop.is_set():
+                return None
+            return cls.match(pyramid, pattern, scale)
+
+        futures: Dict[Future, int] = {cls.pool().submit(task, p): i for i, p in enumerate(patterns)}
+        hits: Dict[int, PatternResult] = {}
+        for future in as_completed(futures):
+            result = future.result()
+            if result is not None:
+                hits[futures[future]] = result
+                if first:
+                    stop.set()
+                    for pending in futures:
+                        pending.cancel()
+                    break
+        results = [hits[i] for i in sorted(hits)]
+        if not results:
+            return results, pyramid.reference
+        return results, cls.mark(pyramid.reference, results, scale)
+
+    @classmethod
+    def mark(cls, reference: np.ndarray, results: Sequence[PatternResult], scale: float = 1.0) -> np.ndarray:
+        """ Draw matched boxes on a copy of reference image.
+        Arguments:
+            reference(numpy.ndarray): reference image. (BGR)
+            results(Sequence[PatternResult]): match results.
+            scale(float): frame scale against the profile resolution. default : 1.0.
+        Returns:
+            image(numpy.ndarray): marked image.
+        """
+        image = reference.copy()
+        for result in results:
+            x, y, w, h = cast(Box, scale_box(result.box, scale))
+            cv2.rectangle(image, (x, y), (x + w, y + h), (0, 0, 255), 2)
+        return image
+
+
+def as_pyramid(reference: Union[np.ndarray, Pyramid]) -> Pyramid:
+    """ Get pyramid of reference image.
+    Arguments:
+        reference(Union[numpy.ndarray, Pyramid]): reference image, or its pyramid.
+    Returns:
+        pyramid(Pyramid): pyramid. shared if given.
+    """
+    return reference if isinstance(reference, Pyramid) else Pyramid(reference)
+
+
+def scale_box(box: Optional[Box], scale: float) -> Optional[Box]:
+    """ Scale box.
+    Arguments:
+        box(Optional[Box]): box object. (x, y, width, height)
+        scale(float): scale.
+    Returns:
+        box(Optional[Box]): scaled box.
+    """
+    if box is None or scale == 1.0:
+        return box
+    return (int(round(box[0] * scale)), int(round(box[1] * scale)), int(round(box[2] * scale)),
+            int(round(box[3] * scale)))
+
+
+def _clip(box: Optional[Box], shape: Tuple[int, ...]) -> Box:
+    """ Clip box in image shape.
+    Arguments:
+        box(Optional[Box]): box object. (x, y, width, height)
+        shape(Tuple): image shape.
+    Returns:
+        box(Box): clipped box. if box is None, full image box.
+    """
+    height, width = shape[:2]
+    if box is None:
+        return (0, 0, width, height)
+    x, y = max(0, int(box[0])), max(0, int(box[1]))
+    return (x, y, max(0, min(width, int(box[0]) + int(box[2])) - x), max(0, min(height, int(box[1]) + int(box[3])) - y))
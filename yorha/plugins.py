@@ -1,5 +1,6 @@
 """ YoRHa Plugin Module. """
 import os
+import re
 import time
 import logging
 import pytest
@@ -10,7 +11,11 @@ import pytest
 # pylint: disable=redefined-outer-name
 # pylint: disable=unused-argument
 
+from yorha import trace
+from yorha.report import PerfReport, THRESHOLD
 from yorha.cmd import run
+from yorha.device.logcat import dump_failure
+from yorha.fixture import yorha_pipelines, yorha_capture
 
 FFMPEG_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), 'binary', 'ffmpeg', 'bin', 'ffmpeg.exe'))
 logger = logging.getLogger(__name__)
@@ -20,6 +25,41 @@ def pytest_addoption(parser):
     """ add commandline options """
     group = parser.getgroup('yorha')
     group.addoption('--yorha-debug', action='store_true', dest='yorha_debug', default=False, help='debug flag.')
+    group.addoption('--yorha-trace', action='store', dest='yorha_trace', default=None, metavar='DIR',
+                    help='export chrome trace json of each test to the directory.')
+    group.addoption('--yorha-report', action='store', dest='yorha_report', default=None, metavar='PATH',
+                    help='write per-test performance report json of the session.')
+    group.addoption('--yorha-baseline', action='store', dest='yorha_baseline', default=None, metavar='PATH',
+                    help='compare with the previous performance report, and flag regressions.')
+    group.addoption('--yorha-threshold', action='store', dest='yorha_threshold', type=float, default=THRESHOLD,
+                    help='regression ratio against the baseline. default: %s.' % THRESHOLD)
+    group.addoption('--yorha-serial', action='append', dest='yorha_serial', default=[], metavar='SERIAL',
+                    help='target device of the capture fixtures. repeatable. default: ANDROID_SERIAL.')
+    group.addoption('--yorha-workspace', action='store', dest='yorha_workspace', default='workspace', metavar='DIR',
+                    help='workspace root of the capture fixtures. default: workspace.')
+    group.addoption('--yorha-package', action='store', dest='yorha_package', default=None,
+                    help='package name of the capture fixtures workspace.')
+
+
+def pytest_configure(config):
+    """ enable tracing and performance report """
+    if config.getoption('yorha_trace', None):
+        trace.enable()
+    config.yorha_report = None
+    if config.getoption('yorha_report', None) or config.getoption('yorha_baseline', None):
+        config.yorha_report = PerfReport(config.getoption('yorha_threshold'))
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_runtest_setup(item):
+    """ record the start time, discard trace events before the test, and begin counters """
+    # pytest 4.4 reports have no start time. logcat windows on failure are cut from here.
+    item.yorha_since = time.time()
+    if trace.enabled():
+        trace.collect()
+        item.trace_since = trace.now()
+    if getattr(item.config, 'yorha_report', None) is not None:
+        item.config.yorha_report.begin(item.nodeid)
 
 
 @pytest.hookimpl(hookwrapper=True)
@@ -40,6 +80,53 @@ def pytest_runtest_makereport(item):
     # Store the result of each test phase, so it can be read by pytest_runtest_teardown hook when it runs.
     if not hasattr(item, 'rep_' + res.when):
         setattr(item, 'rep_' + res.when, res)
+    # Export trace events of the test after all phases.
+    directory = item.config.getoption('yorha_trace', None)
+    if res.when == 'teardown' and directory and trace.enabled():
+        filename = 'trace_{}.json'.format(re.sub(r'[^\w.\-\[\]]', '_', item.name))
+        path = trace.export(os.path.join(directory, filename), getattr(item, 'trace_since', None))
+        if path is not None:
+            logger.debug('YoRHa Plugins : Trace Saved. : %s', path)
+    # Record counters of the test after all phases.
+    if res.when == 'teardown' and getattr(item.config, 'yorha_report', None) is not None:
+        reports = [getattr(item, 'rep_' + w) for w in ('setup', 'call', 'teardown') if hasattr(item, 'rep_' + w)]
+        result = 'passed'
+        if any([r.failed for r in reports]):
+            result = 'failed'
+        elif any([r.skipped for r in reports]):
+            result = 'skipped'
+        item.config.yorha_report.end(item.nodeid, result, sum([r.duration for r in reports]))
+
+
+def pytest_sessionfinish(session):
+    """ compare with the baseline, and write the performance report """
+    report = getattr(session.config, 'yorha_report', None)
+    if report is None:
+        return
+    baseline = session.config.getoption('yorha_baseline', None)
+    if baseline:
+        if os.path.exists(baseline):
+            report.compare(PerfReport.load(baseline))
+        else:
+            logger.warning('YoRHa Plugins : Baseline Not Found. : %s', baseline)
+    path = session.config.getoption('yorha_report', None)
+    if path:
+        worker = getattr(session.config, 'workerinput', {}).get('workerid')
+        if worker:
+            path = '%s.%s%s' % (os.path.splitext(path)[0], worker, os.path.splitext(path)[1])
+        logger.info('YoRHa Plugins : Performance Report Saved. : %s', report.save(path))
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    """ show regressions against the baseline """
+    report = getattr(config, 'yorha_report', None)
+    if report is None or not report.regressions:
+        return
+    terminalreporter.section('yorha performance regressions')
+    for regression in report.regressions:
+        terminalreporter.write_line('%s : %s %.3f -> %.3f sec (x%.2f)' % (
+            regression['nodeid'], regression['counter'], regression['baseline'], regression['current'],
+            regression['ratio']))
 
 
 def pytest_runtest_teardown(item):
@@ -59,8 +146,15 @@ def pytest_runtest_teardown(item):
             logger.info(os.path.join(item.cls.video_dir, filename))
             create_video(item.cls.evidence_dir, item.cls.video_dir, filename)
             logger.debug('YoRHa Plugins : Screenshot Captured on Test Failure.')
+        elif 'yorha_capture' in getattr(item, 'funcargs', {}):
+            view = item.funcargs['yorha_capture']
+            filename = 'error_{}_{}.mp4'.format(view.name, time.strftime('%Y_%m_%d_%H_%M_%S'))
+            create_video(view.evidence_dir, view.proc.space['tmp.video'], filename)
+            logger.debug('YoRHa Plugins : Screenshot Captured on Test Failure.')
         else:
             logger.debug('YoRHa Plugins : evidence_dir does not exist, screen shot not saved.')
+        for path in dump_failure(item.name, getattr(item, 'yorha_since', None)):
+            logger.info('YoRHa Plugins : Logcat Saved on Test Failure. : %s', path)
 
 
 def create_video(src, dst, filename='output.mp4'):
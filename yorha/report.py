@@ -0,0 +1,137 @@
+""" YoRHa module : performance report utility. """
+from typing import Any, Dict, List, Optional
+import os
+import json
+import time
+import logging
+
+from yorha.metrics import totals
+
+THRESHOLD = 0.2
+FLOOR = 0.05
+GATED = ('adb_time', 'frame_time')
+logger = logging.getLogger(__name__)
+
+
+def counters(before: Dict[str, float], after: Dict[str, float]) -> Dict[str, float]:
+    """ Per-test counters from metrics totals.
+    Arguments:
+        before(Dict[str, float]): totals at the test start.
+        after(Dict[str, float]): totals at the test end.
+    Returns:
+        counters(Dict[str, float]): adb commands and time, frames and drops, searches, match time,
+            frame processing time, and bytes pushed and pulled.
+    """
+    def _delta(key: str) -> float:
+        return after.get(key, 0) - before.get(key, 0)
+
+    match_count = sum([_delta(k) for k in after if k.startswith('process.match.') and k.endswith('.count')])
+    match_time = sum([_delta(k) for k in after if k.startswith('process.match.') and k.endswith('.sum')])
+    return {
+        'adb_commands': _delta('adb.command.count'),
+        'adb_time': _delta('adb.command.sum'),
+        'frames': _delta('stream.frames'),
+        'drops': _delta('stream.drops'),
+        'searches': _delta('process.search.count'),
+        'match_mean': match_time / match_count if match_count else 0.0,
+        'frame_time': match_time + _delta('process.decode.sum'),
+        'push_bytes': _delta('adb.push_bytes'),
+        'pull_bytes': _delta('adb.pull_bytes'),
+    }
+
+
+class PerfReport:
+    """ Per-test Performance Report of a session.
+    Attributes:
+        threshold(float): regression ratio against the baseline. 0.2 is 20% slower.
+        floor(float): baseline times below it are not compared. (sec)
+    """
+
+    def __init__(self, threshold: float = THRESHOLD, floor: float = FLOOR) -> None:
+        self.threshold = threshold
+        self.floor = floor
+        self.since = time.time()
+        self.tests: Dict[str, Dict[str, Any]] = {}
+        self.regressions: List[Dict[str, Any]] = []
+        self._begin: Dict[str, Dict[str, float]] = {}
+
+    def __repr__(self) -> str:
+        return 'PerfReport()'
+
+    def __str__(self) -> str:
+        return 'PerfReport [ Tests = %d, Regressions = %d, Threshold = %s ]' % (
+            len(self.tests), len(self.regressions), self.threshold)
+
+    def begin(self, nodeid: str) -> None:
+        """ Test start.
+        Arguments:
+            nodeid(str): test id.
+        """
+        self._begin[nodeid] = totals()
+
+    def end(self, nodeid: str, outcome: str, duration: float) -> Optional[Dict[str, Any]]:
+        """ Test end.
+        Arguments:
+            nodeid(str): test id.
+            outcome(str): passed, failed or skipped.
+            duration(float): test duration. (sec)
+        Returns:
+            entry(Optional[Dict[str, Any]]): test entry, or None if the test did not begin.
+        """
+        before = self._begin.pop(nodeid, None)
+        if before is None:
+            return None
+        entry: Dict[str, Any] = {'outcome': outcome, 'duration': duration}
+        entry.update(counters(before, totals()))
+        self.tests[nodeid] = entry
+        return entry
+
+    def compare(self, baseline: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """ Compare with the baseline report. adb time and frame processing time are gated.
+        Arguments:
+            baseline(Dict[str, Any]): previous report.
+        Returns:
+            regressions(List[Dict[str, Any]]): test id, counter, baseline, current and ratio.
+        """
+        self.regressions = []
+        previous = baseline.get('tests', {})
+        for nodeid, entry in sorted(self.tests.items()):
+            if nodeid not in previous or entry['outcome'] != 'passed':
+                continue
+            for key in GATED:
+                base, current = previous[nodeid].get(key, 0.0), entry.get(key, 0.0)
+                if base >= self.floor and current > base * (1 + self.threshold):
+                    self.regressions.append({'nodeid': nodeid, 'counter': key, 'baseline': base,
+                                             'current': current, 'ratio': current / base})
+        return self.regressions
+
+    def json(self) -> Dict[str, Any]:
+        """ Report in json format.
+        Returns:
+            report(Dict[str, Any]): report.
+        """
+        return {'since': self.since, 'until': time.time(), 'threshold': self.threshold, 'tests': self.tests,
+                'regressions': self.regressions}
+
+    def save(self, path: str) -> str:
+        """ Save the report.
+        Arguments:
+            path(str): output filepath. (*.json)
+        Returns:
+            path(str): output filepath.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.json(), f, indent=2, sort_keys=True)
+        return path
+
+    @staticmethod
+    def load(path: str) -> Dict[str, Any]:
+        """ Load the report.
+        Arguments:
+            path(str): report filepath.
+        Returns:
+            report(Dict[str, Any]): report.
+        """
+        with open(path) as f:
+            return json.load(f)
@@ -0,0 +1,184 @@
+""" YoRHa module : trace utility. """
+from typing import Any, Dict, List, Optional, Tuple
+import os
+import json
+import time
+import logging
+import threading
+
+MAX_EVENTS = 200000
+logger = logging.getLogger(__name__)
+
+# (phase, name, category, timestamp (usec), duration (usec), args)
+Event = Tuple[str, str, str, int, int, Optional[Dict[str, Any]]]
+
+_enabled = False
+_local = threading.local()
+_buffers: List[Tuple[int, str, List[Event]]] = []
+_mutex = threading.Lock()
+_dropped = 0
+
+
+class _NullSpan:
+    """ Span of disabled tracing. Does nothing.
+    """
+
+    def __enter__(self) -> '_NullSpan':
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        pass
+
+
+class _Span:
+    """ Span of enabled tracing. Record a complete event on exit.
+    Attributes:
+        name(str): span name.
+        category(str): span category.
+        args(Dict[str, Any]): span arguments.
+    """
+    __slots__ = ('name', 'category', 'args', 'begin')
+
+    def __init__(self, name: str, category: str, args: Dict[str, Any]) -> None:
+        self.name = name
+        self.category = category
+        self.args = args
+        self.begin = 0
+
+    def __enter__(self) -> '_Span':
+        self.begin = time.perf_counter_ns() // 1000
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        end = time.perf_counter_ns() // 1000
+        _append(('X', self.name, self.category, self.begin, end - self.begin, self.args or None))
+
+
+_NULL = _NullSpan()
+
+
+def enable() -> None:
+    """ Enable tracing.
+    """
+    global _enabled  # pylint: disable=global-statement
+    _enabled = True
+
+
+def disable() -> None:
+    """ Disable tracing. recorded events are kept.
+    """
+    global _enabled  # pylint: disable=global-statement
+    _enabled = False
+
+
+def enabled() -> bool:
+    """ Tracing is enabled.
+    Returns:
+        result(bool): true if enabled.
+    """
+    return _enabled
+
+
+def now() -> int:
+    """ Trace clock.
+    Returns:
+        timestamp(int): monotonic time. (usec)
+    """
+    return time.perf_counter_ns() // 1000
+
+
+def span(name: str, category: str = 'yorha', **args: Any) -> Any:
+    """ Trace the block as a span.
+    Arguments:
+        name(str): span name.
+        category(str): span category.
+        args(Any): span arguments. (serial, command, ...)
+    Returns:
+        span(Any): context manager.
+    """
+    if not _enabled:
+        return _NULL
+    return _Span(name, category, args)
+
+
+def instant(name: str, category: str = 'yorha', **args: Any) -> None:
+    """ Record an instant event.
+    Arguments:
+        name(str): event name.
+        category(str): event category.
+        args(Any): event arguments.
+    """
+    if _enabled:
+        _append(('i', name, category, time.perf_counter_ns() // 1000, 0, args or None))
+
+
+def _append(event: Event) -> None:
+    """ Append the event to the buffer of the current thread. No lock except the first event of the thread.
+    Arguments:
+        event(Event): trace event.
+    """
+    buffer = getattr(_local, 'buffer', None)
+    if buffer is None:
+        buffer = []
+        _local.buffer = buffer
+        with _mutex:
+            _buffers.append((threading.get_ident(), threading.current_thread().name, buffer))
+    if len(buffer) >= MAX_EVENTS:
+        global _dropped  # pylint: disable=global-statement
+        _dropped += 1
+        return
+    buffer.append(event)
+
+
+def collect() -> List[Tuple[int, str, List[Event]]]:
+    """ Take the recorded events out of the buffers.
+    Returns:
+        events(List[Tuple[int, str, List[Event]]]): thread id, thread name and events.
+    """
+    with _mutex:
+        buffers = list(_buffers)
+    result = []
+    for ident, name, buffer in buffers:
+        count = len(buffer)
+        if count:
+            events = buffer[:count]
+            del buffer[:count]
+            result.append((ident, name, events))
+    alive = {t.ident for t in threading.enumerate()}
+    with _mutex:
+        _buffers[:] = [b for b in _buffers if b[0] in alive or b[2]]
+    return result
+
+
+def export(path: str, since: Optional[int] = None) -> Optional[str]:
+    """ Export the recorded events in chrome trace format. (chrome://tracing, Perfetto)
+    The exported events are taken out of the buffers.
+    Arguments:
+        path(str): output filepath. (*.json)
+        since(Optional[int]): events after the time are exported. see now().
+    Returns:
+        path(Optional[str]): output filepath, or None if no events.
+    """
+    pid = os.getpid()
+    events: List[Dict[str, Any]] = []
+    for ident, name, buffer in collect():
+        threads = [e for e in buffer if since is None or e[3] >= since]
+        if not threads:
+            continue
+        events.append({'ph': 'M', 'name': 'thread_name', 'pid': pid, 'tid': ident, 'args': {'name': name}})
+        for phase, event_name, category, timestamp, duration, args in threads:
+            event: Dict[str, Any] = {'ph': phase, 'name': event_name, 'cat': category, 'ts': timestamp,
+                                     'pid': pid, 'tid': ident}
+            if phase == 'X':
+                event['dur'] = duration
+            else:
+                event['s'] = 't'
+            if args:
+                event['args'] = {k: v if isinstance(v, (int, float, bool)) else str(v) for k, v in args.items()}
+            events.append(event)
+    if not events:
+        return None
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms', 'otherData': {'dropped': _dropped}}, f)
+    return path